@@ -21,12 +21,19 @@ async def validate_mpin(data: ValidateMPINRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/reload-scrip-master")
-async def reload_scrip_master():
-    """Manually reload scrip master from Kotak API."""
+async def reload_scrip_master(force: bool = False):
+    """
+    Manually reload scrip master from Kotak API.
+    The new generation is swapped in atomically; on failure the previous one stays live.
+    """
     try:
         from app.scripmaster.service import scrip_master
-        await scrip_master.load_scrip_master()
-        count = len(scrip_master.scrip_data) if scrip_master.scrip_data is not None else 0
-        return {"message": f"Scrip master reloaded successfully", "records": count}
+        await scrip_master.load_scrip_master(force=force)
+        generation = scrip_master.current
+        return {
+            "message": f"Scrip master reloaded successfully",
+            "records": len(generation),
+            "generation": generation.generation_id
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -159,16 +159,12 @@ class AuthService:
             logger.info(f"🔗 Authenticated Base URL: {base_url}")
             logger.info(f"📡 Data Center: {data_center}")
             
-            # CRITICAL: Load scrip master AFTER authentication with valid baseUrl
-            logger.info("📥 Loading scrip master with authenticated session...")
+            # CRITICAL: Load scrip master AFTER authentication with valid baseUrl.
+            # Runs as a background job so login returns immediately; progress is
+            # reported on /scripmaster/status.
             from app.scripmaster.service import scrip_master
-            try:
-                await scrip_master.load_scrip_master()
-                logger.info("✅ Scrip master loaded successfully")
-            except Exception as scrip_err:
-                logger.error(f"❌ Failed to load scrip master: {scrip_err}")
-                # Don't fail authentication if scrip master fails
-                logger.warning("⚠️  Continuing without scrip master - symbol decoding will be limited")
+            job = scrip_master.start_background_load()
+            logger.info(f"📥 Scrip master loading in background (job {job.job_id})")
             
             return data
 
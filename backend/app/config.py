@@ -15,6 +15,9 @@ class Settings(BaseSettings):
     
     # URLs
     KOTAK_TRADE_API_URL: str = "https://mis.kotaksecurities.com"
+    KOTAK_HSM_URL: str = "wss://mlhsm.kotaksecurities.com"
+    # HSM sockets opened with one trade session (200 instruments each)
+    HSM_MAX_CONNECTIONS: int = 4
 
     
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
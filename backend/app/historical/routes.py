@@ -1,7 +1,10 @@
 """
 Historical data proxy endpoint - fetches Yahoo Finance OHLC data server-side to bypass CORS
+Intraday bars come from the in-memory candle aggregator fed by the live HSM stream
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.websocket.candles import INTERVALS, candle_aggregator
 import httpx
 import time
 import random
@@ -96,3 +99,15 @@ async def get_historical_data(symbol: str):
     except Exception as e:
         # Return sample data on any error
         return {"candles": generate_sample_candles(), "source": "sample"}
+
+@router.get("/historical/{symbol}/intraday")
+async def get_intraday_candles(symbol: str, interval: str = "1m", limit: Optional[int] = None):
+    """
+    Today's OHLCV bars built from live HSM ticks (1s, 1m, 5m or 15m), served
+    from memory. Only instruments that have been subscribed have bars; the
+    ring buffers keep the most recent bars of each interval.
+    """
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval {interval}; use one of {', '.join(INTERVALS)}")
+    candles = candle_aggregator.history(symbol, interval, limit)
+    return {"candles": candles, "interval": interval, "source": "live"}
@@ -11,6 +11,10 @@ from app.websocket.router import router as websocket_router
 from app.historical.routes import router as historical_router
 from app.scripmaster.service import scrip_master
 from app.strategy.engine import strategy_engine
+from app.utils.market_hours import market_sessions
+from app.websocket.hsm_pool import hsm_pool
+from app.websocket.hub import hub
+from app.websocket.subscriptions import subscription_registry
 
 settings = get_settings()
 
@@ -47,8 +51,15 @@ async def startup_event():
     # Initialize order history database
     from app.database import init_database
     await init_database()
+
+    # Exchange session state: computed once, flipped by timers at open/close
+    market_sessions.start()
     
-    # NOTE: Scrip master will load AFTER authentication with valid baseUrl
+    # NOTE: Scrip master will load AFTER authentication with valid baseUrl.
+    # Warm restart: restore today's persisted snapshot (no network) if one exists.
+    if await scrip_master.load_cached_snapshot():
+        logger.info("Scrip master restored from snapshot on startup")
+
     # Start Strategy Engine
     await strategy_engine.start()
 
@@ -56,6 +67,11 @@ async def startup_event():
 async def shutdown_event():
     logger.info("Application shutting down...")
     await strategy_engine.stop()
+    # Frontend writers first, then the upstream HSM connections they were fed by
+    await hub.close()
+    await subscription_registry.close()
+    await hsm_pool.disconnect()
+    market_sessions.stop()
 
 @app.get("/")
 async def root():
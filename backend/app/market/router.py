@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from app.market.service import market_service
 from app.market.schemas import QuoteRequest, QuoteResponse
-from typing import List
+from app.scripmaster.service import scrip_master
+from app.websocket.last_value import last_values
+from app.websocket.order_book import order_books
+from typing import List, Optional
 
 router = APIRouter(prefix="/market", tags=["Market Data"])
 
@@ -16,3 +19,34 @@ async def get_quotes(request: QuoteRequest):
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/depth/{symbol}")
+async def get_market_depth(symbol: str):
+    """
+    Live 5-level market depth, served from the in-memory order book.
+    Available while some client holds a depth subscription for the symbol
+    (action "subscribe_depth" on /ws/market-data).
+    """
+    book = order_books.get(symbol)
+    if book is None:
+        raise HTTPException(status_code=404, detail=f"No live depth for {symbol}; subscribe_depth on /ws/market-data first")
+    return book.to_dict()
+
+@router.get("/snapshot")
+async def get_market_snapshot(symbols: Optional[str] = Query(None, description="Comma-separated trading symbols; all cached if omitted")):
+    """
+    Last known normalized tick per symbol, from the in-memory last-value
+    cache fed by the HSM stream (no upstream call). Symbols without a
+    cached tick are listed under "missing".
+    """
+    requested = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else last_values.symbols()
+    snapshots = {}
+    missing = []
+    for symbol in dict.fromkeys(requested):
+        scrip = scrip_master.get_scrip(symbol)
+        tick = last_values.get(symbol, scrip['exchangeSegment'] if scrip else None)
+        if tick is None:
+            missing.append(symbol)
+        else:
+            snapshots[symbol] = tick
+    return {"count": len(snapshots), "snapshots": snapshots, "missing": missing}
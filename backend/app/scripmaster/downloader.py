@@ -0,0 +1,168 @@
+"""
+Concurrent, streaming scrip master download pipeline.
+
+Every segment CSV is downloaded concurrently over a shared HTTP client. Response
+bytes are streamed into a bounded queue that a parser thread in the worker pool
+reads directly, so the event loop only moves chunks around and never parses.
+Total time is bounded by the slowest segment instead of the sum of all of them.
+"""
+
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import httpx
+import pandas as pd
+
+from app.core.logger import logger
+from app.scripmaster.load_job import LoadJob
+from app.scripmaster.normalize import parse_segment
+
+# Worker pool shared by all scrip master loads (one parser per segment)
+MAX_PARSE_WORKERS = 8
+_parse_pool = ThreadPoolExecutor(max_workers=MAX_PARSE_WORKERS, thread_name_prefix="scrip-parse")
+
+# Backpressure: at most this many undelivered chunks per segment
+STREAM_QUEUE_CHUNKS = 64
+
+
+class SegmentByteStream:
+    """
+    Read-only, file-like view over a byte stream fed from the event loop.
+
+    The producer (event loop) calls feed()/close()/fail(); the consumer
+    (pd.read_csv in a worker thread) calls read(), blocking until data arrives.
+    """
+
+    _EOF = object()
+
+    def __init__(self, max_chunks: int = STREAM_QUEUE_CHUNKS):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_chunks)
+        self._buffer = bytearray()
+        self._eof = False
+        self._aborted = False
+
+    # --- producer side (event loop) ---
+
+    async def feed(self, chunk: bytes):
+        """Hand a chunk to the parser, yielding to the loop while the queue is full."""
+        while True:
+            if self._aborted:
+                raise RuntimeError("Parser stopped consuming the stream")
+            try:
+                self._queue.put_nowait(chunk)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.005)
+
+    async def close(self):
+        await self.feed(self._EOF)
+
+    def fail(self, exc: BaseException):
+        """Abort the parser with the download error (never blocks)."""
+        self._aborted = True
+        try:
+            self._queue.put_nowait(exc)
+        except queue.Full:
+            # Parser is behind; drop queued data so it sees the error next
+            while not self._queue.empty():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(exc)
+
+    # --- consumer side (worker thread) ---
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            item = self._queue.get()
+            if item is self._EOF:
+                self._eof = True
+            elif isinstance(item, BaseException):
+                self._aborted = True
+                raise item
+            else:
+                self._buffer.extend(item)
+
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def abort(self):
+        """Called by the consumer when parsing fails so the producer stops feeding."""
+        self._aborted = True
+
+
+def segment_name_from_url(csv_url: str) -> str:
+    return csv_url.split('/')[-1].replace('.csv', '').upper()
+
+
+def _parse_stream(stream: SegmentByteStream, segment_name: str) -> Optional[pd.DataFrame]:
+    try:
+        return parse_segment(stream, segment_name)
+    except BaseException:
+        stream.abort()
+        raise
+
+
+async def fetch_segment(client: httpx.AsyncClient, csv_url: str, job: Optional[LoadJob] = None) -> Optional[pd.DataFrame]:
+    """Stream one segment CSV into a parser running in the worker pool."""
+    segment_name = segment_name_from_url(csv_url)
+    loop = asyncio.get_running_loop()
+    stream = SegmentByteStream()
+    parse_future = loop.run_in_executor(_parse_pool, _parse_stream, stream, segment_name)
+
+    logger.info(f"📥 Downloading {segment_name}...")
+    if job is not None:
+        job.segment_started(segment_name)
+    try:
+        async with client.stream("GET", csv_url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                if job is not None:
+                    job.segment_bytes(segment_name, len(chunk))
+                await stream.feed(chunk)
+        await stream.close()
+    except Exception as e:
+        stream.fail(e)
+
+    try:
+        df = await parse_future
+    except Exception as e:
+        if job is not None:
+            job.segment_failed(segment_name, e)
+        raise
+
+    if job is not None:
+        job.segment_done(segment_name, 0 if df is None else len(df))
+    return df
+
+
+async def download_segments(csv_urls: List[str], job: Optional[LoadJob] = None) -> List[pd.DataFrame]:
+    """
+    Download and parse all segments concurrently. Failed segments are logged
+    and skipped; the surviving per-segment frames are returned in listing order.
+    Per-segment progress is reported into `job` when given.
+    """
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        results = await asyncio.gather(
+            *(fetch_segment(client, url, job) for url in csv_urls),
+            return_exceptions=True,
+        )
+
+    frames = []
+    for csv_url, result in zip(csv_urls, results):
+        if isinstance(result, BaseException):
+            logger.error(f"❌ Failed to load {segment_name_from_url(csv_url)}: {result}")
+        elif result is not None:
+            frames.append(result)
+    return frames
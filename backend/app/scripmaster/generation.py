@@ -0,0 +1,74 @@
+"""
+Immutable scrip master generations.
+
+A generation bundles the merged DataFrame with every structure derived from
+it (token index, search index, record store, option chains). Generations are built
+completely in the background and published by a single reference swap, so a
+reader that grabbed a generation keeps a consistent view until it lets go,
+and a failed reload never disturbs the live one.
+"""
+
+import itertools
+import time
+from typing import Optional
+
+import pandas as pd
+
+from app.scripmaster.option_chain import OptionChainIndex
+from app.scripmaster.record_store import ScripRecordStore
+from app.scripmaster.search_index import ScripSearchIndex
+from app.scripmaster.token_index import TokenIndex
+
+# Generation 0 is the empty master; real generations count up from 1
+_generation_ids = itertools.count(1)
+
+
+class ScripMasterGeneration:
+    """One complete, read-only build of the scrip master."""
+
+    def __init__(
+        self,
+        generation_id: int,
+        scrip_data: Optional[pd.DataFrame],
+        token_index: Optional[TokenIndex],
+        search_index: Optional[ScripSearchIndex],
+        records: Optional[ScripRecordStore],
+        option_chains: Optional[OptionChainIndex],
+        fingerprint: Optional[str],
+        trading_date: Optional[str],
+    ):
+        self.generation_id = generation_id
+        self.scrip_data = scrip_data
+        self.token_index = token_index
+        self.search_index = search_index
+        self.records = records
+        self.option_chains = option_chains
+        self.fingerprint = fingerprint
+        self.trading_date = trading_date
+        self.built_at = time.time()
+
+    @classmethod
+    def empty(cls) -> "ScripMasterGeneration":
+        return cls(0, None, None, None, None, None, None, None)
+
+    @classmethod
+    def build(cls, scrip_data: pd.DataFrame, fingerprint: str, trading_date: str) -> "ScripMasterGeneration":
+        """Derive every lookup structure for a merged master. CPU-bound: run off the event loop."""
+        token_index = TokenIndex(scrip_data)
+        return cls(
+            next(_generation_ids),
+            scrip_data,
+            token_index,
+            ScripSearchIndex(scrip_data),
+            ScripRecordStore(token_index),
+            OptionChainIndex(scrip_data),
+            fingerprint,
+            trading_date,
+        )
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.scrip_data is not None and not self.scrip_data.empty
+
+    def __len__(self) -> int:
+        return 0 if self.scrip_data is None else len(self.scrip_data)
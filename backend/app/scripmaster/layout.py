@@ -0,0 +1,120 @@
+"""
+Memory layout of the merged scrip master DataFrame.
+
+The merged master repeats a handful of distinct strings (segments, instrument
+and option types, expiry dates, underlying names) across ~240k rows. After the
+merge every column is moved to a compact dtype:
+
+    segment, exchangeSegment, instrumentType,
+    optionType, expiryDateISO                -> category (int8/int16 codes)
+    companyName                              -> category when it repeats enough
+    instrumentToken, lotSize, expiryEpoch    -> smallest signed integer that fits
+    strikePrice                              -> float32
+    tradingSymbol (index)                    -> interned strings
+
+Values read back through ScripRecord / get_scrip are unchanged Python
+str / int / float / None.
+"""
+
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ("segment", "exchangeSegment", "instrumentType", "optionType", "expiryDateISO")
+
+# Converted to category only if distinct values are at most this share of rows
+OPTIONAL_CATEGORICAL_COLUMNS = ("companyName",)
+MAX_CATEGORY_RATIO = 0.5
+
+INTEGER_COLUMNS = ("instrumentToken", "lotSize", "expiryEpoch")
+FLOAT32_COLUMNS = ("strikePrice",)
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype("category")
+
+
+def _to_integer(series: pd.Series) -> pd.Series:
+    values = pd.to_numeric(series, errors="coerce")
+    if values.isna().any():
+        return series  # keep as-is rather than change missing-value semantics
+    return pd.to_numeric(values.astype(np.int64), downcast="integer")
+
+
+def _intern_index(index: pd.Index) -> pd.Index:
+    interned = np.fromiter(
+        (sys.intern(s) if isinstance(s, str) else s for s in index.tolist()),
+        dtype=object,
+        count=len(index),
+    )
+    return pd.Index(interned, name=index.name, dtype=object)
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the master with the compact column layout (idempotent)."""
+    columns = {}
+    rows = max(len(df), 1)
+
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            series = _to_category(series)
+        elif col in OPTIONAL_CATEGORICAL_COLUMNS and series.nunique(dropna=True) / rows <= MAX_CATEGORY_RATIO:
+            series = _to_category(series)
+        elif col in INTEGER_COLUMNS:
+            series = _to_integer(series)
+        elif col in FLOAT32_COLUMNS:
+            series = pd.to_numeric(series, errors="coerce").astype(np.float32)
+        columns[col] = series.array  # plain arrays: no reindexing against the new index
+
+    return pd.DataFrame(columns, index=_intern_index(df.index), copy=False)
+
+
+def string_values(series: pd.Series, fill: str = "", upper: bool = False) -> np.ndarray:
+    """
+    Object array of Python strings for a (possibly categorical) column, missing -> fill.
+    Categorical columns are converted per category, not per row.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.astype(str)
+        if upper:
+            categories = categories.str.upper()
+        lookup = np.append(categories.to_numpy(dtype=object), fill)
+        return lookup[series.cat.codes.to_numpy()]  # code -1 (missing) -> fill
+
+    values = series.astype(object).where(series.notna(), fill).astype(str)
+    if upper:
+        values = values.str.upper()
+    return values.to_numpy(dtype=object)
+
+
+def memory_report(df: Optional[pd.DataFrame]) -> dict:
+    """Per-column footprint (deep, i.e. including Python string objects)."""
+    if df is None:
+        return {"rows": 0, "totalBytes": 0, "totalMB": 0.0, "index": None, "columns": []}
+
+    usage = df.memory_usage(deep=True)
+    rows = len(df)
+
+    def entry(name, dtype, nbytes):
+        return {
+            "name": name,
+            "dtype": str(dtype),
+            "bytes": int(nbytes),
+            "bytesPerRow": round(nbytes / rows, 2) if rows else 0.0,
+        }
+
+    columns = [entry(col, df[col].dtype, usage[col]) for col in df.columns]
+    columns.sort(key=lambda c: -c["bytes"])
+    total = int(usage.sum())
+    return {
+        "rows": rows,
+        "totalBytes": total,
+        "totalMB": round(total / 1e6, 2),
+        "index": entry(df.index.name or "index", df.index.dtype, usage["Index"]),
+        "columns": columns,
+    }
@@ -0,0 +1,118 @@
+"""
+Progress tracking for background scrip master loads.
+
+One LoadJob per load attempt. The downloader reports per-segment progress into
+it and /scripmaster/status serializes it, so clients can see which segments are
+still downloading while the API already serves requests.
+"""
+
+import time
+from typing import Dict, Optional
+
+# Job states
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_READY = "ready"
+JOB_FAILED = "failed"
+
+# Segment states
+SEGMENT_PENDING = "pending"
+SEGMENT_DOWNLOADING = "downloading"
+SEGMENT_DONE = "done"
+SEGMENT_FAILED = "failed"
+
+
+class SegmentProgress:
+    __slots__ = ("name", "state", "bytes", "rows", "error", "started_at", "finished_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = SEGMENT_PENDING
+        self.bytes = 0
+        self.rows = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "state": self.state,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "error": self.error,
+            "seconds": elapsed,
+        }
+
+
+class LoadJob:
+    """State of one scrip master load, updated from the event loop only."""
+
+    def __init__(self, job_id: int, force: bool = False):
+        self.job_id = job_id
+        self.force = force
+        self.state = JOB_PENDING
+        self.stage = "queued"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.segments: Dict[str, SegmentProgress] = {}
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in (JOB_PENDING, JOB_RUNNING)
+
+    # --- job lifecycle ---
+
+    def set_stage(self, stage: str):
+        self.state = JOB_RUNNING
+        self.stage = stage
+
+    def finish(self):
+        self.state = JOB_READY
+        self.stage = "done"
+        self.finished_at = time.time()
+
+    def fail(self, error: BaseException):
+        self.state = JOB_FAILED
+        self.error = str(error)
+        self.finished_at = time.time()
+
+    # --- per-segment progress (called by the downloader) ---
+
+    def segment_started(self, name: str):
+        progress = self.segments.setdefault(name, SegmentProgress(name))
+        progress.state = SEGMENT_DOWNLOADING
+        progress.started_at = time.time()
+
+    def segment_bytes(self, name: str, count: int):
+        self.segments[name].bytes += count
+
+    def segment_done(self, name: str, rows: int):
+        progress = self.segments[name]
+        progress.state = SEGMENT_DONE
+        progress.rows = rows
+        progress.finished_at = time.time()
+
+    def segment_failed(self, name: str, error: BaseException):
+        progress = self.segments.setdefault(name, SegmentProgress(name))
+        progress.state = SEGMENT_FAILED
+        progress.error = str(error)
+        progress.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        done = sum(1 for s in self.segments.values() if s.state == SEGMENT_DONE)
+        return {
+            "id": self.job_id,
+            "state": self.state,
+            "stage": self.stage,
+            "force": self.force,
+            "error": self.error,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "segmentsDone": done,
+            "segmentsTotal": len(self.segments),
+            "segments": {name: s.to_dict() for name, s in self.segments.items()},
+        }
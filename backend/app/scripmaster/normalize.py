@@ -0,0 +1,168 @@
+"""
+Per-segment parsing and normalization of Kotak scrip master CSVs.
+
+Runs inside the scrip master worker pool (see downloader.py), so everything
+here is synchronous and must not touch the event loop. All stages are column
+operations - there is no per-row Python on the load path.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import logger
+
+# Kotak F&O expiry epochs count seconds since 1980-01-01 00:00:00, NOT Unix epoch
+KOTAK_EPOCH_BASE = pd.Timestamp(1980, 1, 1)
+
+# Anything beyond this is garbage (and would overflow datetime64[ns])
+MAX_KOTAK_EPOCH = 2 ** 32
+
+# Option strikes above this are in scaled units (e.g., 2590000 for 25900)
+SCALED_STRIKE_THRESHOLD = 1_000_000
+
+# Define ALL possible metadata columns
+BASE_COLUMNS = ['pTrdSymbol', 'pSymbol', 'pExchSeg', 'lLotSize']
+METADATA_COLUMNS = [
+    'pInstType',      # Instrument type (EQ, FUTIDX, OPTIDX, etc.)
+    'pOptionType',    # CE, PE, XX
+    'lExpiryDate',    # REAL expiry date (Kotak epoch)
+    'dStrikePrice',   # Strike price (variant 1)
+    'pStrikePrice',   # Strike price (variant 2)
+    'pSymbolName',    # Full company name (e.g., Bharat Electronics Limited)
+    'pDesc',          # Description
+]
+
+# Rename for consistency
+RENAME_MAP = {
+    'pTrdSymbol': 'tradingSymbol',
+    'pSymbol': 'instrumentToken',
+    'lLotSize': 'lotSize',
+    'pExchSeg': 'exchangeSegment',
+    'pInstType': 'instrumentType',
+    'pOptionType': 'optionType',
+    'lExpiryDate': 'expiryEpoch',  # Keep epoch for processing
+    'dStrikePrice': 'strikePrice',
+    'pStrikePrice': 'strikePrice',  # Map both variants to same name
+    'pSymbolName': 'companyName',
+    'pDesc': 'description'
+}
+
+
+def read_segment_csv(source) -> pd.DataFrame:
+    """Read a raw segment CSV (path, buffer or file-like byte stream)."""
+    df = pd.read_csv(source)
+
+    # CRITICAL: Normalize column names
+    # 1. Strip whitespace
+    # 2. Remove trailing semicolons (e.g., "dStrikePrice;" -> "dStrikePrice")
+    df.columns = df.columns.str.strip().str.rstrip(';')
+    return df
+
+
+def convert_expiry_epochs(epochs: pd.Series) -> pd.Series:
+    """
+    Convert Kotak expiry epochs to ISO dates (YYYY-MM-DD), None when missing/invalid.
+
+    A segment has thousands of contracts but only a handful of distinct expiries,
+    so dates are formatted once per unique epoch and broadcast back by code.
+    """
+    values = pd.to_numeric(epochs, errors='coerce')
+    valid = values.notna() & (values >= 0) & (values < MAX_KOTAK_EPOCH)
+    seconds = np.floor(values.where(valid))
+
+    codes, uniques = pd.factorize(seconds)  # NaN -> code -1
+    dates = (KOTAK_EPOCH_BASE + pd.to_timedelta(uniques, unit='s')).strftime('%Y-%m-%d')
+
+    lookup = np.append(np.asarray(dates, dtype=object), None)  # index -1 -> None
+    return pd.Series(lookup[codes], index=epochs.index, dtype=object)
+
+
+def normalize_strikes(strikes: pd.Series, instrument_types: pd.Series) -> pd.Series:
+    """Divide scaled option strikes (> 1 million) by 100; other values pass through."""
+    values = pd.to_numeric(strikes, errors='coerce')
+    is_option = instrument_types.astype(str).str.contains('OPT', regex=False).to_numpy()
+    scaled = is_option & (values > SCALED_STRIKE_THRESHOLD).to_numpy()
+    return values.where(~scaled, values / 100)
+
+
+def normalize_segment(df: pd.DataFrame, segment_name: str) -> Optional[pd.DataFrame]:
+    """Map one raw segment frame onto the normalized scrip master schema."""
+    logger.info(f"📋 {segment_name} columns: {list(df.columns)}")
+
+    # Select columns that exist in this CSV
+    columns_to_load = [col for col in BASE_COLUMNS + METADATA_COLUMNS if col in df.columns]
+
+    if 'pTrdSymbol' not in columns_to_load or 'pSymbol' not in columns_to_load:
+        logger.warning(f"⚠️  {segment_name} missing required columns, skipping")
+        return None
+
+    # Extract available fields
+    segment_df = df[columns_to_load].copy()
+
+    # Both strike variants map to 'strikePrice': coalesce them into one column
+    if 'dStrikePrice' in segment_df.columns and 'pStrikePrice' in segment_df.columns:
+        segment_df['dStrikePrice'] = segment_df['dStrikePrice'].fillna(segment_df['pStrikePrice'])
+        segment_df = segment_df.drop(columns=['pStrikePrice'])
+
+    # Only rename columns that exist
+    actual_rename = {k: v for k, v in RENAME_MAP.items() if k in segment_df.columns}
+    segment_df = segment_df.rename(columns=actual_rename)
+
+    # CRITICAL FIX: Convert Kotak expiry epoch to ISO date
+    if 'expiryEpoch' in segment_df.columns:
+        segment_df['expiryDateISO'] = convert_expiry_epochs(segment_df['expiryEpoch'])
+
+    # CRITICAL FIX: Normalize strike price
+    if 'strikePrice' in segment_df.columns and 'instrumentType' in segment_df.columns:
+        segment_df['strikePrice'] = normalize_strikes(segment_df['strikePrice'], segment_df['instrumentType'])
+
+    # CRITICAL FIX: Set instrumentType = "EQ" for equity segments when null
+    if 'instrumentType' in segment_df.columns and 'CM' in segment_name:
+        segment_df['instrumentType'] = segment_df['instrumentType'].fillna('EQ')
+
+    # Add segment label
+    segment_df['segment'] = segment_name
+
+    logger.info(f"✅ {segment_name}: Loaded {len(segment_df)} instruments")
+    logger.info(f"   Columns: {list(segment_df.columns)}")
+
+    _log_samples(segment_df, segment_name)
+
+    return segment_df
+
+
+def parse_segment(source, segment_name: str) -> Optional[pd.DataFrame]:
+    """
+    Parse one segment CSV (path, buffer or file-like byte stream) into the
+    normalized scrip master schema. Returns None if the segment is unusable.
+    """
+    return normalize_segment(read_segment_csv(source), segment_name)
+
+
+def _log_samples(segment_df: pd.DataFrame, segment_name: str):
+    """VERIFICATION: Show sample rows for F&O and equity segments."""
+    if any(x in segment_name for x in ['FO', 'CD', 'MCX']):
+        logger.info(f"📊 SAMPLE VERIFICATION for {segment_name}:")
+
+        sample_cols = ['tradingSymbol', 'instrumentType', 'optionType', 'strikePrice', 'expiryDateISO', 'expiryEpoch']
+        available_sample_cols = [c for c in sample_cols if c in segment_df.columns]
+
+        if 'instrumentType' in segment_df.columns:
+            for inst_type, count in (('FUTIDX', 3), ('OPTIDX', 5)):
+                samples = segment_df.loc[segment_df['instrumentType'] == inst_type, available_sample_cols].head(count)
+                if not samples.empty:
+                    logger.info(f"   📌 {inst_type} Samples:")
+                    for row_data in samples.to_dict('records'):
+                        logger.info(f"      {row_data}")
+
+    # Sample EQ from nse_cm/bse_cm
+    if 'CM' in segment_name:
+        sample_cols = ['tradingSymbol', 'instrumentType', 'optionType', 'exchangeSegment']
+        available_sample_cols = [c for c in sample_cols if c in segment_df.columns]
+        samples = segment_df[available_sample_cols].head(3)
+        if not samples.empty:
+            logger.info(f"   📌 EQUITY Samples from {segment_name}:")
+            for row_data in samples.to_dict('records'):
+                logger.info(f"      {row_data}")
@@ -0,0 +1,164 @@
+"""
+Option chain index over the scrip master.
+
+    underlying -> exchange segment -> expiry (ISO) -> OptionChain
+
+Each OptionChain holds a sorted strike array and, per strike, the row
+positions of the CE and PE contracts (-1 if that leg is not listed). ATM
+windows and single-contract resolution are binary searches on the strike
+array; no DataFrame scan happens after the index is built.
+"""
+
+import bisect
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.scripmaster.layout import string_values
+from app.scripmaster.snapshot import current_trading_date
+
+MISSING = -1
+
+# Strikes are stored as float32 in the master; compare them at this precision
+STRIKE_DECIMALS = 4
+
+
+class OptionChain:
+    """Strikes and CE/PE row positions for one (underlying, segment, expiry)."""
+
+    __slots__ = ("underlying", "segment", "expiry", "strikes", "ce", "pe")
+
+    def __init__(self, underlying: str, segment: str, expiry: str,
+                 strikes: np.ndarray, ce: np.ndarray, pe: np.ndarray):
+        self.underlying = underlying
+        self.segment = segment
+        self.expiry = expiry
+        self.strikes = strikes
+        self.ce = ce
+        self.pe = pe
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    def atm_index(self, spot: Optional[float]) -> int:
+        """Index of the strike nearest to spot (middle strike when spot is unknown)."""
+        if spot is None:
+            return len(self.strikes) // 2
+        i = int(np.searchsorted(self.strikes, spot))
+        if i == 0:
+            return 0
+        if i >= len(self.strikes):
+            return len(self.strikes) - 1
+        return i if self.strikes[i] - spot < spot - self.strikes[i - 1] else i - 1
+
+    def window(self, spot: Optional[float], width: int):
+        """(atm_index, start, stop) for ATM ± width strikes."""
+        atm = self.atm_index(spot)
+        return atm, max(0, atm - width), min(len(self.strikes), atm + width + 1)
+
+    def position(self, strike: float, option_type: str) -> Optional[int]:
+        """Row position of a single contract, or None."""
+        strike = round(float(strike), STRIKE_DECIMALS)
+        i = int(np.searchsorted(self.strikes, strike))
+        if i >= len(self.strikes) or self.strikes[i] != strike:
+            return None
+        legs = self.ce if option_type.upper() == "CE" else self.pe
+        pos = int(legs[i])
+        return None if pos == MISSING else pos
+
+
+def _underlyings(options: pd.DataFrame) -> pd.Series:
+    """Underlying name: pSymbolName for F&O rows, else the symbol prefix before the first digit."""
+    prefix = options.index.to_series(index=options.index).astype(str).str.extract(r"^([A-Za-z&\-]+)", expand=False)
+    if "companyName" in options.columns:
+        names = options["companyName"].astype("string").str.strip()
+        names = names.where(names.notna() & (names != ""), prefix)
+    else:
+        names = prefix
+    return names.fillna("").astype(str).str.upper()
+
+
+class OptionChainIndex:
+    """Precomputed option chains for every underlying in the master."""
+
+    def __init__(self, scrip_data: pd.DataFrame):
+        self._chains: Dict[str, Dict[str, Dict[str, OptionChain]]] = {}
+        self._contracts = 0
+
+        required = {"instrumentType", "optionType", "strikePrice", "expiryDateISO", "exchangeSegment"}
+        if scrip_data.empty or not required.issubset(scrip_data.columns):
+            return
+
+        inst = pd.Series(string_values(scrip_data["instrumentType"], upper=True), index=scrip_data.index)
+        opt_type = pd.Series(string_values(scrip_data["optionType"], upper=True), index=scrip_data.index)
+        strikes = pd.to_numeric(scrip_data["strikePrice"], errors="coerce")
+        mask = (
+            inst.str.startswith("OPT")
+            & opt_type.isin(["CE", "PE"])
+            & (strikes > 0)
+            & scrip_data["expiryDateISO"].notna()
+        ).to_numpy()
+        if not mask.any():
+            return
+
+        options = scrip_data.loc[mask, ["exchangeSegment", "expiryDateISO"]].copy()
+        options["companyName"] = scrip_data.loc[mask, "companyName"] if "companyName" in scrip_data.columns else None
+        frame = pd.DataFrame({
+            "underlying": _underlyings(options).to_numpy(),
+            "segment": options["exchangeSegment"].astype(str).str.lower().to_numpy(),
+            "expiry": options["expiryDateISO"].astype(str).to_numpy(),
+            "strike": strikes.to_numpy(dtype=np.float64)[mask].round(STRIKE_DECIMALS),
+            "is_ce": (opt_type.to_numpy()[mask] == "CE"),
+            "pos": np.flatnonzero(mask),
+        })
+        frame = frame[frame["underlying"] != ""]
+        self._contracts = len(frame)
+
+        for (underlying, segment, expiry), group in frame.groupby(["underlying", "segment", "expiry"], sort=True):
+            chain_strikes = np.unique(group["strike"].to_numpy())
+            ce = np.full(len(chain_strikes), MISSING, dtype=np.int64)
+            pe = np.full(len(chain_strikes), MISSING, dtype=np.int64)
+
+            # Reverse so the first listed contract wins on duplicate (strike, type)
+            group = group.iloc[::-1]
+            slots = np.searchsorted(chain_strikes, group["strike"].to_numpy())
+            is_ce = group["is_ce"].to_numpy()
+            ce[slots[is_ce]] = group["pos"].to_numpy()[is_ce]
+            pe[slots[~is_ce]] = group["pos"].to_numpy()[~is_ce]
+
+            self._chains.setdefault(underlying, {}).setdefault(segment, {})[expiry] = OptionChain(
+                underlying, segment, expiry, chain_strikes, ce, pe
+            )
+
+    def __len__(self) -> int:
+        return self._contracts
+
+    def underlyings(self) -> List[str]:
+        return sorted(self._chains)
+
+    def segments(self, underlying: str) -> List[str]:
+        """Segments listing options on the underlying, most contracts first."""
+        by_segment = self._chains.get(underlying.upper(), {})
+        return sorted(by_segment, key=lambda seg: -sum(len(c) for c in by_segment[seg].values()))
+
+    def expiries(self, underlying: str, segment: Optional[str] = None) -> List[str]:
+        segment = segment.lower() if segment else next(iter(self.segments(underlying)), None)
+        return sorted(self._chains.get(underlying.upper(), {}).get(segment, {}))
+
+    def get(self, underlying: str, expiry: Optional[str] = None, segment: Optional[str] = None) -> Optional[OptionChain]:
+        """
+        Chain for the underlying. Defaults: the segment with the most contracts,
+        and the nearest expiry on or after today's (IST) trading date.
+        """
+        underlying = underlying.upper()
+        segment = segment.lower() if segment else next(iter(self.segments(underlying)), None)
+        by_expiry = self._chains.get(underlying, {}).get(segment)
+        if not by_expiry:
+            return None
+
+        if expiry is None:
+            expiries = sorted(by_expiry)
+            i = bisect.bisect_left(expiries, current_trading_date())
+            expiry = expiries[min(i, len(expiries) - 1)]
+        return by_expiry.get(expiry)
@@ -0,0 +1,66 @@
+"""
+Immutable, JSON-ready scrip records keyed by trading symbol.
+
+get_scrip sits on the hot path of order placement, websocket subscribe and the
+/scripmaster/scrip route. The store replaces the per-call pandas
+.loc/.where/.to_dict with a dictionary hit:
+
+  - symbol -> row position is built once per load (vectorized),
+  - each record is materialized once from the shared column arrays into a
+    read-only mapping and memoized, so repeat lookups return the same object,
+  - an optional pre-serialized JSON bytes form is memoized alongside it.
+
+Records are materialized on first use rather than for all ~240k rows up front,
+which keeps the footprint proportional to the symbols actually traded.
+"""
+
+import json
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from app.scripmaster.token_index import ScripRecord, TokenIndex
+
+
+class ScripRecordStore:
+    """Trading symbol -> immutable record (and its encoded JSON)."""
+
+    def __init__(self, token_index: TokenIndex):
+        self._token_index = token_index
+        symbols = token_index.symbols.tolist()
+        # First occurrence wins for duplicate symbols (same as the old .loc[...].iloc[0])
+        self._positions: Dict[str, int] = dict(zip(reversed(symbols), range(len(symbols) - 1, -1, -1)))
+        self._records: Dict[str, Mapping] = {}
+        self._encoded: Dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._positions
+
+    def get(self, symbol: str) -> Optional[Mapping]:
+        record = self._records.get(symbol)
+        if record is not None:
+            return record
+
+        pos = self._positions.get(symbol)
+        if pos is None:
+            return None
+
+        record = MappingProxyType(ScripRecord(self._token_index, pos).to_dict())
+        self._records[symbol] = record
+        return record
+
+    def get_json(self, symbol: str) -> Optional[bytes]:
+        """Pre-serialized JSON object for the record, encoded once per load."""
+        encoded = self._encoded.get(symbol)
+        if encoded is not None:
+            return encoded
+
+        record = self.get(symbol)
+        if record is None:
+            return None
+
+        encoded = json.dumps(dict(record), separators=(",", ":")).encode("utf-8")
+        self._encoded[symbol] = encoded
+        return encoded
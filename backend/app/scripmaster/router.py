@@ -1,47 +1,99 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Response, Depends
+from typing import Optional
 from app.scripmaster.service import scrip_master
 
 router = APIRouter(prefix="/scripmaster", tags=["ScripMaster"])
 
-@router.get("/search")
-async def search_scrips(q: str = Query(..., min_length=1, description="Search query (symbol or name)")):
+# How long a request may block on an in-progress load before getting a retryable 503
+READY_WAIT_SECONDS = 2.0
+RETRY_AFTER_SECONDS = 3
+
+async def require_scrip_master():
+    """
+    Dependency for routes that need a loaded scrip master.
+    Blocks briefly while a load is running; then 503 + Retry-After (retryable).
+    With no load running and nothing loaded, the session has to be re-established (401).
+    """
+    if scrip_master.is_ready:
+        return
+    if scrip_master.is_loading and await scrip_master.wait_until_ready(timeout=READY_WAIT_SECONDS):
+        return
+    if scrip_master.is_loading:
+        raise HTTPException(
+            status_code=503,
+            detail="Scrip master is loading. Retry shortly.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    # If scrip master is empty, session probably lost or reload required
+    raise HTTPException(status_code=401, detail="Scrip master not loaded. Please login again.")
+
+@router.get("/status")
+async def scrip_master_status():
+    """
+    Readiness of the scrip master and progress of the current/last load job
+    (per-segment state, bytes downloaded and rows parsed).
+    """
+    return scrip_master.status()
+
+@router.get("/memory", dependencies=[Depends(require_scrip_master)])
+async def scrip_master_memory():
+    """
+    Per-column memory footprint of the loaded scrip master (deep bytes, dtype,
+    bytes per row), largest first.
+    """
+    return scrip_master.memory_report()
+
+@router.get("/search", dependencies=[Depends(require_scrip_master)])
+async def search_scrips(
+    q: str = Query(..., min_length=1, description="Search query (symbol or name)"),
+    segment: Optional[str] = Query(None, description="Comma-separated exchange segments, e.g. nse_cm,nse_fo"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+):
     """
     READ-ONLY scrip search endpoint.
-    Searches in-memory scrip master loaded at startup.
-    Returns matching symbols for autocomplete.
+    Searches the prebuilt symbol / company name index (prefix and substring).
+    Returns ranked matches for autocomplete: exact, then prefix, then partial;
+    equity before derivatives.
     """
-    if scrip_master.scrip_data is None or scrip_master.scrip_data.empty:
-        # If scrip master is empty, session probably lost or reload required
-        raise HTTPException(status_code=401, detail="Scrip master not loaded. Please login again.")
-    
-    df = scrip_master.scrip_data
-    query = q.upper()
-    
-    # Match symbols using index (since tradingSymbol is the index)
-    matches = df[df.index.str.contains(query, case=False, na=False)]
-    
-    # Reset index to get tradingSymbol as a column for result extraction
-    results_df = matches.head(20).reset_index()
-    # Replace NaN with None for JSON serialization
-    results = results_df.where(results_df.notna(), None).to_dict('records')
+    segments = [s.strip() for s in segment.split(",") if s.strip()] if segment else None
+    results = scrip_master.search(q, limit=limit, segments=segments)
     
     return {"data": results}
 
-@router.get("/scrip/{trading_symbol}")
+@router.get("/scrip/{trading_symbol}", dependencies=[Depends(require_scrip_master)])
 async def get_scrip_details(trading_symbol: str):
     """
     Get full scrip details including metadata for symbol decoding.
     Returns comprehensive instrument data from scrip master CSV.
+    The record is served from its pre-serialized JSON form (no re-encoding).
     """
-    scrip = scrip_master.get_scrip(trading_symbol)
+    scrip_json = scrip_master.get_scrip_json(trading_symbol)
     
-    if not scrip:
+    if not scrip_json:
         return {
             "stat": "Not Ok",
             "message": f"Symbol {trading_symbol} not found in scrip master"
         }
     
-    return {
-        "stat": "Ok",
-        "data": scrip
-    }
+    return Response(
+        content=b'{"stat":"Ok","data":' + scrip_json + b'}',
+        media_type="application/json"
+    )
+
+@router.get("/option-chain", dependencies=[Depends(require_scrip_master)])
+async def get_option_chain(
+    underlying: str = Query(..., min_length=1, description="Underlying name, e.g. NIFTY, BANKNIFTY, RELIANCE"),
+    expiry: Optional[str] = Query(None, description="Expiry date (YYYY-MM-DD); defaults to the nearest expiry"),
+    spot: Optional[float] = Query(None, gt=0, description="Spot/underlying price used to locate the ATM strike"),
+    strikes: int = Query(10, ge=1, le=100, description="Number of strikes on each side of ATM"),
+    segment: Optional[str] = Query(None, description="Exchange segment, e.g. nse_fo; defaults to the busiest"),
+):
+    """
+    Option chain window around ATM from the precomputed chain index.
+    Each strike carries the CE and PE contract (trading symbol, token, lot size).
+    """
+    chain = scrip_master.get_option_chain(underlying, expiry=expiry, spot=spot, strikes=strikes, segment=segment)
+    if chain is None:
+        raise HTTPException(status_code=404, detail=f"No option chain for {underlying.upper()} ({expiry or 'nearest expiry'})")
+
+    return {"data": chain}
@@ -0,0 +1,243 @@
+"""
+Prebuilt search index for /scripmaster/search autocomplete.
+
+Rows are renumbered by a static rank (equity, then futures, then options;
+shorter symbols first) so that every posting list is already in rank order
+and "best K" never needs a full sort. Matching tiers, best first:
+
+    0. exact trading symbol
+    1. trading symbol prefix
+    2. company name prefix
+    3. substring of symbol or company name (trigram postings, queries >= 3 chars)
+
+Everything is NumPy arrays; building is vectorized and lookups only touch the
+postings for the query.
+"""
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.scripmaster.layout import string_values
+
+# Static rank classes (lower sorts first)
+RANK_EQUITY = 0
+RANK_FUTURES = 1
+RANK_OPTIONS = 2
+RANK_OTHER = 3
+
+MIN_SUBSTRING_QUERY = 3
+SUBSTRING_CHUNK = 512
+_SEPARATOR = "\x01"
+
+
+def _classify(inst_type: str, segment: str) -> int:
+    inst_type = inst_type.upper()
+    if inst_type.startswith("FUT"):
+        return RANK_FUTURES
+    if inst_type.startswith("OPT"):
+        return RANK_OPTIONS
+    if inst_type == "EQ" or segment.lower().endswith("_cm"):
+        return RANK_EQUITY
+    return RANK_OTHER
+
+
+def _rank_classes(scrip_data: pd.DataFrame) -> np.ndarray:
+    """Rank class per row, classifying each distinct (instrumentType, segment) pair once."""
+    if "instrumentType" in scrip_data.columns:
+        inst = string_values(scrip_data["instrumentType"])
+    else:
+        inst = np.full(len(scrip_data), "", dtype=object)
+    pairs = pd.MultiIndex.from_arrays([inst, string_values(scrip_data["exchangeSegment"])])
+    codes, uniques = pd.factorize(pairs)
+    lookup = np.array([_classify(i, seg) for i, seg in uniques], dtype=np.int8)
+    return lookup[codes]
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def _trigram_codes(texts: List[bytes]):
+    """Vectorized (trigram code, row) pairs for every 3-byte window inside each text."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    joined = b"\x00".join(texts)
+    buf = np.frombuffer(joined + b"\x00\x00", dtype=np.uint8).astype(np.int64)
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths + 1)[: len(joined)]
+
+    first, second, third = buf[:-2], buf[1:-1], buf[2:]
+    codes = (first << 16) | (second << 8) | third
+    valid = (first != 0) & (second != 0) & (third != 0)  # drop windows crossing a row boundary
+    return codes[valid], rows[valid]
+
+
+def _encode_trigrams(query: bytes) -> np.ndarray:
+    q = np.frombuffer(query, dtype=np.uint8).astype(np.int64)
+    return _sorted_unique((q[:-2] << 16) | (q[1:-1] << 8) | q[2:])
+
+
+class ScripSearchIndex:
+    """Symbol + company name index with prefix/substring matching and ranking."""
+
+    def __init__(self, scrip_data: pd.DataFrame):
+        n = len(scrip_data)
+        symbols = scrip_data.index.astype(str).str.upper().to_numpy(dtype=object)
+        if "companyName" in scrip_data.columns:
+            names = string_values(scrip_data["companyName"], upper=True)
+        else:
+            names = np.full(n, "", dtype=object)
+        classes = _rank_classes(scrip_data)
+        segments = pd.Series(string_values(scrip_data["exchangeSegment"])).str.lower()
+
+        # Rank order: class, symbol length, symbol
+        lengths = np.fromiter((len(s) for s in symbols), dtype=np.int64, count=n)
+        order = np.lexsort((symbols.astype(str), lengths, classes))
+
+        # rank id -> original row position
+        self.positions = order.astype(np.int64)
+        self._symbols = symbols[order]
+        self._names = names[order]
+
+        seg_codes, seg_uniques = pd.factorize(segments.to_numpy()[order])
+        self._segment_codes = seg_codes.astype(np.int16)
+        self._segment_lookup = {seg: code for code, seg in enumerate(seg_uniques)}
+
+        # Tier 0: exact symbol (first occurrence by rank wins)
+        self._exact = {}
+        for rank_id, sym in enumerate(self._symbols.tolist()):
+            self._exact.setdefault(sym, rank_id)
+
+        # Tier 1/2: sorted keys for prefix ranges
+        sym_keys = self._symbols.astype(str)
+        sym_order = np.argsort(sym_keys, kind="stable")
+        self._sym_sorted = sym_keys[sym_order]
+        self._sym_ranks = sym_order.astype(np.int64)
+
+        has_name = self._names != ""
+        named_ranks = np.nonzero(has_name)[0]
+        name_keys = self._names[has_name].astype(str)
+        name_order = np.argsort(name_keys, kind="stable")
+        self._name_sorted = name_keys[name_order]
+        self._name_ranks = named_ranks[name_order].astype(np.int64)
+
+        # Tier 3: trigram postings in CSR form (postings sorted by rank id)
+        texts = [s + _SEPARATOR + nm for s, nm in zip(self._symbols.tolist(), self._names.tolist())]
+        codes, rows = _trigram_codes([t.encode("utf-8") for t in texts])
+        pairs = _sorted_unique((codes << 32) | rows)
+        pair_codes = pairs >> 32
+        self._postings = pairs & 0xFFFFFFFF
+        starts = np.flatnonzero(np.r_[True, pair_codes[1:] != pair_codes[:-1]]) if len(pairs) else np.zeros(0, np.int64)
+        self._trigram_keys = pair_codes[starts]
+        self._trigram_starts = np.append(starts, len(pairs)).astype(np.int64)
+        self._texts = texts
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # --- helpers ---
+
+    def _segment_mask(self, segments: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if not segments:
+            return None
+        codes = [self._segment_lookup[s.lower()] for s in segments if s.lower() in self._segment_lookup]
+        return np.asarray(codes, dtype=np.int16)
+
+    def _allowed(self, rank_ids: np.ndarray, seg_codes: Optional[np.ndarray]) -> np.ndarray:
+        if seg_codes is None or len(rank_ids) == 0:
+            return rank_ids
+        return rank_ids[np.isin(self._segment_codes[rank_ids], seg_codes)]
+
+    @staticmethod
+    def _best(rank_ids: np.ndarray, k: int) -> np.ndarray:
+        if len(rank_ids) > k:
+            rank_ids = np.partition(rank_ids, k - 1)[:k]
+        return np.sort(rank_ids)
+
+    @staticmethod
+    def _prefix_range(sorted_keys: np.ndarray, query: str):
+        lo = np.searchsorted(sorted_keys, query, side="left")
+        hi = np.searchsorted(sorted_keys, query + "\U0010ffff", side="left")
+        return lo, hi
+
+    def _posting(self, code: int) -> np.ndarray:
+        i = np.searchsorted(self._trigram_keys, code)
+        if i >= len(self._trigram_keys) or self._trigram_keys[i] != code:
+            return self._postings[:0]
+        return self._postings[self._trigram_starts[i]:self._trigram_starts[i + 1]]
+
+    def _substring(self, query: str, seg_codes, k: int, exclude: set) -> List[int]:
+        postings = sorted((self._posting(int(c)) for c in _encode_trigrams(query.encode("utf-8"))), key=len)
+        if not postings or len(postings[0]) == 0:
+            return []
+
+        # Postings are in rank order, so walk the rarest one in chunks and stop
+        # as soon as K verified matches are found (common trigrams stay cheap).
+        found = []
+        shortest, others = postings[0], postings[1:]
+        for start in range(0, len(shortest), SUBSTRING_CHUNK):
+            candidates = shortest[start:start + SUBSTRING_CHUNK]
+            for other in others:
+                idx = np.searchsorted(other, candidates).clip(max=len(other) - 1)
+                candidates = candidates[other[idx] == candidates]
+                if len(candidates) == 0:
+                    break
+
+            for rank_id in self._allowed(candidates, seg_codes).tolist():
+                if rank_id in exclude:
+                    continue
+                if query in self._texts[rank_id]:  # trigram hits are only candidates
+                    found.append(rank_id)
+                    if len(found) >= k:
+                        return found
+        return found
+
+    # --- public API ---
+
+    def search(self, query: str, limit: int = 20, segments: Optional[Iterable[str]] = None) -> List[int]:
+        """Return original row positions of the best matches, best first."""
+        query = query.strip().upper()
+        if not query or limit <= 0:
+            return []
+
+        seg_codes = self._segment_mask(segments)
+        if seg_codes is not None and len(seg_codes) == 0:
+            return []
+
+        results: List[int] = []
+        seen = set()
+
+        def take(rank_ids):
+            for rank_id in rank_ids:
+                if rank_id not in seen:
+                    seen.add(rank_id)
+                    results.append(rank_id)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        exact = self._exact.get(query)
+        if exact is not None and len(self._allowed(np.array([exact]), seg_codes)):
+            if take([exact]):
+                return self._to_positions(results)
+
+        for sorted_keys, ranks in ((self._sym_sorted, self._sym_ranks), (self._name_sorted, self._name_ranks)):
+            lo, hi = self._prefix_range(sorted_keys, query)
+            if hi > lo:
+                best = self._best(self._allowed(ranks[lo:hi], seg_codes), limit + len(seen))
+                if take(best.tolist()):
+                    return self._to_positions(results)
+
+        if len(query) >= MIN_SUBSTRING_QUERY:
+            take(self._substring(query, seg_codes, limit - len(results), seen))
+
+        return self._to_positions(results)
+
+    def _to_positions(self, rank_ids: List[int]) -> List[int]:
+        return self.positions[rank_ids].tolist() if rank_ids else []
@@ -1,25 +1,72 @@
 import pandas as pd
-import io
 import asyncio
+import itertools
+import time
+from typing import Optional
 from app.core.http_client import http_client
 from app.core.logger import logger
 from app.config import get_settings
-import httpx
+from app.scripmaster import snapshot
+from app.scripmaster.downloader import download_segments
+from app.scripmaster.generation import ScripMasterGeneration
+from app.scripmaster.layout import memory_report, optimize_dtypes
+from app.scripmaster.load_job import LoadJob
+from app.scripmaster.token_index import ScripRecord
 
 settings = get_settings()
 
 class ScripMasterService:
     def __init__(self):
-        self.scrip_data = None
         self.base_url = None
-        self._token_map = {}  # (token, segment) -> scrip_dict
+        # Active generation: swapped atomically, never mutated in place
+        self._generation = ScripMasterGeneration.empty()
+        self._load_lock = asyncio.Lock()
+        # Background load tracking (see start_background_load / wait_until_ready)
+        self._job: Optional[LoadJob] = None
+        self._job_task: Optional[asyncio.Task] = None
+        self._job_ids = itertools.count(1)
+        self._ready = asyncio.Event()
         
-    async def load_scrip_master(self):
+    @property
+    def current(self) -> ScripMasterGeneration:
+        """The live generation. Hold on to it for a consistent multi-step read."""
+        return self._generation
+
+    @property
+    def generation_id(self) -> int:
+        """Changes on every successful (re)load; cheap cache invalidation key."""
+        return self._generation.generation_id
+
+    @property
+    def scrip_data(self):
+        return self._generation.scrip_data
+
+    @property
+    def is_ready(self) -> bool:
+        return self._generation.is_loaded
+
+    @property
+    def is_loading(self) -> bool:
+        return self._job is not None and self._job.is_active
+
+    async def load_scrip_master(self, force: bool = False, job: Optional[LoadJob] = None):
         """
         Downloads and parses ALL scrip master CSVs dynamically from Kotak Neo API.
         CRITICAL: This is the SINGLE SOURCE OF TRUTH for all instrument metadata.
         NO regex, NO parsing, NO guessing - scrip master data ONLY.
+        
+        The full download only runs when the upstream file-paths listing or the
+        trading date changed (or force=True); otherwise the persisted snapshot
+        is memory-mapped.
+        
+        A new generation is built completely in the background and swapped in
+        atomically. On failure the previous generation stays live and the
+        error is raised to the caller.
         """
+        async with self._load_lock:
+            await self._load_scrip_master(force, job)
+
+    async def _load_scrip_master(self, force: bool, job: Optional[LoadJob] = None):
         logger.info("=" * 80)
         logger.info("SCRIP MASTER LOADER - SINGLE SOURCE OF TRUTH")
         logger.info("=" * 80)
@@ -36,6 +83,8 @@ class ScripMasterService:
             self.base_url = base_url
             
             # Step 1: Get ALL available segment file paths dynamically
+            if job is not None:
+                job.set_stage("listing")
             client = await http_client.get_client()
             file_paths_url = f"{base_url}/script-details/1.0/masterscrip/file-paths"
             
@@ -64,164 +113,24 @@ class ScripMasterService:
                 segment_name = url.split('/')[-1].replace('.csv', '')
                 logger.info(f"  - {segment_name}")
             
-            # Step 3: Download and process ALL CSVs
-            all_dataframes = []
+            # Step 2b: Skip the download when the upstream listing and trading date are unchanged
+            fingerprint = snapshot.fingerprint_listing(csv_urls)
+            trading_date = snapshot.current_trading_date()
             
-            async with httpx.AsyncClient(timeout=30.0) as fresh_client:
-                for csv_url in csv_urls:
-                    segment_name = csv_url.split('/')[-1].replace('.csv', '').upper()
-                    
-                    try:
-                        logger.info(f"📥 Downloading {segment_name}...")
-                        csv_response = await fresh_client.get(csv_url)
-                        csv_response.raise_for_status()
-                        
-                        # Parse CSV
-                        csv_content = csv_response.text
-                        df = pd.read_csv(io.StringIO(csv_content))
-                        
-                        # CRITICAL: Normalize column names
-                        # 1. Strip whitespace
-                        # 2. Remove trailing semicolons (e.g., "dStrikePrice;" -> "dStrikePrice")
-                        df.columns = df.columns.str.strip().str.rstrip(';')
-                        
-                        logger.info(f"📋 {segment_name} columns: {list(df.columns)}")
-                        
-                        # Define ALL possible metadata columns
-                        base_columns = ['pTrdSymbol', 'pSymbol', 'pExchSeg', 'lLotSize']
-                        metadata_columns = [
-                            'pInstType',      # Instrument type (EQ, FUTIDX, OPTIDX, etc.)
-                            'pOptionType',    # CE, PE, XX
-                            'lExpiryDate',    # REAL expiry date (Unix timestamp)
-                            'dStrikePrice',   # Strike price (variant 1)
-                            'pStrikePrice',   # Strike price (variant 2)
-                            'pSymbolName',    # Full company name (e.g., Bharat Electronics Limited)
-                            'pDesc',          # Description
-                        ]
-                        
-                        # Select columns that exist in this CSV
-                        columns_to_load = []
-                        for col in base_columns + metadata_columns:
-                            if col in df.columns:
-                                columns_to_load.append(col)
-                        
-                        if 'pTrdSymbol' not in columns_to_load or 'pSymbol' not in columns_to_load:
-                            logger.warning(f"⚠️  {segment_name} missing required columns, skipping")
-                            continue
-                        
-                        # Extract available fields
-                        segment_df = df[columns_to_load].copy()
-                        
-                        # Rename for consistency
-                        rename_map = {
-                            'pTrdSymbol': 'tradingSymbol',
-                            'pSymbol': 'instrumentToken',
-                            'lLotSize': 'lotSize',
-                            'pExchSeg': 'exchangeSegment',
-                            'pInstType': 'instrumentType',
-                            'pOptionType': 'optionType',
-                            'lExpiryDate': 'expiryEpoch',  # Keep epoch for processing
-                            'dStrikePrice': 'strikePrice',
-                            'pStrikePrice': 'strikePrice',  # Map both variants to same name
-                            'pSymbolName': 'companyName',
-                            'pDesc': 'description'
-                        }
-                        
-                        # Only rename columns that exist
-                        actual_rename = {k: v for k, v in rename_map.items() if k in segment_df.columns}
-                        segment_df = segment_df.rename(columns=actual_rename)
-                        
-                        # CRITICAL FIX: Convert Kotak expiry epoch to ISO date
-                        # Kotak F&O CSV expiryEpoch is seconds since 2000-01-01, NOT Unix epoch
-                        if 'expiryEpoch' in segment_df.columns:
-                            from datetime import datetime, timedelta
-                            
-                            def convert_kotak_epoch(epoch_val):
-                                """Convert Kotak epoch (seconds since 1980-01-01) to ISO date"""
-                                try:
-                                    if pd.isna(epoch_val) or epoch_val < 0:
-                                        return None
-                                    # Base date for Kotak: 1980-01-01 00:00:00
-                                    base_date = datetime(1980, 1, 1)
-                                    expiry_datetime = base_date + timedelta(seconds=int(epoch_val))
-                                    return expiry_datetime.strftime('%Y-%m-%d')
-                                except:
-                                    return None
-                            
-                            segment_df['expiryDateISO'] = segment_df['expiryEpoch'].apply(convert_kotak_epoch)
-                        
-                        # CRITICAL FIX: Normalize strike price
-                        # Kotak stores strike prices in scaled units (e.g., 2590000 for 25900)
-                        if 'strikePrice' in segment_df.columns and 'instrumentType' in segment_df.columns:
-                            def normalize_strike(row):
-                                """Normalize strike price for options"""
-                                try:
-                                    strike = row.get('strikePrice')
-                                    inst_type = row.get('instrumentType')
-                                    
-                                    if pd.isna(strike) or strike < 0:
-                                        return strike
-                                    
-                                    # If options instrument with strike > 1 million, divide by 100
-                                    if inst_type and 'OPT' in str(inst_type) and strike > 1_000_000:
-                                        normalized = strike / 100
-                                        return normalized
-                                    
-                                    return strike
-                                except:
-                                    return row.get('strikePrice')
-                            
-                            segment_df['strikePrice'] = segment_df.apply(normalize_strike, axis=1)
-                        
-                        # CRITICAL FIX: Set instrumentType = "EQ" for equity segments when null
-                        if 'instrumentType' in segment_df.columns and 'CM' in segment_name:
-                            segment_df['instrumentType'] = segment_df['instrumentType'].fillna('EQ')
-                        
-                        # Add segment label
-                        segment_df['segment'] = segment_name
-                        
-                        logger.info(f"✅ {segment_name}: Loaded {len(segment_df)} instruments")
-                        logger.info(f"   Columns: {list(segment_df.columns)}")
-                        
-                        # VERIFICATION: Show sample rows for F&O segments
-                        if any(x in segment_name for x in ['FO', 'CD', 'MCX']):
-                            logger.info(f"📊 SAMPLE VERIFICATION for {segment_name}:")
-                            
-                            sample_cols = ['tradingSymbol', 'instrumentType', 'optionType', 'strikePrice', 'expiryDateISO', 'expiryEpoch']
-                            available_sample_cols = [c for c in sample_cols if c in segment_df.columns]
-                            
-                            # Sample FUTIDX
-                            fut_samples = segment_df[segment_df['instrumentType'] == 'FUTIDX'].head(3)
-                            if not fut_samples.empty:
-                                logger.info(f"   📌 FUTIDX Samples:")
-                                for idx, row in fut_samples.iterrows():
-                                    row_data = {col: row[col] for col in available_sample_cols if col in row.index}
-                                    logger.info(f"      {row_data}")
-                            
-                            # Sample OPTIDX
-                            opt_samples = segment_df[segment_df['instrumentType'] == 'OPTIDX'].head(5)
-                            if not opt_samples.empty:
-                                logger.info(f"   📌 OPTIDX Samples:")
-                                for idx, row in opt_samples.iterrows():
-                                    row_data = {col: row[col] for col in available_sample_cols if col in row.index}
-                                    logger.info(f"      {row_data}")
-                        
-                        # Sample EQ from nse_cm/bse_cm
-                        if 'CM' in segment_name:
-                            eq_samples = segment_df.head(3)
-                            if not eq_samples.empty:
-                                logger.info(f"   📌 EQUITY Samples from {segment_name}:")
-                                sample_cols = ['tradingSymbol', 'instrumentType', 'optionType', 'exchangeSegment']
-                                available_sample_cols = [c for c in sample_cols if c in segment_df.columns]
-                                for idx, row in eq_samples.iterrows():
-                                    row_data = {col: row[col] for col in available_sample_cols if col in row.index}
-                                    logger.info(f"      {row_data}")
-                        
-                        all_dataframes.append(segment_df)
-                        
-                    except Exception as seg_err:
-                        logger.error(f"❌ Failed to load {segment_name}: {seg_err}")
-                        continue
+            if not force:
+                if job is not None:
+                    job.set_stage("snapshot")
+                if self._is_current(fingerprint, trading_date):
+                    logger.info("✅ Scrip master already up to date (listing and trading date unchanged)")
+                    return
+                
+                if await self._load_from_snapshot(trading_date, fingerprint):
+                    return
+            
+            # Step 3: Download and parse ALL segments concurrently
+            if job is not None:
+                job.set_stage("downloading")
+            all_dataframes = await download_segments(csv_urls, job)
             
             if not all_dataframes:
                 logger.error("❌ No dataframes loaded successfully")
@@ -229,54 +138,241 @@ class ScripMasterService:
             
             # Step 4: Merge ALL segments into single DataFrame
             logger.info("🔗 Merging all segments...")
-            self.scrip_data = pd.concat(all_dataframes, ignore_index=True)
+            scrip_data = pd.concat(all_dataframes, ignore_index=True)
             
             # Index by trading symbol for fast lookup
-            self.scrip_data = self.scrip_data.set_index('tradingSymbol')
+            scrip_data = scrip_data.set_index('tradingSymbol')
             
-            logger.info("=" * 80)
+            # Compact layout: categoricals, small ints, float32 strikes, interned symbols
+            scrip_data = await asyncio.to_thread(optimize_dtypes, scrip_data)
             
-            # Build token map for fast real-time lookup
-            self._token_map = {}
-            for symbol, row in self.scrip_data.iterrows():
-                token = str(row['instrumentToken'])
-                segment = str(row['exchangeSegment']).lower()
-                self._token_map[(token, segment)] = {**row.to_dict(), 'tradingSymbol': symbol}
+            logger.info("=" * 80)
             
-            logger.info(f"✅ Token map built: {len(self._token_map)} entries")
+            if job is not None:
+                job.set_stage("indexing")
+            await self._install(scrip_data, fingerprint, trading_date)
             
-            with open("scrip_master_status.txt", "w") as f:
-                f.write(f"Loaded: {len(self.scrip_data) if self.scrip_data is not None else 0} records\n")
-                f.write(f"Segments: {self.scrip_data['segment'].unique().tolist() if self.scrip_data is not None else []}\n")
-                f.write(f"Columns: {self.scrip_data.columns.tolist() if self.scrip_data is not None else []}\n")
+            # Step 5: Persist a columnar snapshot for warm restarts (failure is non-fatal)
+            if job is not None:
+                job.set_stage("saving_snapshot")
+            try:
+                await asyncio.to_thread(snapshot.save_snapshot, scrip_data, fingerprint, trading_date)
+            except Exception as snap_err:
+                logger.warning(f"⚠️  Failed to save scrip master snapshot: {snap_err}")
             
         except Exception as e:
             logger.error(f"❌ CRITICAL: Failed to load scrip master: {e}")
-            logger.warning("Using empty scrip master - symbol decoding will fail")
-            self.scrip_data = pd.DataFrame()
+            if self._generation.is_loaded:
+                logger.warning(f"Keeping scrip master generation {self.generation_id} live")
+            else:
+                logger.warning("No scrip master loaded - symbol decoding will fail")
+            raise
+
+    def start_background_load(self, force: bool = False) -> LoadJob:
+        """
+        Schedule a load as a tracked background job and return immediately.
+        If a load is already running its job is returned instead of starting another.
+        """
+        if self.is_loading:
+            return self._job
+
+        job = LoadJob(next(self._job_ids), force=force)
+        self._job = job
+        self._job_task = asyncio.create_task(self._run_job(job))
+        logger.info(f"📥 Scrip master load job {job.job_id} scheduled")
+        return job
+
+    async def _run_job(self, job: LoadJob):
+        try:
+            await self.load_scrip_master(force=job.force, job=job)
+            job.finish()
+            logger.info(f"✅ Scrip master load job {job.job_id} finished")
+        except Exception as e:
+            job.fail(e)
+            logger.error(f"❌ Scrip master load job {job.job_id} failed: {e}")
+            logger.warning("⚠️  Continuing without scrip master - symbol decoding will be limited")
+
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a loaded generation. Returns immediately when one is live;
+        otherwise waits up to `timeout` seconds (forever if None) and returns
+        whether the master became ready.
+        """
+        if self.is_ready:
+            return True
+
+        # Also wake up when the running job ends, so a failed load doesn't cost the full timeout
+        waiters = [asyncio.ensure_future(self._ready.wait())]
+        if self.is_loading:
+            waiters.append(asyncio.shield(self._job_task))
+        _, pending = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in pending:
+            waiter.cancel()
+        return self.is_ready
+
+    def status(self) -> dict:
+        """Readiness and load progress for /scripmaster/status."""
+        generation = self._generation
+        return {
+            "ready": generation.is_loaded,
+            "loading": self.is_loading,
+            "generation": generation.generation_id,
+            "records": len(generation),
+            "tradingDate": generation.trading_date,
+            "builtAt": generation.built_at if generation.is_loaded else None,
+            "job": self._job.to_dict() if self._job is not None else None,
+        }
     
-    def get_scrip(self, symbol: str):
-        """Get scrip details by trading symbol - GROUND TRUTH ONLY"""
-        if self.scrip_data is None or self.scrip_data.empty:
-            return None
+    async def load_cached_snapshot(self) -> bool:
+        """
+        Warm restart: memory-map today's snapshot without touching the network.
+        Called at startup so the master is available before the next MPIN login.
+        """
+        async with self._load_lock:
+            return await self._load_from_snapshot(snapshot.current_trading_date())
+
+    async def _load_from_snapshot(self, trading_date: str, fingerprint: str = None) -> bool:
+        """Install the persisted snapshot if it matches; returns True on success."""
+        try:
+            started = time.perf_counter()
+            loaded = await asyncio.to_thread(snapshot.load_snapshot, trading_date, fingerprint)
+            if loaded is None:
+                return False
+            
+            scrip_data, manifest = loaded
+            read_ms = (time.perf_counter() - started) * 1000
+            await self._install(scrip_data, manifest["fingerprint"], manifest["trading_date"])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"⚡ Scrip master restored from snapshot in {elapsed_ms:.0f} ms ({len(scrip_data)} records; "
+                        f"snapshot read incl. string materialization {read_ms:.0f} ms, indexes {elapsed_ms - read_ms:.0f} ms)")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load scrip master snapshot: {e}")
+            return False
+
+    def _is_current(self, fingerprint: str, trading_date: str) -> bool:
+        """True if the live master was built from this listing on this trading date."""
+        generation = self._generation
+        if not generation.is_loaded:
+            return False
+        return generation.fingerprint == fingerprint and generation.trading_date == trading_date
+
+    async def _install(self, scrip_data: pd.DataFrame, fingerprint: str, trading_date: str):
+        """Build a complete generation off the event loop, then swap it in atomically."""
+        generation = await asyncio.to_thread(ScripMasterGeneration.build, scrip_data, fingerprint, trading_date)
         
-        if symbol not in self.scrip_data.index:
-            return None
+        previous = self._generation
+        self._generation = generation
+        self._ready.set()
         
-        # Get row and replace NaN with None for JSON serialization
-        scrip_row = self.scrip_data.loc[symbol]
-        # loc can return a DataFrame if duplicate index exists (shouldn't happen with tradingSymbol)
-        if isinstance(scrip_row, pd.DataFrame):
-            scrip_row = scrip_row.iloc[0]
-            
-        scrip_dict = scrip_row.where(scrip_row.notna(), None).to_dict()
-        scrip_dict['tradingSymbol'] = symbol
+        logger.info(f"✅ Token index built: {len(generation.token_index)} entries")
+        logger.info(f"✅ Search index built: {len(generation.search_index)} entries")
+        logger.info(f"✅ Option chain index built: {len(generation.option_chains)} contracts")
+        logger.info(f"🔄 Scrip master generation {previous.generation_id} -> {generation.generation_id}")
         
-        return scrip_dict
+        with open("scrip_master_status.txt", "w") as f:
+            f.write(f"Loaded: {len(scrip_data)} records\n")
+            f.write(f"Segments: {scrip_data['segment'].unique().tolist()}\n")
+            f.write(f"Columns: {scrip_data.columns.tolist()}\n")
+            f.write(f"Trading date: {trading_date}\n")
+            f.write(f"Generation: {generation.generation_id}\n")
+
+    def memory_report(self) -> dict:
+        """Per-column memory footprint of the live master (for /scripmaster/memory)."""
+        generation = self._generation
+        report = memory_report(generation.scrip_data)
+        report["generation"] = generation.generation_id
+        return report
+
+    def get_scrip(self, symbol: str):
+        """
+        Get scrip details by trading symbol - GROUND TRUTH ONLY.
+        Returns an immutable, JSON-ready mapping (a dictionary hit after first use).
+        """
+        records = self._generation.records
+        if records is None:
+            return None
+        return records.get(symbol)
+
+    def get_scrip_json(self, symbol: str):
+        """Pre-serialized JSON bytes of get_scrip(symbol), or None."""
+        records = self._generation.records
+        if records is None:
+            return None
+        return records.get_json(symbol)
 
     def get_scrip_by_token(self, token: str, segment: str):
-        """Fast lookup for real-time ticks using token and segment."""
-        return self._token_map.get((str(token), str(segment).lower()))
+        """
+        Fast lookup for real-time ticks using token and segment.
+        Returns a read-only ScripRecord mapping whose fields materialize on access.
+        """
+        token_index = self._generation.token_index
+        if token_index is None:
+            return None
+        return token_index.get(token, segment)
+
+    def search(self, query: str, limit: int = 20, segments: list = None) -> list:
+        """
+        Ranked autocomplete over trading symbols and company names.
+        Exact before prefix before substring; equity before derivatives.
+        """
+        generation = self._generation
+        if generation.search_index is None:
+            return []
+        positions = generation.search_index.search(query, limit=limit, segments=segments)
+        return [ScripRecord(generation.token_index, pos).to_dict() for pos in positions]
+
+    def get_option_chain(self, underlying: str, expiry: str = None, spot: float = None,
+                         strikes: int = 10, segment: str = None):
+        """
+        ATM ± `strikes` window of an option chain. Defaults to the nearest expiry
+        and, without a spot price, the middle of the strike ladder.
+        """
+        generation = self._generation
+        if generation.option_chains is None:
+            return None
+        chain = generation.option_chains.get(underlying, expiry=expiry, segment=segment)
+        if chain is None:
+            return None
+
+        token_index = generation.token_index
+
+        def leg(pos):
+            if pos < 0:
+                return None
+            record = ScripRecord(token_index, pos)
+            return {
+                "tradingSymbol": record["tradingSymbol"],
+                "instrumentToken": record["instrumentToken"],
+                "lotSize": record.get("lotSize"),
+            }
+
+        atm, start, stop = chain.window(spot, strikes)
+        rows = [
+            {"strike": float(strike), "CE": leg(ce), "PE": leg(pe)}
+            for strike, ce, pe in zip(
+                chain.strikes[start:stop].tolist(), chain.ce[start:stop].tolist(), chain.pe[start:stop].tolist()
+            )
+        ]
+        return {
+            "underlying": chain.underlying,
+            "segment": chain.segment,
+            "expiry": chain.expiry,
+            "expiries": generation.option_chains.expiries(chain.underlying, chain.segment),
+            "atmStrike": float(chain.strikes[atm]),
+            "strikes": rows,
+        }
+
+    def resolve_option(self, underlying: str, expiry: str, strike: float, option_type: str, segment: str = None):
+        """Single contract record by (underlying, expiry, strike, CE/PE) via binary search."""
+        generation = self._generation
+        if generation.option_chains is None:
+            return None
+        chain = generation.option_chains.get(underlying, expiry=expiry, segment=segment)
+        if chain is None:
+            return None
+        pos = chain.position(float(strike), option_type)
+        return None if pos is None else ScripRecord(generation.token_index, pos).to_dict()
 
 # Global singleton instance
 scrip_master = ScripMasterService()
@@ -0,0 +1,250 @@
+"""
+Persistent columnar snapshot of the normalized scrip master.
+
+Each snapshot is a versioned directory under backend/data/scrip_master:
+
+    data/scrip_master/
+        CURRENT                         -> name of the active snapshot directory
+        v1-2026-01-09-3f2a9c1e0b7d/
+            manifest.json               -> format version, trading date, upstream fingerprint, columns
+            tradingSymbol.npy           -> one NumPy array per column (see below for what stays mapped)
+            strikePrice.npy
+            segment.npy                 -> categorical columns: integer codes ...
+            segment.categories.npy      -> ... plus their categories
+            ...
+
+Snapshots are written to a temporary directory and published by atomically
+replacing the CURRENT pointer, so a crash mid-write never leaves a torn snapshot.
+Publishing prunes only completed snapshots older than the new one; another
+writer's temporary directory is left alone unless it has been abandoned for
+STALE_TMP_SECONDS.
+
+Only numeric columns and categorical codes stay memory-mapped after a load
+(codes are wrapped without validation, which would copy them).
+pandas needs Python str objects for string columns and the index, so those
+are materialized from their fixed-width arrays; the tradingSymbol index
+(~250k strings) accounts for most of the load time. The stored layout is
+already the compact one from layout.optimize_dtypes, so loading does not
+run it again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.logger import logger
+from app.utils.market_hours import IST
+
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_ROOT = Path(__file__).parent.parent.parent / "data" / "scrip_master"
+CURRENT_POINTER = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+TMP_PREFIX = ".tmp-"
+
+# A temporary directory untouched this long belongs to a crashed writer
+STALE_TMP_SECONDS = 3600
+
+
+def current_trading_date() -> str:
+    """Trading date (IST) the scrip master is valid for."""
+    return datetime.now(IST).date().isoformat()
+
+
+def fingerprint_listing(csv_urls: List[str]) -> str:
+    """Stable fingerprint of the upstream file-paths listing."""
+    digest = hashlib.sha256("\n".join(sorted(csv_urls)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _column_file(name: str) -> str:
+    return f"{name}.npy"
+
+
+def _mask_file(name: str) -> str:
+    return f"{name}.null.npy"
+
+
+def _categories_file(name: str) -> str:
+    return f"{name}.categories.npy"
+
+
+def save_snapshot(df: pd.DataFrame, fingerprint: str, trading_date: str) -> Path:
+    """
+    Persist a normalized scrip master DataFrame (indexed by tradingSymbol).
+
+    Numeric columns are stored as-is (keeping their compact dtypes); categorical
+    columns as codes plus a categories array; string columns as fixed-width
+    unicode arrays plus a null mask so they can be memory-mapped without pickling.
+    """
+    SNAPSHOT_ROOT.mkdir(parents=True, exist_ok=True)
+
+    name = f"v{SNAPSHOT_FORMAT_VERSION}-{trading_date}-{fingerprint[:12]}"
+    tmp_dir = SNAPSHOT_ROOT / f"{TMP_PREFIX}{uuid.uuid4().hex}"
+    tmp_dir.mkdir()
+
+    try:
+        frame = df.reset_index()
+        columns = []
+
+        for col in frame.columns:
+            series = frame[col]
+            entry = {"name": col}
+
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(tmp_dir / _column_file(col), series.cat.codes.to_numpy())
+                np.save(tmp_dir / _categories_file(col), series.cat.categories.astype(str).to_numpy(dtype=str))
+                entry["kind"] = "categorical"
+            elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+                np.save(tmp_dir / _column_file(col), series.to_numpy())
+                entry["kind"] = "numeric"
+            else:
+                nulls = series.isna().to_numpy()
+                values = series.where(~nulls, "").astype(str).to_numpy(dtype=str)
+                np.save(tmp_dir / _column_file(col), values)
+                if nulls.any():
+                    np.save(tmp_dir / _mask_file(col), nulls)
+                    entry["nullable"] = True
+                entry["kind"] = "string"
+
+            columns.append(entry)
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "trading_date": trading_date,
+            "fingerprint": fingerprint,
+            "rows": len(frame),
+            "index": df.index.name or "tradingSymbol",
+            "columns": columns,
+            "created_at": datetime.now(IST).isoformat(),
+        }
+        with open(tmp_dir / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        target = SNAPSHOT_ROOT / name
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+
+        # Publish: atomically swap the CURRENT pointer
+        pointer_tmp = SNAPSHOT_ROOT / f".{CURRENT_POINTER}.{uuid.uuid4().hex}"
+        pointer_tmp.write_text(name)
+        os.replace(pointer_tmp, SNAPSHOT_ROOT / CURRENT_POINTER)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _prune_old_snapshots(keep=name)
+    logger.info(f"💾 Scrip master snapshot saved: {name} ({manifest['rows']} rows)")
+    return target
+
+
+def _prune_old_snapshots(keep: str):
+    """
+    Remove completed snapshots older than `keep` and abandoned temporary
+    directories (best effort). A concurrent writer's temporary directory, a
+    newer snapshot and whatever CURRENT points to are never touched.
+    """
+    try:
+        keep_mtime = (SNAPSHOT_ROOT / keep).stat().st_mtime
+        current = (SNAPSHOT_ROOT / CURRENT_POINTER).read_text().strip()
+    except OSError:
+        return
+
+    now = time.time()
+    for entry in SNAPSHOT_ROOT.iterdir():
+        if not entry.is_dir() or entry.name in (keep, current):
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue  # removed concurrently
+        if entry.name.startswith(TMP_PREFIX):
+            stale = now - mtime > STALE_TMP_SECONDS
+        else:
+            stale = (entry / MANIFEST_FILE).exists() and mtime < keep_mtime
+        if stale:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def read_manifest() -> Optional[dict]:
+    """Return the manifest of the CURRENT snapshot, or None if there is no usable snapshot."""
+    pointer = SNAPSHOT_ROOT / CURRENT_POINTER
+    if not pointer.exists():
+        return None
+
+    snapshot_dir = SNAPSHOT_ROOT / pointer.read_text().strip()
+    manifest_path = snapshot_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        logger.info(f"Ignoring scrip master snapshot with format v{manifest.get('format_version')}")
+        return None
+
+    manifest["path"] = str(snapshot_dir)
+    return manifest
+
+
+def load_snapshot(
+    trading_date: str,
+    fingerprint: Optional[str] = None,
+) -> Optional[Tuple[pd.DataFrame, dict]]:
+    """
+    Load the CURRENT snapshot if it matches the trading date (and the upstream
+    fingerprint when one is given). Returns (DataFrame, manifest) or None.
+
+    Numeric and categorical-code columns are memory-mapped; string columns
+    are copied into Python strings (see the module docstring).
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        return None
+
+    if manifest["trading_date"] != trading_date:
+        logger.info(f"Scrip master snapshot is stale (trading date {manifest['trading_date']} != {trading_date})")
+        return None
+
+    if fingerprint is not None and manifest["fingerprint"] != fingerprint:
+        logger.info("Scrip master snapshot is stale (upstream file listing changed)")
+        return None
+
+    snapshot_dir = Path(manifest["path"])
+    index_name = manifest["index"]
+    index = None
+    data = {}
+    for entry in manifest["columns"]:
+        col = entry["name"]
+        values = np.load(snapshot_dir / _column_file(col), mmap_mode="r")
+
+        if entry["kind"] == "categorical":
+            categories = np.load(snapshot_dir / _categories_file(col)).astype(object)
+            # validate=False wraps the mapped codes as-is instead of copying them
+            values = pd.Categorical.from_codes(np.asarray(values), categories=categories, validate=False)
+        elif entry["kind"] == "string":
+            strings = values.tolist()
+            if col == index_name:
+                strings = map(sys.intern, strings)  # symbols are interned, as in optimize_dtypes
+            values = np.fromiter(strings, dtype=object, count=len(values))
+            if entry.get("nullable"):
+                nulls = np.load(snapshot_dir / _mask_file(col), mmap_mode="r")
+                values[nulls] = None
+
+        if col == index_name:
+            index = pd.Index(values, name=col, dtype=object)
+        else:
+            data[col] = values
+
+    return pd.DataFrame(data, index=index, copy=False), manifest
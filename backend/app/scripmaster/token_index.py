@@ -0,0 +1,145 @@
+"""
+Compact (token, segment) index over the scrip master column arrays.
+
+Instead of one Python dict per instrument, the index keeps:
+  - the master's columns as shared NumPy arrays (one array per column;
+    categorical columns stay as codes + categories), and
+  - a single int -> row-position dict keyed by token * SEGMENT_SLOTS + segment code.
+
+Lookups stay O(1); fields are only materialized when a record is read.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Room for this many distinct exchange segments in a packed key
+SEGMENT_SLOTS = 64
+
+
+def _to_python(value):
+    """NumPy scalar -> native Python; NaN/NA -> None (JSON-ready)."""
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, np.float32):
+        # Shortest repr round-trips, so 83.0125 stays 83.0125 instead of 83.01250076...
+        return None if value != value else float(str(value))
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and value != value:
+            return None
+    return value
+
+
+class CategoricalColumn:
+    """Row access into a categorical column without materializing an object array."""
+
+    __slots__ = ("codes", "lookup")
+
+    def __init__(self, series: pd.Series):
+        self.codes = series.cat.codes.to_numpy()
+        # Code -1 (missing) indexes the trailing None
+        self.lookup = np.append(series.cat.categories.to_numpy(dtype=object), None)
+
+    def __getitem__(self, pos):
+        return self.lookup[self.codes[pos]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def _column_array(series: pd.Series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return CategoricalColumn(series)
+    return series.to_numpy()
+
+
+class ScripRecord(Mapping):
+    """Read-only, lazily materialized view of one scrip master row."""
+
+    __slots__ = ("_index", "_pos")
+
+    def __init__(self, index: "TokenIndex", pos: int):
+        self._index = index
+        self._pos = pos
+
+    def __getitem__(self, key: str):
+        if key == "tradingSymbol":
+            return self._index.symbols[self._pos]
+        column = self._index.columns[key]  # KeyError for unknown fields
+        return _to_python(column[self._pos])
+
+    def __iter__(self) -> Iterator[str]:
+        yield "tradingSymbol"
+        yield from self._index.columns
+
+    def __len__(self) -> int:
+        return len(self._index.columns) + 1
+
+    @property
+    def position(self) -> int:
+        return self._pos
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"ScripRecord({self.to_dict()!r})"
+
+
+class TokenIndex:
+    """(token, segment) -> row position over the shared column arrays."""
+
+    def __init__(self, scrip_data: pd.DataFrame):
+        self.symbols = scrip_data.index.to_numpy(dtype=object)
+        self.columns: Dict[str, np.ndarray] = {
+            col: _column_array(scrip_data[col]) for col in scrip_data.columns
+        }
+        self._segment_codes: Dict[str, int] = {}
+        self._positions: Dict[int, int] = {}
+        self._fallback: Dict[Tuple[str, str], int] = {}  # non-numeric tokens (e.g. index names)
+
+        if scrip_data.empty:
+            return
+
+        segments = scrip_data["exchangeSegment"].astype(str).str.lower()
+        seg_codes, seg_uniques = pd.factorize(segments)
+        if len(seg_uniques) > SEGMENT_SLOTS:
+            raise ValueError(f"Too many exchange segments for token index: {len(seg_uniques)}")
+        self._segment_codes = {seg: code for code, seg in enumerate(seg_uniques)}
+
+        tokens = pd.to_numeric(scrip_data["instrumentToken"], errors="coerce")
+        numeric = tokens.notna().to_numpy() & (tokens.to_numpy(dtype=float) % 1 == 0)
+        positions = np.arange(len(scrip_data))
+
+        keys = tokens.to_numpy(dtype=float)[numeric].astype(np.int64) * SEGMENT_SLOTS + seg_codes[numeric]
+        self._positions = dict(zip(keys.tolist(), positions[numeric].tolist()))
+
+        if not numeric.all():
+            raw_tokens = scrip_data["instrumentToken"].astype(str).to_numpy()[~numeric]
+            self._fallback = dict(zip(zip(raw_tokens.tolist(), segments.to_numpy()[~numeric].tolist()),
+                                      positions[~numeric].tolist()))
+
+    def __len__(self) -> int:
+        return len(self._positions) + len(self._fallback)
+
+    def position(self, token, segment) -> Optional[int]:
+        """Row position for (token, segment), or None."""
+        segment = str(segment).lower()
+        code = self._segment_codes.get(segment)
+        if code is None:
+            return None
+        try:
+            return self._positions.get(int(token) * SEGMENT_SLOTS + code)
+        except (TypeError, ValueError):
+            return self._fallback.get((str(token), segment))
+
+    def get(self, token, segment) -> Optional[ScripRecord]:
+        pos = self.position(token, segment)
+        if pos is None:
+            return None
+        return ScripRecord(self, pos)
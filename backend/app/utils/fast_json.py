@@ -0,0 +1,35 @@
+"""
+JSON encoding for market-data fan-out.
+
+Uses orjson (a requirements.txt dependency, several times faster than the
+stdlib for tick-shaped dicts); without it, e.g. in a bare dev environment,
+it falls back to json and logs a warning. Both produce compact
+text, so pre-encoded fragments can be spliced into larger messages with
+encode_array instead of re-encoding the objects.
+"""
+
+import json
+
+from app.core.logger import logger
+
+try:
+    import orjson
+except ImportError:  # listed in requirements.txt; fallback keeps bare environments working
+    orjson = None
+    logger.warning("⚠️  orjson not installed; market-data fan-out uses the slower stdlib json encoder")
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        # Scrip master values can be numpy scalars
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+else:
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+def encode_array(parts) -> str:
+    """JSON array text from already-encoded elements."""
+    return "[" + ",".join(parts) + "]"
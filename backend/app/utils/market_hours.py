@@ -1,9 +1,187 @@
-from datetime import datetime, time
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import time as time_module
 import pytz
 
+from app.core.logger import logger
+
 # IST Timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+# Regular market timings per segment type (IST)
+SEGMENT_TIMINGS = {
+    "CM": (time(9, 15), time(15, 30)),
+    "FO": (time(9, 15), time(15, 30)),
+    "CD": (time(9, 0), time(17, 0)),
+    "MCX": (time(9, 0), time(23, 30))
+}
+
+# Local holiday / special-session calendar
+CALENDAR_PATH = Path(__file__).parent.parent.parent / "data" / "market_calendar.json"
+
+# How far ahead to look for the next open/close transition
+TRANSITION_LOOKAHEAD_DAYS = 14
+
+
+def segment_type(segment: str) -> str:
+    """Segment string (nse_cm, NSE_FO, cde_fo, mcx_fo, ...) -> timing key; defaults to CM."""
+    seg = segment.upper()
+    # Exchange prefixes first: the commodity and currency segments also end in _FO
+    return "MCX" if "MCX" in seg else "CD" if "CD" in seg else "CM" if "CM" in seg else "FO" if "FO" in seg else "CM"
+
+
+class MarketSessionEngine:
+    """
+    Exchange session calendar with cached session state.
+
+    Open/close transitions per segment type are precomputed from the regular
+    timings plus the local holiday / special-session calendar. The current
+    state is held in memory and flipped by a timer scheduled at the next
+    transition, so get() is a dict lookup that never reads the clock.
+    Without a running timer (scripts, tests) state is refreshed lazily when
+    the precomputed transition time has passed.
+    """
+
+    def __init__(self, calendar_path: Path = CALENDAR_PATH):
+        self.calendar_path = calendar_path
+        # (segment type, date) -> closed all day
+        self._holidays: Dict[Tuple[str, date], str] = {}
+        # (segment type, date) -> extra open windows
+        self._special: Dict[Tuple[str, date], List[Tuple[time, time]]] = {}
+
+        self._open: Dict[str, bool] = {}
+        self._info: Dict[str, dict] = {}            # segment string -> session info
+        self._valid_until: float = 0.0              # epoch seconds of the next transition
+        self._next_transition: Optional[datetime] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.load_calendar()
+
+    # --- calendar ---
+
+    def load_calendar(self):
+        """(Re)load holidays and special sessions from the calendar file."""
+        self._holidays.clear()
+        self._special.clear()
+
+        if not self.calendar_path.exists():
+            logger.warning(f"⚠️  Market calendar not found at {self.calendar_path}; using regular timings only")
+        else:
+            with open(self.calendar_path) as f:
+                calendar = json.load(f)
+
+            for entry in calendar.get("holidays", []):
+                day = date.fromisoformat(entry["date"])
+                for seg_type in entry.get("segments") or SEGMENT_TIMINGS:
+                    self._holidays[(seg_type, day)] = entry.get("description", "Holiday")
+
+            for entry in calendar.get("special_sessions", []):
+                day = date.fromisoformat(entry["date"])
+                window = (time.fromisoformat(entry["open"]), time.fromisoformat(entry["close"]))
+                for seg_type in entry.get("segments") or SEGMENT_TIMINGS:
+                    self._special.setdefault((seg_type, day), []).append(window)
+
+            logger.info(f"📅 Market calendar loaded: {len(calendar.get('holidays', []))} holidays, "
+                        f"{len(calendar.get('special_sessions', []))} special sessions")
+
+        self._valid_until = 0.0  # force recompute
+
+    def windows(self, seg_type: str, day: date) -> List[Tuple[time, time]]:
+        """Open windows for a segment type on a date (regular session + special sessions)."""
+        windows = []
+        if day.weekday() < 5 and (seg_type, day) not in self._holidays:
+            windows.append(SEGMENT_TIMINGS[seg_type])
+        windows.extend(self._special.get((seg_type, day), ()))
+        return windows
+
+    def is_holiday(self, segment: str, day: date) -> bool:
+        return (segment_type(segment), day) in self._holidays
+
+    # --- state ---
+
+    def _is_open_at(self, seg_type: str, now: datetime) -> bool:
+        current = now.time()
+        return any(start <= current <= end for start, end in self.windows(seg_type, now.date()))
+
+    def _next_transition_after(self, seg_type: str, now: datetime) -> datetime:
+        for offset in range(TRANSITION_LOOKAHEAD_DAYS):
+            day = now.date() + timedelta(days=offset)
+            candidates = []
+            for start, end in self.windows(seg_type, day):
+                candidates.append(IST.localize(datetime.combine(day, start)))
+                # Close is inclusive (start <= t <= end): state flips just after it
+                candidates.append(IST.localize(datetime.combine(day, end)) + timedelta(seconds=1))
+            upcoming = [c for c in candidates if c > now]
+            if upcoming:
+                return min(upcoming)
+        return now + timedelta(days=1)  # nothing scheduled: re-check tomorrow
+
+    def refresh(self, now: Optional[datetime] = None):
+        """Recompute every segment's state and the next transition."""
+        now = now or datetime.now(IST)
+        self._open = {seg_type: self._is_open_at(seg_type, now) for seg_type in SEGMENT_TIMINGS}
+        self._next_transition = min(self._next_transition_after(seg_type, now) for seg_type in SEGMENT_TIMINGS)
+        self._valid_until = self._next_transition.timestamp()
+        # Rebuild (not mutate) cached answers so earlier readers keep a consistent dict
+        self._info = {segment: self._build_info(segment) for segment in self._info}
+
+    def _build_info(self, segment: str) -> dict:
+        is_open = self._open[segment_type(segment)]
+        return {
+            "status": "OPEN" if is_open else "CLOSED",
+            "is_amo": not is_open,
+            "segment": segment
+        }
+
+    def get(self, segment: str) -> dict:
+        """Session info for a segment: O(1), no clock access while the timer runs."""
+        if self._timer is None and time_module.time() >= self._valid_until:
+            self.refresh()
+        info = self._info.get(segment)
+        if info is None:
+            info = self._info[segment] = self._build_info(segment)
+        return info
+
+    # --- timers ---
+
+    def start(self):
+        """Compute the current state and flip it on a timer at each transition."""
+        self.refresh()
+        self._schedule()
+        logger.info(f"📅 Market session engine started; next transition at {self._next_transition.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule(self):
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, self._valid_until - time_module.time())
+        self._timer = loop.call_later(delay, self._on_transition)
+
+    def _on_transition(self):
+        before = dict(self._open)
+        # call_later may fire marginally early; never evaluate before the transition itself
+        self.refresh(max(datetime.now(IST), self._next_transition))
+        for seg_type, is_open in self._open.items():
+            if before.get(seg_type) != is_open:
+                logger.info(f"🔔 {seg_type} session {'OPEN' if is_open else 'CLOSED'}")
+        self._schedule()
+
+    def summary(self) -> dict:
+        return {
+            "segments": {seg_type: "OPEN" if is_open else "CLOSED" for seg_type, is_open in self._open.items()},
+            "nextTransition": self._next_transition.isoformat() if self._next_transition else None,
+        }
+
+
+market_sessions = MarketSessionEngine()
+
+
 def get_market_session_info(segment: str):
     """
     Returns market session status strictly based on exchange rules.
@@ -11,7 +189,10 @@ def get_market_session_info(segment: str):
     - F&O (NSE_FO, BSE_FO): 9:15 AM - 3:30 PM
     - Currency (CDE_FO): 9:00 AM - 5:00 PM
     - MCX: 9:00 AM - 11:30 PM
-    
+    Weekends and calendar holidays are CLOSED; special sessions open extra windows.
+
+    Served from the session engine's cached state (treat the dict as read-only).
+
     Returns:
     {
         "status": "OPEN" | "CLOSED",
@@ -19,32 +200,4 @@ def get_market_session_info(segment: str):
         "segment": str
     }
     """
-    now = datetime.now(IST)
-    current_time = now.time()
-    weekday = now.weekday() # 0 = Monday, 6 = Sunday
-    
-    # Weekends - All markets CLOSED
-    if weekday >= 5:
-        return {"status": "CLOSED", "is_amo": True, "segment": segment}
-    
-    seg = segment.upper()
-    
-    # Market timings
-    timings = {
-        "CM": (time(9, 15), time(15, 30)),
-        "FO": (time(9, 15), time(15, 30)),
-        "CD": (time(9, 0), time(17, 0)),
-        "MCX": (time(9, 0), time(23, 30))
-    }
-    
-    # Default to CM/FO timing if segment not found
-    seg_type = "CM" if "CM" in seg else "FO" if "FO" in seg else "CD" if "CD" in seg else "MCX" if "MCX" in seg else "CM"
-    start, end = timings.get(seg_type)
-    
-    is_open = start <= current_time <= end
-    
-    return {
-        "status": "OPEN" if is_open else "CLOSED",
-        "is_amo": not is_open,
-        "segment": segment
-    }
+    return market_sessions.get(segment)
@@ -0,0 +1,179 @@
+"""
+Streaming tick-to-candle aggregator.
+
+Every normalized HSM tick updates 1s / 1m / 5m / 15m OHLCV bars of its
+instrument. Each (instrument, interval) series lives in a fixed-size ring
+of typed arrays (CANDLES_PER_INTERVAL bars), so memory per instrument is
+constant and a new bar just overwrites the oldest slot.
+
+Bars are aligned to the interval on the tick timestamp (epoch seconds; IST
+is UTC+5:30, so bars up to 15m start on IST clock boundaries, the 9:15
+open included). Tick volume is the cumulative day volume, so a bar's
+volume is the increase seen while it was current.
+
+The HSM client feeds the aggregator before broadcasting a batch, so the
+current bars already include the batch when the hub streams them (type
+"candle" messages) and /historical/{symbol}/intraday serves history from
+memory.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+INTERVALS: Dict[str, int] = {"1s": 1, "1m": 60, "5m": 300, "15m": 900}
+
+# Ring sizes: 5 minutes of 1s bars, a full 375-minute equity session of 1m bars
+CANDLES_PER_INTERVAL: Dict[str, int] = {"1s": 300, "1m": 375, "5m": 75, "15m": 25}
+
+# Instruments kept; the least recently updated one without candle
+# subscribers is dropped beyond this
+MAX_INSTRUMENTS = 1000
+
+
+class CandleSeries:
+    """Fixed-size ring of OHLCV bars for one instrument and interval."""
+
+    __slots__ = ("seconds", "size", "times", "opens", "highs", "lows", "closes", "volumes", "head", "count")
+
+    def __init__(self, seconds: int, size: int):
+        self.seconds = seconds
+        self.size = size
+        self.times = array('q', bytes(8 * size))
+        self.opens = array('d', bytes(8 * size))
+        self.highs = array('d', bytes(8 * size))
+        self.lows = array('d', bytes(8 * size))
+        self.closes = array('d', bytes(8 * size))
+        self.volumes = array('q', bytes(8 * size))
+        self.head = -1   # slot of the current bar
+        self.count = 0
+
+    def update(self, timestamp: int, price: float, volume: int):
+        """Apply a trade at price with volume traded since the previous tick."""
+        bar_time = timestamp - timestamp % self.seconds
+        head = self.head
+        if head >= 0 and self.times[head] == bar_time:
+            if price > self.highs[head]:
+                self.highs[head] = price
+            if price < self.lows[head]:
+                self.lows[head] = price
+            self.closes[head] = price
+            self.volumes[head] += volume
+            return
+        if head >= 0 and bar_time < self.times[head]:
+            return  # late tick for a bar already closed
+
+        head = self.head = (head + 1) % self.size
+        self.times[head] = bar_time
+        self.opens[head] = self.highs[head] = self.lows[head] = self.closes[head] = price
+        self.volumes[head] = volume
+        if self.count < self.size:
+            self.count += 1
+
+    def _bar(self, slot: int) -> dict:
+        return {
+            "time": self.times[slot],
+            "open": self.opens[slot],
+            "high": self.highs[slot],
+            "low": self.lows[slot],
+            "close": self.closes[slot],
+            "volume": self.volumes[slot],
+        }
+
+    def current(self) -> Optional[dict]:
+        return self._bar(self.head) if self.head >= 0 else None
+
+    def bars(self, limit: Optional[int] = None) -> List[dict]:
+        """Oldest to newest (at most limit of the newest)."""
+        n = self.count if limit is None else max(0, min(limit, self.count))
+        return [self._bar((self.head - i) % self.size) for i in range(n - 1, -1, -1)]
+
+
+class InstrumentCandles:
+    """All interval series of one instrument plus its last cumulative volume."""
+
+    __slots__ = ("series", "last_volume")
+
+    def __init__(self):
+        self.series = {name: CandleSeries(seconds, CANDLES_PER_INTERVAL[name])
+                       for name, seconds in INTERVALS.items()}
+        self.last_volume: Optional[int] = None
+
+    def apply(self, timestamp: int, price: float, day_volume: int):
+        last = self.last_volume
+        traded = day_volume - last if last is not None and day_volume > last else 0
+        self.last_volume = day_volume
+        for series in self.series.values():
+            series.update(timestamp, price, traded)
+
+
+class CandleAggregator:
+    """symbol -> InstrumentCandles for every instrument on the HSM stream."""
+
+    def __init__(self, max_instruments: int = MAX_INSTRUMENTS):
+        self.max_instruments = max_instruments
+        self.instruments: "OrderedDict[str, InstrumentCandles]" = OrderedDict()
+        self._pins: Dict[str, int] = {}   # symbol -> live candle subscriptions
+        self.ticks = 0
+
+    def __len__(self) -> int:
+        return len(self.instruments)
+
+    def update(self, batch: Iterable[dict]):
+        instruments = self.instruments
+        for tick in batch:
+            price = tick.get('ltp')
+            if not price or price <= 0:
+                continue
+            symbol = tick['symbol']
+            candles = instruments.get(symbol)
+            if candles is None:
+                candles = instruments[symbol] = InstrumentCandles()
+                if len(instruments) > self.max_instruments:
+                    self._evict()
+            else:
+                instruments.move_to_end(symbol)
+            candles.apply(int(tick.get('timestamp') or 0), price, int(tick.get('volume') or 0))
+            self.ticks += 1
+
+    def pin(self, symbol: str):
+        """A client subscribed to bars of symbol: keep its series from eviction."""
+        self._pins[symbol] = self._pins.get(symbol, 0) + 1
+
+    def unpin(self, symbol: str):
+        count = self._pins.get(symbol, 0) - 1
+        if count > 0:
+            self._pins[symbol] = count
+            return
+        self._pins.pop(symbol, None)
+        if len(self.instruments) > self.max_instruments:
+            self._evict()
+
+    def _evict(self):
+        """Drop the least recently updated unpinned instruments down to max_instruments."""
+        instruments = self.instruments
+        excess = len(instruments) - self.max_instruments
+        victims = []
+        for symbol in instruments:
+            if len(victims) >= excess:
+                break
+            if symbol not in self._pins:
+                victims.append(symbol)
+        for symbol in victims:
+            del instruments[symbol]
+
+    def series(self, symbol: str, interval: str) -> Optional[CandleSeries]:
+        candles = self.instruments.get(symbol)
+        return candles.series.get(interval) if candles is not None else None
+
+    def current(self, symbol: str, interval: str) -> Optional[dict]:
+        series = self.series(symbol, interval)
+        return series.current() if series is not None else None
+
+    def history(self, symbol: str, interval: str, limit: Optional[int] = None) -> List[dict]:
+        series = self.series(symbol, interval)
+        return series.bars(limit) if series is not None else []
+
+
+# Singleton for the app lifetime
+candle_aggregator = CandleAggregator()
@@ -0,0 +1,215 @@
+"""
+Per-client websocket writer.
+
+Broadcasting must never wait on a browser: the HSM listener only drops the
+latest tick per symbol into each subscriber's pending slots and moves on.
+Every frontend connection has its own writer task that drains those slots
+and does the actual sends. A symbol that updates again before the writer
+got to it is conflated (latest value wins), so a slow consumer receives
+fewer, fresher updates instead of stalling everyone else. Pending slots are
+bounded; an update for a new symbol beyond MAX_PENDING_SYMBOLS is dropped.
+
+Control messages (errors, acknowledgements) go through the same writer so
+a socket only ever has one sender.
+
+Ticks and order books arrive already encoded: the broadcaster serializes
+each update once for all of its subscribers, and the writer only splices
+those JSON fragments into its message.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from fastapi import WebSocket
+
+from app.core.logger import logger
+from app.utils.fast_json import dumps, encode_array
+
+MAX_PENDING_SYMBOLS = 500
+MAX_PENDING_CONTROL = 100
+STOP_TIMEOUT_SECONDS = 5.0
+
+
+class ClientWriter:
+    """Bounded latest-value-wins outbound queue plus writer task for one frontend socket."""
+
+    # Wire protocol version; writers for other versions (delta_protocol.py)
+    # take the raw tick dicts instead of the shared encoding
+    protocol = 1
+    format = "json"
+    raw_ticks = False
+
+    def __init__(self, websocket: WebSocket, client_id: int, on_dead: Callable[[WebSocket], None]):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.on_dead = on_dead
+        self.connected_at = time.time()
+
+        self._ticks: Dict[str, str] = {}        # symbol -> latest tick (encoded JSON)
+        self._depth: Dict[str, str] = {}        # symbol -> latest order book (encoded JSON)
+        self._candles: Dict[tuple, str] = {}    # (symbol, interval, bar time) -> latest bar (encoded JSON)
+        self._control: Deque[dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Counters
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.ticks_sent = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        self.closed = True
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def wait_closed(self):
+        """Wait until the writer task has stopped (after close())."""
+        task = self._task
+        if task is not None and task is not asyncio.current_task():
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def stop(self):
+        """
+        Stop the writer task without losing messages: a flush in progress
+        finishes, and whatever is still queued stays for take_over(). A client
+        that does not drain within STOP_TIMEOUT_SECONDS is cancelled instead.
+        """
+        self.closed = True
+        task = self._task
+        if task is None or task is asyncio.current_task():
+            return
+        self._wakeup.set()
+        done, _ = await asyncio.wait({task}, timeout=STOP_TIMEOUT_SECONDS)
+        if not done:
+            task.cancel()
+            await self.wait_closed()
+
+    # --- producers (never block) ---
+
+    @property
+    def pending(self) -> int:
+        return len(self._ticks) + len(self._depth) + len(self._candles)
+
+    def _offer(self, slots: Dict, symbol, payload: str):
+        if symbol in slots:
+            self.conflated += 1
+        elif self.pending >= MAX_PENDING_SYMBOLS:
+            self.dropped += 1
+            return
+        slots[symbol] = payload
+        self._wakeup.set()
+
+    def offer_tick(self, symbol: str, tick: str):
+        """Queue an encoded tick (see fast_json.dumps)."""
+        self._offer(self._ticks, symbol, tick)
+
+    def offer_depth(self, symbol: str, depth: str):
+        """Queue an encoded order book."""
+        self._offer(self._depth, symbol, depth)
+
+    def offer_candle(self, key: tuple, candle: str):
+        """Queue an encoded bar; keyed by bar time too, so a closing bar is not conflated away."""
+        self._offer(self._candles, key, candle)
+
+    def forget(self, symbol: str):
+        """Client unsubscribed: drop its pending tick."""
+        self._ticks.pop(symbol, None)
+
+    def take_over(self, previous: "ClientWriter"):
+        """
+        Replace a stopped writer on the same socket (protocol switch): move its
+        queued control messages, order books and bars here and keep its
+        counters. Pending ticks are dropped, since they are encoded for the old
+        protocol; the caller re-offers the latest ones in this writer's format.
+        """
+        self.connected_at = previous.connected_at
+        self._control.extend(previous._control)
+        self._depth.update(previous._depth)
+        self._candles.update(previous._candles)
+        previous._control.clear()
+        previous._ticks.clear()
+        previous._depth.clear()
+        previous._candles.clear()
+
+        self.messages_sent = previous.messages_sent
+        self.bytes_sent = previous.bytes_sent
+        self.ticks_sent = previous.ticks_sent
+        self.conflated = previous.conflated
+        self.dropped = previous.dropped
+        if self._control or self.pending:
+            self._wakeup.set()
+
+    def send_control(self, message: dict):
+        if len(self._control) >= MAX_PENDING_CONTROL:
+            self.dropped += 1
+            return
+        self._control.append(message)
+        self._wakeup.set()
+
+    # --- writer task ---
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                if self.closed:
+                    break
+                self._wakeup.clear()
+                await self._flush()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Frontend client {self.client_id} send failed, dropping: {e}")
+            self.closed = True
+            self.on_dead(self.websocket)
+
+    async def _flush(self):
+        while self._control:
+            await self._send(dumps(self._control.popleft()))
+
+        if self._ticks:
+            ticks, self._ticks = self._ticks, {}
+            await self._flush_ticks(ticks)
+
+        if self._depth:
+            books, self._depth = self._depth, {}
+            for book in books.values():
+                await self._send(book)
+
+        if self._candles:
+            candles, self._candles = self._candles, {}
+            for candle in candles.values():
+                await self._send(candle)
+
+    async def _flush_ticks(self, ticks: Dict[str, str]):
+        batch = list(ticks.values())
+        # One message per flush: a single tick object, or an array of them
+        await self._send(batch[0] if len(batch) == 1 else encode_array(batch))
+        self.ticks_sent += len(batch)
+
+    async def _send(self, text: str):
+        await self.websocket.send_text(text)
+        self.messages_sent += 1
+        self.bytes_sent += len(text)
+
+    def stats(self) -> dict:
+        return {
+            "clientId": self.client_id,
+            "connectedAt": self.connected_at,
+            "protocol": self.protocol,
+            "pendingSymbols": self.pending,
+            "pendingControl": len(self._control),
+            "messagesSent": self.messages_sent,
+            "bytesSent": self.bytes_sent,
+            "ticksSent": self.ticks_sent,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+        }
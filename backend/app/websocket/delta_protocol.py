@@ -0,0 +1,120 @@
+"""
+Compact delta wire protocol (version 2) for /ws/market-data.
+
+Protocol 1 sends every standardized tick in full. A client opts in to
+version 2 with
+
+    {"action": "protocol", "version": 2, "format": "json" | "msgpack"}
+
+and the server answers {"type": "protocol", "version": 2, "format": ...}.
+A request the server cannot honour (unknown version or format, or msgpack
+without the msgpack package) is answered with an error message and the
+connection keeps its current protocol.
+From then on ticks arrive as:
+
+    {"type": "meta", "instruments": [{"id": 1, "symbol": ..., "displayName": ...,
+                                      "instrumentType": ..., "exchange": ...}]}
+        once per subscription, before the instrument's first update
+
+    {"type": "delta", "ticks": [[1, {"ltp": 101.5, "volume": 120300}], ...]}
+        only the fields that changed since the last update this client got
+        (the first update of a subscription carries all of them)
+
+Ids are per connection and never reused. In msgpack mode meta and delta
+messages go out as binary frames; depth, candle and control messages
+stay JSON text in both formats.
+"""
+
+from typing import Dict, List
+
+from app.utils.fast_json import dumps
+from app.websocket.client_writer import ClientWriter
+
+try:
+    import msgpack
+except ImportError:  # listed in requirements.txt; without it msgpack requests are refused
+    msgpack = None
+
+PROTOCOL_VERSION = 2
+FORMATS = ("json", "msgpack")
+
+# Sent once per subscription in the meta message, never in deltas
+STATIC_FIELDS = ("symbol", "displayName", "instrumentType", "exchange")
+
+_MISSING = object()
+
+
+def negotiate(version, fmt) -> tuple:
+    """(version, format) the server will speak; ValueError says why a request is refused."""
+    if version in (1, "1"):
+        return 1, "json"
+    if version not in (PROTOCOL_VERSION, str(PROTOCOL_VERSION)):
+        raise ValueError(f"Unsupported protocol version: {version}")
+    fmt = fmt or "json"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported protocol format: {fmt}")
+    if fmt == "msgpack" and msgpack is None:
+        raise ValueError("msgpack format is not available on this server")
+    return PROTOCOL_VERSION, fmt
+
+
+class DeltaClientWriter(ClientWriter):
+    """ClientWriter speaking protocol 2: per-client ids, metadata once, changed fields only."""
+
+    protocol = PROTOCOL_VERSION
+    raw_ticks = True
+
+    def __init__(self, websocket, client_id: int, on_dead, fmt: str = "json"):
+        super().__init__(websocket, client_id, on_dead)
+        self.format = fmt
+        self._ids: Dict[str, int] = {}
+        self._next_id = 1
+        # symbol -> field values as last sent to this client
+        self._sent: Dict[str, dict] = {}
+        self.fields_sent = 0
+
+    def forget(self, symbol: str):
+        """Unsubscribed: a later subscription gets a new id and its metadata again."""
+        super().forget(symbol)
+        self._ids.pop(symbol, None)
+        self._sent.pop(symbol, None)
+
+    async def _flush_ticks(self, ticks: Dict[str, dict]):
+        meta: List[dict] = []
+        deltas: List[list] = []
+        for symbol, tick in ticks.items():
+            tick_id = self._ids.get(symbol)
+            if tick_id is None:
+                tick_id = self._ids[symbol] = self._next_id
+                self._next_id += 1
+                meta.append({"id": tick_id, **{f: tick.get(f) for f in STATIC_FIELDS}})
+                self._sent[symbol] = {}
+
+            sent = self._sent[symbol]
+            changed = {}
+            for field, value in tick.items():
+                if field not in STATIC_FIELDS and sent.get(field, _MISSING) != value:
+                    changed[field] = value
+            if changed:
+                sent.update(changed)
+                deltas.append([tick_id, changed])
+                self.fields_sent += len(changed)
+
+        if meta:
+            await self._send_frame({"type": "meta", "instruments": meta})
+        if deltas:
+            await self._send_frame({"type": "delta", "ticks": deltas})
+        self.ticks_sent += len(deltas)
+
+    async def _send_frame(self, message: dict):
+        if self.format == "msgpack":
+            data = msgpack.packb(message)
+            await self.websocket.send_bytes(data)
+            self.messages_sent += 1
+            self.bytes_sent += len(data)
+        else:
+            await self._send(dumps(message))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "format": self.format, "instruments": len(self._ids),
+                "fieldsSent": self.fields_sent}
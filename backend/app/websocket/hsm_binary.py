@@ -0,0 +1,347 @@
+"""
+Binary HSM (Kotak Neo market data) frame decoder.
+
+Python port of the binary feed protocol implemented by hslib.js
+(HSWebSocket: buf2Long / getString / the sf/if/dp field tables).
+
+Frame layout (big-endian):
+
+    [2] packet size  [1] response type  [...] body
+
+CONNECTION body (the server's answer to the handshake):
+
+    [1] field count, per field: [1] field id, [2] length, value
+        field 1: status "K" (ok) / "N" (not ok)
+        field 2: ack count, a big-endian integer of the given length
+
+An ack count above zero switches acknowledgements on for the connection:
+every DATA frame then carries a message number, and after every ack count
+DATA frames the client answers with an ACK frame carrying the number of
+the last one ([2] size, [1] ACK_TYPE, [1] 1 field, [1] field id 1,
+[2] 4, [4] message number), as hslib's getAcknowledgementReq does.
+
+DATA body:
+
+    [4] message number        (only when acknowledgements are enabled)
+    [2] record count
+    per record:
+        [2] (skipped)  [1] record type (SNAP=83 / UPDATE=85)  [4] topic id
+        SNAP:   [1] name length, topic name ("sf|nse_cm|11536"),
+                [1] long count, 4-byte signed longs (field id = position),
+                [1] string count, per string: [1] field id, [1] length, bytes
+        UPDATE: [1] long count, 4-byte signed longs
+
+UPDATE records only carry the topic id, so the decoder keeps per-topic state
+from the SNAP (topic name, last value of every field). TRASH_VAL marks "no
+change". Everything is read with struct.unpack_from on a memoryview of the
+received frame (an UPDATE record is a single unpack); only topic names and
+string fields are copied out.
+
+Decoded scrip and index ticks use the same dict shape as the JSON feed
+(tk, e, ltp, op, h, lo, c, v, mul, prec, ...) with raw integer prices, so
+KotakHSMClient._handle_tick normalizes them unchanged.
+"""
+
+import struct
+from typing import Dict, List, Optional
+
+# Response types (byte 2 of every frame)
+CONNECTION_TYPE = 1
+THROTTLING_TYPE = 2
+ACK_TYPE = 3
+SUBSCRIBE_TYPE = 4
+UNSUBSCRIBE_TYPE = 5
+DATA_TYPE = 6
+CHPAUSE_TYPE = 7
+CHRESUME_TYPE = 8
+SNAPSHOT_TYPE = 9
+
+# CONNECTION status values
+STATUS_OK = "K"
+STATUS_NOT_OK = "N"
+
+# Record types inside a DATA frame
+SNAP_RECORD = 83    # 'S'
+UPDATE_RECORD = 85  # 'U'
+
+# Field value meaning "not sent / unchanged"
+TRASH_VAL = -2147483648
+
+# Topic prefixes
+SCRIP_FEED = "sf"
+INDEX_FEED = "if"
+DEPTH_FEED = "dp"
+
+# Long field tables (field id = position in the record)
+SCRIP_FIELDS = {
+    0: "ftm0", 1: "dtm1", 2: "fdtm", 3: "ltt", 4: "v", 5: "ltp", 6: "ltq", 7: "tbq", 8: "tsq",
+    9: "bp", 10: "sp", 11: "bq", 12: "bs", 13: "ap", 14: "lo", 15: "h", 16: "lcl", 17: "ucl",
+    18: "yh", 19: "yl", 20: "op", 21: "c", 22: "oi", 23: "mul", 24: "prec", 25: "cng",
+    26: "nc", 27: "to",
+}
+
+# Index fields are renamed onto the scrip tick shape (iv -> ltp, ic -> c, ...)
+INDEX_FIELDS = {
+    0: "ftm0", 1: "dtm1", 2: "ltp", 3: "c", 4: "tvalue", 5: "h", 6: "lo", 7: "op",
+    8: "mul", 9: "prec", 10: "cng", 11: "nc",
+}
+
+DEPTH_FIELDS = {0: "ftm0", 1: "dtm1", 32: "mul", 33: "prec"}
+for _i, _prefix in enumerate(("bp", "sp", "bq", "bs")):
+    for _level in range(5):
+        DEPTH_FIELDS[2 + _i * 5 + _level] = _prefix if _level == 0 else f"{_prefix}{_level}"
+for _level in range(5):
+    DEPTH_FIELDS[22 + _level] = f"bno{_level + 1}"
+    DEPTH_FIELDS[27 + _level] = f"sno{_level + 1}"
+
+# String fields (shared by all feeds)
+STRING_FIELDS = {51: "name", 52: "tk", 53: "e", 54: "ts"}
+
+FIELD_TABLES = {SCRIP_FEED: SCRIP_FIELDS, INDEX_FEED: INDEX_FIELDS, DEPTH_FEED: DEPTH_FIELDS}
+
+_U8 = struct.Struct(">B")
+_I16 = struct.Struct(">H")
+_I32 = struct.Struct(">i")
+_HEADER = struct.Struct(">HB")          # packet size, response type
+_RECORD_HEAD = struct.Struct(">2xBi")   # skipped 2 bytes, record type, topic id
+
+# Offsets inside a record
+_RECORD_TYPE_OFFSET = 2
+_UPDATE_COUNT_OFFSET = 7
+
+# Counts are a single byte, so every record shape is precompiled
+_UNPACK_LONGS = [struct.Struct(f">{n}i").unpack_from for n in range(256)]
+_UNPACK_UPDATE = [struct.Struct(f">3xix{n}i").unpack_from for n in range(256)]  # (topic id, *longs)
+
+
+def _field_names(table: Dict[int, str]):
+    """Names indexed by field id, offset by one so slot 0 lines up with the topic id."""
+    names = [None] * (max(table) + 2)
+    for fid, name in table.items():
+        names[fid + 1] = name
+    return tuple(names)
+
+
+_FIELD_NAMES = {feed: _field_names(table) for feed, table in FIELD_TABLES.items()}
+
+
+class HSMDecodeError(ValueError):
+    """Malformed or truncated binary HSM frame."""
+
+
+class HSMTopic:
+    """
+    Per-topic state: identity from the SNAP record plus the tick itself, which
+    holds the last value of every field and is updated in place.
+    """
+
+    __slots__ = ("topic_id", "feed", "exchange", "token", "names", "tick")
+
+    def __init__(self, topic_id: int, name: str):
+        self.topic_id = topic_id
+        parts = name.split("|")
+        self.feed = parts[0]
+        self.exchange = parts[1] if len(parts) > 1 else None
+        self.token = parts[2] if len(parts) > 2 else None
+        self.names = _FIELD_NAMES.get(self.feed, _FIELD_NAMES[SCRIP_FEED])
+        self.tick = {"tk": self.token, "e": self.exchange, "feed": self.feed}
+
+
+class HSMFrameDecoder:
+    """
+    Stateful decoder for one HSM connection (topic ids are per connection).
+
+    decode() returns the ticks carried by a frame; control frames return [].
+    Each tick is the topic's live state dict (all fields seen so far), updated
+    in place by later frames: consume it before the next decode() or copy it.
+
+    The CONNECTION frame sets the ack count. While acks are enabled,
+    take_ack() returns the message number to acknowledge once every
+    ack_every DATA frames (None otherwise).
+    """
+
+    def __init__(self, ack_every: int = 0):
+        self.topics: Dict[int, HSMTopic] = {}
+        self.last_type: Optional[int] = None
+        self.last_message_number: Optional[int] = None
+        self.connection_status: Optional[str] = None
+        self._set_ack_every(ack_every)
+
+    def _set_ack_every(self, ack_every: int):
+        self.ack_every = ack_every
+        self.ack_enabled = ack_every > 0
+        self._unacked = 0
+        self._pending_ack: Optional[int] = None
+
+    def reset(self):
+        """Forget topic and ack state (call on reconnect; the new CONNECTION frame sets acks again)."""
+        self.topics.clear()
+        self.connection_status = None
+        self.last_message_number = None
+        self._set_ack_every(0)
+
+    def take_ack(self) -> Optional[int]:
+        """Message number the client must acknowledge now, if any (cleared once taken)."""
+        number = self._pending_ack
+        self._pending_ack = None
+        return number
+
+    def decode(self, frame) -> List[dict]:
+        buf = memoryview(frame)
+        if len(buf) < _HEADER.size:
+            raise HSMDecodeError(f"Frame too short: {len(buf)} bytes")
+
+        _, frame_type = _HEADER.unpack_from(buf, 0)
+        self.last_type = frame_type
+        if frame_type == CONNECTION_TYPE:
+            try:
+                self._decode_connection(buf, _HEADER.size)
+            except (struct.error, IndexError, UnicodeDecodeError) as e:
+                raise HSMDecodeError(f"Truncated CONNECTION frame: {e}") from None
+            return []
+        if frame_type != DATA_TYPE:
+            return []
+
+        try:
+            return self._decode_data(buf, _HEADER.size)
+        except (struct.error, IndexError) as e:
+            raise HSMDecodeError(f"Truncated DATA frame: {e}") from None
+
+    def _decode_connection(self, buf: memoryview, pos: int):
+        field_count = buf[pos]
+        pos += 1
+        values = []
+        for _ in range(min(field_count, 2)):
+            (length,) = _I16.unpack_from(buf, pos + 1)  # field id is positional, as in hslib
+            pos += 3
+            values.append(buf[pos:pos + length])
+            pos += length
+        if not values:
+            raise HSMDecodeError("CONNECTION frame without a status field")
+        self.connection_status = str(values[0], "ascii")
+        self._set_ack_every(int.from_bytes(values[1], "big") if len(values) > 1 else 0)
+
+    def _decode_data(self, buf: memoryview, pos: int) -> List[dict]:
+        if self.ack_enabled:
+            number = self.last_message_number = _I32.unpack_from(buf, pos)[0]
+            pos += 4
+            self._unacked += 1
+            if self._unacked >= self.ack_every:
+                self._pending_ack = number
+                self._unacked = 0
+
+        (count,) = _I16.unpack_from(buf, pos)
+        pos += 2
+
+        ticks = []
+        topics = self.topics
+        for _ in range(count):
+            record_type = buf[pos + _RECORD_TYPE_OFFSET]
+
+            if record_type == UPDATE_RECORD:
+                long_count = buf[pos + _UPDATE_COUNT_OFFSET]
+                values = _UNPACK_UPDATE[long_count](buf, pos)
+                pos += _UPDATE_COUNT_OFFSET + 1 + 4 * long_count
+                topic = topics.get(values[0])
+                if topic is None:
+                    continue  # update for a topic we never saw a snapshot of
+
+            elif record_type == SNAP_RECORD:
+                _, topic_id = _RECORD_HEAD.unpack_from(buf, pos)
+                pos += _RECORD_HEAD.size
+                name_len = buf[pos]
+                pos += 1
+                topic = topics[topic_id] = HSMTopic(topic_id, str(buf[pos:pos + name_len], "utf-8"))
+                pos += name_len
+
+                long_count = buf[pos]
+                values = (topic_id,) + _UNPACK_LONGS[long_count](buf, pos + 1)
+                pos += 1 + 4 * long_count
+
+                string_count = buf[pos]
+                pos += 1
+                for _ in range(string_count):
+                    fid = buf[pos]
+                    length = buf[pos + 1]
+                    pos += 2
+                    field = STRING_FIELDS.get(fid)
+                    if field is not None:
+                        topic.tick[field] = str(buf[pos:pos + length], "utf-8")
+                    pos += length
+
+            else:
+                raise HSMDecodeError(f"Unknown record type {record_type} at offset {pos}")
+
+            # values[0] is the topic id; its name slot is None
+            tick = topic.tick
+            for name, value in zip(topic.names, values):
+                if value != TRASH_VAL and name is not None:
+                    tick[name] = value
+            ticks.append(tick)
+
+        return ticks
+
+
+# --- Encoding (used by benchmarks and local test servers) ---
+
+def _frame(frame_type: int, body: bytes) -> bytes:
+    return _HEADER.pack(len(body) + 1, frame_type) + body
+
+
+def encode_connection_frame(ok: bool = True, ack_every: int = 0) -> bytes:
+    """Server answer to the handshake; ack_every > 0 turns acknowledgements on."""
+    status = (STATUS_OK if ok else STATUS_NOT_OK).encode("ascii")
+    body = _U8.pack(1) + _I16.pack(len(status)) + status
+    if ack_every:
+        body += _U8.pack(2) + _I16.pack(4) + _I32.pack(ack_every)
+    return _frame(CONNECTION_TYPE, _U8.pack(2 if ack_every else 1) + body)
+
+
+def encode_ack_frame(message_number: int) -> bytes:
+    """Client acknowledgement of every DATA frame up to message_number (hslib getAcknowledgementReq)."""
+    return _frame(ACK_TYPE, _U8.pack(1) + _U8.pack(1) + _I16.pack(4) + _I32.pack(message_number))
+
+
+def decode_ack_frame(frame) -> Optional[int]:
+    """Message number of an ACK frame, or None for any other frame."""
+    buf = memoryview(frame)
+    if len(buf) < 11 or buf[2] != ACK_TYPE:
+        return None
+    return _I32.unpack_from(buf, 7)[0]
+
+
+def encode_snap_record(topic_id: int, topic_name: str, longs: List[int], strings: Dict[int, str]) -> bytes:
+    name = topic_name.encode("utf-8")
+    parts = [_RECORD_HEAD.pack(SNAP_RECORD, topic_id), _U8.pack(len(name)), name,
+             _U8.pack(len(longs)), struct.pack(f">{len(longs)}i", *longs), _U8.pack(len(strings))]
+    for fid, value in strings.items():
+        raw = value.encode("utf-8")
+        parts.append(_U8.pack(fid) + _U8.pack(len(raw)) + raw)
+    return b"".join(parts)
+
+
+def encode_update_record(topic_id: int, longs: List[int]) -> bytes:
+    return _RECORD_HEAD.pack(UPDATE_RECORD, topic_id) + _U8.pack(len(longs)) + struct.pack(f">{len(longs)}i", *longs)
+
+
+def encode_data_frame(records: List[bytes], message_number: Optional[int] = None) -> bytes:
+    head = b"" if message_number is None else _I32.pack(message_number)
+    return _frame(DATA_TYPE, head + _I16.pack(len(records)) + b"".join(records))
+
+
+def _longs(table: Dict[int, str], fields: dict) -> List[int]:
+    by_name = {name: fid for fid, name in table.items()}
+    longs = [TRASH_VAL] * (max(table) + 1)
+    for name, value in fields.items():
+        longs[by_name[name]] = value
+    return longs
+
+
+def scrip_longs(**fields) -> List[int]:
+    """Long field list for a scrip (sf) record; unspecified fields are TRASH_VAL."""
+    return _longs(SCRIP_FIELDS, fields)
+
+
+def depth_longs(**fields) -> List[int]:
+    """Long field list for a depth (dp) record: bp..bp4, sp..sp4, bq.., bs.., bno1..5, sno1..5, mul, prec."""
+    return _longs(DEPTH_FIELDS, fields)
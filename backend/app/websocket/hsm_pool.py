@@ -0,0 +1,346 @@
+"""
+Sharded HSM connection pool.
+
+One HSM socket carries at most INSTRUMENTS_PER_CONNECTION instruments, so
+the pool spreads subscriptions over up to HSM_MAX_CONNECTIONS supervised
+KotakHSMClient connections ("shards") opened with the same trade session.
+Inside a shard, load is spread over the 16 hslib channels.
+
+Shards are keyed by an id that is never reused, so assignments stay valid
+when a shard in the middle is closed. New instruments go to the oldest
+shard with room (fewest sockets). Each subscribe call puts its instruments
+for a shard on that shard's least loaded channel, so a batch costs one mws
+frame per MAX_SCRIPS scrips. When instruments are removed and the
+remaining load fits in fewer shards, the least loaded shard is drained
+into the others (subscribe on the target before unsubscribing on the
+source) and closed; an empty shard is closed without moving anything.
+
+A shard whose first connect fails keeps its subscriptions and retries
+with the client's reconnect backoff until it connects; meanwhile
+metrics_snapshot reports it as not running.
+
+Depth (dps) subscriptions ride on the shard and channel already carrying
+the instrument's touchline subscription and move with it on rebalance.
+
+Every shard feeds the same callbacks, so consumers see one merged tick
+stream. The pool exposes the KotakHSMClient interface the routers use
+(connect / subscribe / unsubscribe / subscribe_depth / unsubscribe_depth /
+add_callback / add_batch_callback / add_depth_callback).
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.core.logger import logger
+from app.websocket.kotak_ws_hsm import KotakHSMClient, reconnect_delay
+
+# Kotak HSM limits per socket (PHASE 2 MANDATORY)
+INSTRUMENTS_PER_CONNECTION = 200
+CHANNELS_PER_CONNECTION = 16
+
+Key = Tuple[str, str]  # (token, segment)
+
+
+def parse_scrips(scrips_str: str) -> List[Key]:
+    """ "nse_cm|11536&bse_cm|500325&" -> [("11536", "nse_cm"), ("500325", "bse_cm")] """
+    keys = []
+    for part in scrips_str.strip('&').split('&'):
+        if '|' in part:
+            seg, tk = part.split('|')
+            keys.append((str(tk), str(seg).lower()))
+    return keys
+
+
+def format_scrips(keys) -> str:
+    return "".join(f"{seg}|{tk}&" for tk, seg in keys)
+
+
+class HSMShard:
+    """One pooled HSM connection and its per-channel instrument counts."""
+
+    def __init__(self, shard_id: int, client: KotakHSMClient):
+        self.shard_id = shard_id
+        self.client = client
+        self.channel_load: Dict[int, int] = {channel: 0 for channel in range(1, CHANNELS_PER_CONNECTION + 1)}
+        self.connect_task: Optional[asyncio.Task] = None  # connect retry after a failed first connect
+
+    @property
+    def retrying(self) -> bool:
+        return self.connect_task is not None and not self.connect_task.done()
+
+    @property
+    def load(self) -> int:
+        return sum(self.channel_load.values())
+
+    def least_loaded_channel(self) -> int:
+        return min(self.channel_load, key=lambda channel: (self.channel_load[channel], channel))
+
+
+class HSMPool:
+    """Sharded, channel-balanced set of HSM connections with one merged tick stream."""
+
+    def __init__(self, max_connections: Optional[int] = None):
+        self.max_connections = max_connections or get_settings().HSM_MAX_CONNECTIONS
+        self.shards: Dict[int, HSMShard] = {}   # shard id -> shard, oldest first
+        self._next_shard_id = 0
+        # (token, segment) -> (shard id, channel)
+        self.assignments: Dict[Key, Tuple[int, int]] = {}
+
+        self.session_token = None
+        self.sid = None
+        self._callbacks: List[Callable] = []
+        self._batch_callbacks: List[Callable] = []
+        self._depth_callbacks: List[Callable] = []
+        self._lock = asyncio.Lock()
+
+    # --- KotakHSMClient-compatible surface ---
+
+    @property
+    def capacity(self) -> int:
+        return self.max_connections * INSTRUMENTS_PER_CONNECTION
+
+    @property
+    def connected(self) -> bool:
+        return any(shard.client.connected for shard in self.shards.values())
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.shards) and all(shard.client.is_running for shard in self.shards.values())
+
+    def add_callback(self, cb: Callable):
+        self._callbacks.append(cb)
+        for shard in self.shards.values():
+            shard.client.add_callback(cb)
+
+    def add_batch_callback(self, cb: Callable):
+        self._batch_callbacks.append(cb)
+        for shard in self.shards.values():
+            shard.client.add_batch_callback(cb)
+
+    def add_depth_callback(self, cb: Callable):
+        self._depth_callbacks.append(cb)
+        for shard in self.shards.values():
+            shard.client.add_depth_callback(cb)
+
+    async def connect(self, session_token: str, sid: str):
+        """Connect every shard (at least one) with the trade session; raises if none connects."""
+        self.session_token = session_token
+        self.sid = sid
+        if not self.shards:
+            self._new_shard()
+
+        failed = []
+        for shard in self.shards.values():
+            if not shard.client.is_running and not shard.retrying:
+                try:
+                    await shard.client.connect(session_token, sid)
+                except Exception as e:
+                    failed.append((shard, e))
+        if failed and not self.connected:
+            raise failed[0][1]
+        for shard, _ in failed:
+            self._retry_connect(shard)
+        logger.info(f"✅ HSM pool connected: {len(self.shards)} connection(s), {len(self.assignments)} instruments")
+
+    async def subscribe(self, scrips_str: str) -> List[Key]:
+        """
+        Place new instruments on a shard/channel and subscribe them there.
+        Returns the keys that did not fit in the pool's capacity.
+        """
+        rejected: List[Key] = []
+        async with self._lock:
+            groups: Dict[Tuple[int, int], List[Key]] = {}
+            batch_channels: Dict[int, int] = {}
+            for key in parse_scrips(scrips_str):
+                if key in self.assignments:
+                    continue
+                placement = self._place(key, batch_channels)
+                if placement is None:
+                    rejected.append(key)
+                    continue
+                groups.setdefault(placement, []).append(key)
+
+            for (shard_id, channel), keys in groups.items():
+                shard = self.shards[shard_id]
+                await self._ensure_running(shard)
+                await shard.client.subscribe(format_scrips(keys), channel)
+
+        if rejected:
+            logger.warning(f"Rejected HSM subscription: reason=POOL_CAPACITY_REACHED, limit={self.capacity}, "
+                           f"scrips={format_scrips(rejected)}")
+        return rejected
+
+    async def unsubscribe(self, scrips_str: str):
+        """Unsubscribe instruments upstream, then rebalance shards if the load allows."""
+        async with self._lock:
+            groups: Dict[Tuple[int, int], List[Key]] = {}
+            for key in parse_scrips(scrips_str):
+                placement = self.assignments.pop(key, None)
+                if placement is None:
+                    continue
+                shard_id, channel = placement
+                self.shards[shard_id].channel_load[channel] -= 1
+                groups.setdefault(placement, []).append(key)
+
+            for (shard_id, channel), keys in groups.items():
+                await self.shards[shard_id].client.unsubscribe(format_scrips(keys), channel)
+
+            if groups:
+                await self._rebalance()
+
+    async def subscribe_depth(self, scrips_str: str) -> List[Key]:
+        """Subscribe depth on the shard/channel of each instrument; returns keys not subscribed (mws) here."""
+        return await self._depth_request(scrips_str, subscribe=True)
+
+    async def unsubscribe_depth(self, scrips_str: str):
+        await self._depth_request(scrips_str, subscribe=False)
+
+    async def _depth_request(self, scrips_str: str, subscribe: bool) -> List[Key]:
+        missing: List[Key] = []
+        async with self._lock:
+            groups: Dict[Tuple[int, int], List[Key]] = {}
+            for key in parse_scrips(scrips_str):
+                placement = self.assignments.get(key)
+                if placement is None:
+                    missing.append(key)
+                    continue
+                groups.setdefault(placement, []).append(key)
+
+            for (shard_id, channel), keys in groups.items():
+                client = self.shards[shard_id].client
+                if subscribe:
+                    await client.subscribe_depth(format_scrips(keys), channel)
+                else:
+                    await client.unsubscribe_depth(format_scrips(keys), channel)
+        return missing
+
+    async def disconnect(self):
+        for shard in self.shards.values():
+            self._cancel_retry(shard)
+            await shard.client.disconnect()
+        self.shards.clear()
+        self.assignments.clear()
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            "connected": self.connected,
+            "running": self.is_running,
+            "subscriptions": len(self.assignments),
+            "capacity": self.capacity,
+            "shards": [
+                {
+                    "id": shard.shard_id,
+                    "load": shard.load,
+                    "channels": {channel: load for channel, load in shard.channel_load.items() if load},
+                    **shard.client.metrics_snapshot(),
+                    "retryingConnect": shard.retrying,
+                }
+                for shard in self.shards.values()
+            ],
+        }
+
+    # --- placement ---
+
+    def _new_shard(self) -> HSMShard:
+        client = KotakHSMClient()
+        for cb in self._callbacks:
+            client.add_callback(cb)
+        for cb in self._batch_callbacks:
+            client.add_batch_callback(cb)
+        for cb in self._depth_callbacks:
+            client.add_depth_callback(cb)
+        shard = HSMShard(self._next_shard_id, client)
+        self._next_shard_id += 1
+        self.shards[shard.shard_id] = shard
+        logger.info(f"🔀 HSM pool opened shard {shard.shard_id}")
+        return shard
+
+    def _place(self, key: Key, batch_channels: Dict[int, int]) -> Optional[Tuple[int, int]]:
+        """Assign a shard and channel; batch_channels keeps one channel per shard within a batch."""
+        shard = next((s for s in self.shards.values() if s.load < INSTRUMENTS_PER_CONNECTION), None)
+        if shard is None:
+            if len(self.shards) >= self.max_connections:
+                return None
+            shard = self._new_shard()
+        channel = batch_channels.get(shard.shard_id)
+        if channel is None:
+            channel = batch_channels[shard.shard_id] = shard.least_loaded_channel()
+        shard.channel_load[channel] += 1
+        self.assignments[key] = (shard.shard_id, channel)
+        return shard.shard_id, channel
+
+    async def _ensure_running(self, shard: HSMShard):
+        """Connect a shard opened after the pool connected (it replays its subscriptions)."""
+        if shard.client.is_running or shard.retrying or not self.session_token:
+            return
+        try:
+            await shard.client.connect(self.session_token, self.sid)
+        except Exception as e:
+            # Subscriptions stay recorded on the shard and are sent once a retry connects
+            logger.error(f"❌ HSM pool shard {shard.shard_id} failed to connect: {e}")
+            self._retry_connect(shard)
+
+    def _retry_connect(self, shard: HSMShard):
+        if not shard.retrying:
+            shard.connect_task = asyncio.create_task(self._connect_with_backoff(shard))
+
+    def _cancel_retry(self, shard: HSMShard):
+        if shard.retrying:
+            shard.connect_task.cancel()
+        shard.connect_task = None
+
+    async def _connect_with_backoff(self, shard: HSMShard):
+        """Retry a failed first connect until it succeeds or the shard is closed."""
+        attempt = 0
+        while self.shards.get(shard.shard_id) is shard and not shard.client.is_running:
+            delay = reconnect_delay(attempt)
+            attempt += 1
+            logger.warning(f"🔄 HSM pool shard {shard.shard_id} connecting in {delay:.1f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+            if self.shards.get(shard.shard_id) is not shard or shard.client.is_running:
+                return
+            try:
+                await shard.client.connect(self.session_token, self.sid)
+            except Exception as e:
+                logger.error(f"❌ HSM pool shard {shard.shard_id} connect attempt {attempt} failed: {e}")
+                continue
+            logger.info(f"✅ HSM pool shard {shard.shard_id} connected after {attempt} retries")
+            return
+
+    async def _rebalance(self):
+        """Drain and close the least loaded shard while the remaining load fits in fewer connections."""
+        while len(self.shards) > 1:
+            # Fewest instruments to move; on a tie the newest shard goes
+            source = min(self.shards.values(), key=lambda s: (s.load, -s.shard_id))
+            spare = sum(INSTRUMENTS_PER_CONNECTION - s.load for s in self.shards.values() if s is not source)
+            if source.load > spare:
+                return
+
+            moving = [key for key, (shard_id, _) in self.assignments.items() if shard_id == source.shard_id]
+            depth = set(source.client.depth_keys())
+            del self.shards[source.shard_id]
+            self._cancel_retry(source)
+            for key in moving:
+                del self.assignments[key]
+
+            # Make before break: subscribe on the new shard, then drop the old socket
+            groups: Dict[Tuple[int, int], List[Key]] = {}
+            batch_channels: Dict[int, int] = {}
+            for key in moving:
+                groups.setdefault(self._place(key, batch_channels), []).append(key)
+            for (shard_id, channel), keys in groups.items():
+                target = self.shards[shard_id]
+                await self._ensure_running(target)
+                await target.client.subscribe(format_scrips(keys), channel)
+                moved_depth = [key for key in keys if key in depth]
+                if moved_depth:
+                    await target.client.subscribe_depth(format_scrips(moved_depth), channel)
+
+            await source.client.disconnect()
+            logger.info(f"🔀 HSM pool rebalanced: moved {len(moving)} instruments off shard {source.shard_id}, "
+                        f"{len(self.shards)} connection(s) left")
+
+
+# Singleton for the app lifetime
+hsm_pool = HSMPool()
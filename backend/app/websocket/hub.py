@@ -0,0 +1,404 @@
+"""
+Market-data pub/sub hub shared by every frontend websocket route.
+
+The hub owns the frontend side of the HSM feed: one ClientWriter per
+socket, the tick and depth topic indexes, reference-counted upstream
+subscriptions (subscription_registry) and the single registration of the
+broadcast callbacks on the HSM pool. Routes are thin protocol adapters
+that parse their own message format and call into it.
+
+Each TopicIndex keeps a forward (symbol -> sockets) and a reverse
+(socket -> symbols) index, so subscribe, unsubscribe and disconnect cost
+O(the socket's own subscriptions) rather than a scan of every symbol.
+Candle topics are (symbol, interval) pairs.
+"""
+
+import asyncio
+from typing import Dict, List, Set
+
+from fastapi import WebSocket
+
+from app.core.logger import logger
+from app.scripmaster.service import scrip_master
+from app.utils.cache import get_trade_session
+from app.utils.fast_json import dumps
+from app.websocket.candles import INTERVALS, candle_aggregator
+from app.websocket.client_writer import ClientWriter
+from app.websocket.delta_protocol import DeltaClientWriter, negotiate
+from app.websocket.hsm_pool import hsm_pool
+from app.websocket.last_value import last_values
+from app.websocket.order_book import order_books
+from app.websocket.subscriptions import subscription_registry
+
+_EMPTY: frozenset = frozenset()
+
+
+class TopicIndex:
+    """Forward and reverse subscription indexes for one kind of topic."""
+
+    __slots__ = ("subscribers", "topics")
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[WebSocket]] = {}  # topic -> sockets
+        self.topics: Dict[WebSocket, Set[str]] = {}       # socket -> topics
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def get(self, topic: str):
+        return self.subscribers.get(topic, _EMPTY)
+
+    def topics_of(self, client: WebSocket):
+        return self.topics.get(client, _EMPTY)
+
+    def contains(self, client: WebSocket, topic: str) -> bool:
+        return topic in self.topics.get(client, _EMPTY)
+
+    def add(self, client: WebSocket, topic: str) -> bool:
+        """False if the client already had the topic."""
+        topics = self.topics.setdefault(client, set())
+        if topic in topics:
+            return False
+        topics.add(topic)
+        self.subscribers.setdefault(topic, set()).add(client)
+        return True
+
+    def remove(self, client: WebSocket, topic: str) -> bool:
+        """False if the client did not have the topic."""
+        topics = self.topics.get(client)
+        if not topics or topic not in topics:
+            return False
+        topics.remove(topic)
+        if not topics:
+            del self.topics[client]
+        subscribers = self.subscribers[topic]
+        subscribers.remove(client)
+        if not subscribers:
+            del self.subscribers[topic]
+        return True
+
+    def drop_client(self, client: WebSocket) -> List[str]:
+        """Remove every topic of a client; returns them."""
+        topics = self.topics.pop(client, _EMPTY)
+        for topic in topics:
+            subscribers = self.subscribers[topic]
+            subscribers.remove(client)
+            if not subscribers:
+                del self.subscribers[topic]
+        return list(topics)
+
+
+class MarketDataHub:
+    """
+    Frontend connections, topic indexes and HSM relay for all websocket routes.
+    KOTAK HSM LIMITS (PHASE 2 MANDATORY) are enforced per socket by the HSM
+    pool, which shards instruments over several connections and channels.
+    """
+
+    def __init__(self):
+        # websocket -> its writer task and pending updates
+        self.writers: Dict[WebSocket, ClientWriter] = {}
+        self.ticks = TopicIndex()
+        self.depth = TopicIndex()
+        self.candles = TopicIndex()
+        self._next_client_id = 1
+        self._hsm_initialized = False
+
+    # --- connections ---
+
+    def register(self, websocket: WebSocket) -> ClientWriter:
+        """Attach an (accepted) socket: give it a writer task."""
+        writer = self.writers[websocket] = ClientWriter(websocket, self._next_client_id, self.disconnect)
+        self._next_client_id += 1
+        writer.start()
+        return writer
+
+    async def connect(self, websocket: WebSocket):
+        """Register an accepted socket and make sure the HSM feed is relayed."""
+        self.register(websocket)
+        logger.info(f"Frontend client connected. Total clients: {len(self.writers)}")
+
+        # Relay HSM ticks (registered once for all routes)
+        if not self._hsm_initialized:
+            self._hsm_initialized = True
+            hsm_pool.add_batch_callback(self.broadcast_ticks)
+            hsm_pool.add_depth_callback(self.broadcast_depth)
+
+        # Once connected the HSM client reconnects on its own; retry here only
+        # if it never got going (e.g. no trade session at the first client)
+        if not hsm_pool.is_running:
+            await self._ensure_hsm_connected()
+
+    def disconnect(self, websocket: WebSocket):
+        """Drop a socket and release its references; safe to call more than once."""
+        writer = self.writers.pop(websocket, None)
+        if writer is None:
+            return  # already cleaned up (writer failure and receive loop both report it)
+        writer.close()
+
+        for symbol in self.ticks.drop_client(websocket):
+            subscription_registry.release(symbol)
+        for symbol in self.depth.drop_client(websocket):
+            subscription_registry.release_depth(symbol)
+        for symbol, _ in self.candles.drop_client(websocket):
+            candle_aggregator.unpin(symbol)
+            subscription_registry.release(symbol)
+
+        logger.info(f"Frontend client disconnected. Total clients: {len(self.writers)}")
+
+    async def close(self):
+        """Shutdown: drop every client and wait for their writer tasks to stop."""
+        writers = list(self.writers.values())
+        for websocket in list(self.writers):
+            self.disconnect(websocket)
+        await asyncio.gather(*(writer.wait_closed() for writer in writers))
+
+    async def _ensure_hsm_connected(self):
+        """Connect to Kotak HSM using cached trade session."""
+        token, sid, _, _ = get_trade_session()
+        if token and sid:
+            try:
+                await hsm_pool.connect(token, sid)
+                logger.info("✅ Broker connected to Kotak HSM")
+            except Exception as e:
+                logger.error(f"❌ Broker failed to connect to HSM: {e}")
+        else:
+            logger.warning("⚠️ No trade session found in cache. HSM connection pending trade login.")
+
+    # --- subscriptions ---
+
+    async def subscribe(self, websocket: WebSocket, symbol: str) -> bool:
+        """Subscribe a socket to a symbol's ticks; the first reference subscribes it in HSM."""
+        # 1. Validate symbol via Scrip Master (SINGLE SOURCE OF TRUTH)
+        scrip = scrip_master.get_scrip(symbol)
+        if not scrip:
+            logger.warning(f"Rejected local subscription: reason=UNKNOWN_SYMBOL, symbol={symbol}")
+            return False
+
+        if self.ticks.contains(websocket, symbol):
+            return True
+
+        # 2. Take a reference; the pool ENFORCES HSM LIMITS (PHASE 2 MANDATORY)
+        if not await subscription_registry.acquire(scrip):
+            logger.warning(f"Rejected HSM subscription: reason=MAX_INSTRUMENTS_REACHED, limit={hsm_pool.capacity}, symbol={symbol}")
+            self.send_control(websocket, {"type": "error", "message": "Global HSM subscription limit reached"})
+            return False
+
+        # 3. The socket may have gone away (or subscribed concurrently) while waiting
+        writer = self.writers.get(websocket)
+        if writer is None or not self.ticks.add(websocket, symbol):
+            subscription_registry.release(symbol)
+            return writer is not None
+        logger.info(f"Client subscribed to {symbol}. Active instruments: {len(self.ticks)}")
+
+        # 4. Last known tick right away, without waiting for the next upstream update
+        self._offer_last_value(writer, symbol, scrip['exchangeSegment'])
+        return True
+
+    @staticmethod
+    def _offer_last_value(writer: ClientWriter, symbol: str, segment: str):
+        snapshot = last_values.get(symbol, segment)
+        if snapshot is not None:
+            writer.offer_tick(symbol, snapshot if writer.raw_ticks else dumps(snapshot))
+
+    def unsubscribe(self, websocket: WebSocket, symbol: str):
+        """Drop the socket's reference; HSM unsubscribes after the grace period if it was the last."""
+        if not self.ticks.remove(websocket, symbol):
+            return
+        writer = self.writers.get(websocket)
+        if writer is not None:
+            writer.forget(symbol)
+        subscription_registry.release(symbol)
+
+    async def subscribe_depth(self, websocket: WebSocket, symbol: str) -> bool:
+        """Subscribe a socket to 5-level market depth of a symbol (dps on first reference)."""
+        scrip = scrip_master.get_scrip(symbol)
+        if not scrip:
+            logger.warning(f"Rejected depth subscription: reason=UNKNOWN_SYMBOL, symbol={symbol}")
+            return False
+
+        if self.depth.contains(websocket, symbol):
+            return True
+
+        if not await subscription_registry.acquire_depth(scrip):
+            logger.warning(f"Rejected depth subscription: reason=MAX_INSTRUMENTS_REACHED, symbol={symbol}")
+            self.send_control(websocket, {"type": "error", "message": "Global HSM subscription limit reached"})
+            return False
+
+        writer = self.writers.get(websocket)
+        if writer is None or not self.depth.add(websocket, symbol):
+            subscription_registry.release_depth(symbol)
+            return writer is not None
+
+        # Current book right away, if the feed is already live
+        book = order_books.get(symbol)
+        if book is not None:
+            writer.offer_depth(symbol, dumps(book.to_dict()))
+        return True
+
+    def unsubscribe_depth(self, websocket: WebSocket, symbol: str):
+        if self.depth.remove(websocket, symbol):
+            subscription_registry.release_depth(symbol)
+
+    async def subscribe_candles(self, websocket: WebSocket, symbol: str, interval: str) -> bool:
+        """Stream live OHLCV bars of one interval; holds a touchline reference for the ticks."""
+        if interval not in INTERVALS:
+            self.send_control(websocket, {"type": "error", "message": f"Unsupported candle interval: {interval}"})
+            return False
+        scrip = scrip_master.get_scrip(symbol)
+        if not scrip:
+            logger.warning(f"Rejected candle subscription: reason=UNKNOWN_SYMBOL, symbol={symbol}")
+            return False
+
+        topic = (symbol, interval)
+        if self.candles.contains(websocket, topic):
+            return True
+
+        if not await subscription_registry.acquire(scrip):
+            logger.warning(f"Rejected candle subscription: reason=MAX_INSTRUMENTS_REACHED, symbol={symbol}")
+            self.send_control(websocket, {"type": "error", "message": "Global HSM subscription limit reached"})
+            return False
+
+        writer = self.writers.get(websocket)
+        if writer is None or not self.candles.add(websocket, topic):
+            subscription_registry.release(symbol)
+            return writer is not None
+        candle_aggregator.pin(symbol)
+
+        # Current bar right away, if the instrument has traded
+        bar = candle_aggregator.current(symbol, interval)
+        if bar is not None:
+            writer.offer_candle((symbol, interval, bar["time"]), self._encode_candle(symbol, interval, bar))
+        return True
+
+    def unsubscribe_candles(self, websocket: WebSocket, symbol: str, interval: str):
+        if self.candles.remove(websocket, (symbol, interval)):
+            candle_aggregator.unpin(symbol)
+            subscription_registry.release(symbol)
+
+    # --- outbound ---
+
+    async def set_protocol(self, websocket: WebSocket, version, fmt=None):
+        """
+        Switch a client's wire protocol. Subscriptions and queued messages carry
+        over, and the latest tick of every subscribed symbol is sent again in
+        the new format right after the acknowledgement (for protocol 2: meta
+        plus the full state, without waiting for the next upstream update).
+        """
+        writer = self.writers.get(websocket)
+        if writer is None:
+            return
+        try:
+            version, fmt = negotiate(version, fmt)
+        except ValueError as e:
+            writer.send_control({"type": "error", "message": str(e)})
+            return
+
+        if version != writer.protocol or writer.format != fmt:
+            # Let the old task finish its send before the new one starts, so
+            # nothing it already dequeued is lost and the socket keeps one sender
+            await writer.stop()
+            if self.writers.get(websocket) is not writer:
+                return  # the client died while draining
+            if version == 1:
+                replacement = ClientWriter(websocket, writer.client_id, self.disconnect)
+            else:
+                replacement = DeltaClientWriter(websocket, writer.client_id, self.disconnect, fmt)
+            replacement.take_over(writer)
+            self.writers[websocket] = writer = replacement
+            writer.start()
+            logger.info(f"Frontend client {writer.client_id} switched to protocol {version} ({fmt})")
+
+            # Control messages flush first, so these follow the acknowledgement
+            for symbol in self.ticks.topics_of(websocket):
+                scrip = scrip_master.get_scrip(symbol)
+                if scrip:
+                    self._offer_last_value(writer, symbol, scrip['exchangeSegment'])
+        writer.send_control({"type": "protocol", "version": version, "format": fmt})
+
+    def send_control(self, websocket: WebSocket, message: dict):
+        writer = self.writers.get(websocket)
+        if writer is not None:
+            writer.send_control(message)
+
+    async def broadcast_depth(self, books: List):
+        """Hand updated order books ({"type": "depth", ...}) to their subscribers' writers."""
+        for book in books:
+            symbol = book.context.symbol
+            subscribers = self.depth.get(symbol)
+            if not subscribers:
+                continue
+            depth = dumps(book.to_dict())
+            for ws in subscribers:
+                writer = self.writers.get(ws)
+                if writer is not None:
+                    writer.offer_depth(symbol, depth)
+
+    async def broadcast_tick(self, tick: dict):
+        """Relay standardized tick to all interested clients."""
+        await self.broadcast_ticks([tick])
+
+    async def broadcast_ticks(self, ticks: List[dict]):
+        """
+        Queue a frame's ticks on each interested client's writer (latest value
+        per symbol wins). Nothing here waits on a client; each writer sends one
+        message per flush: the tick object, or a JSON array of several.
+        Ticks are encoded once here, on first need; delta protocol writers
+        take the dict and diff it against what their client last received.
+        """
+        writers = self.writers
+        subscribers_of = self.ticks.subscribers
+        for tick in ticks:
+            symbol = tick.get('symbol')
+            subscribers = subscribers_of.get(symbol)
+            if not subscribers:
+                continue
+            encoded = None
+            for ws in subscribers:
+                writer = writers.get(ws)
+                if writer is None:
+                    continue
+                if writer.raw_ticks:
+                    writer.offer_tick(symbol, tick)
+                else:
+                    if encoded is None:
+                        encoded = dumps(tick)
+                    writer.offer_tick(symbol, encoded)
+
+        if self.candles.subscribers:
+            self._broadcast_candles(ticks)
+
+    @staticmethod
+    def _encode_candle(symbol: str, interval: str, bar: dict) -> str:
+        return dumps({"type": "candle", "symbol": symbol, "interval": interval, **bar})
+
+    def _broadcast_candles(self, ticks: List[dict]):
+        """Hand the current bars of the frame's instruments ({"type": "candle", ...}) to their subscribers."""
+        writers = self.writers
+        for symbol in {tick.get('symbol') for tick in ticks}:
+            for interval in INTERVALS:
+                subscribers = self.candles.get((symbol, interval))
+                if not subscribers:
+                    continue
+                bar = candle_aggregator.current(symbol, interval)
+                if bar is None:
+                    continue
+                key = (symbol, interval, bar["time"])
+                encoded = self._encode_candle(symbol, interval, bar)
+                for ws in subscribers:
+                    writer = writers.get(ws)
+                    if writer is not None:
+                        writer.offer_candle(key, encoded)
+
+    def client_stats(self) -> List[dict]:
+        return [
+            {**writer.stats(),
+             "subscriptions": len(self.ticks.topics_of(ws)),
+             "depthSubscriptions": len(self.depth.topics_of(ws)),
+             "candleSubscriptions": len(self.candles.topics_of(ws))}
+            for ws, writer in self.writers.items()
+        ]
+
+
+# Singleton for the app lifetime
+hub = MarketDataHub()
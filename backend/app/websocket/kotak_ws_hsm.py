@@ -1,12 +1,93 @@
 import asyncio
 import json
+import random
 import websockets
 import time
 from typing import Dict, List, Callable, Optional, Set
+from app.config import get_settings
 from app.core.logger import logger
-from app.scripmaster.service import scrip_master
-from app.utils.symbol_formatter import format_display_name
 from app.utils.market_hours import get_market_session_info
+from app.websocket.hsm_binary import (
+    CONNECTION_TYPE,
+    DEPTH_FEED,
+    STATUS_OK,
+    HSMDecodeError,
+    HSMFrameDecoder,
+    encode_ack_frame,
+)
+from app.websocket.candles import candle_aggregator
+from app.websocket.last_value import last_values
+from app.websocket.order_book import order_books
+from app.websocket.tick_context import TickContextCache
+
+# Official heartbeat period; a ping unanswered for HEARTBEAT_TIMEOUT marks the link dead
+HEARTBEAT_INTERVAL = 25
+HEARTBEAT_TIMEOUT = 10
+
+# Reconnect backoff: full jitter over base * 2^attempt, capped
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+# Scrips per mws/mwu frame (hslib.js MAX_SCRIPS); larger requests are split
+MAX_SCRIPS = 100
+
+# Channel used when the caller does not pick one (hslib channels are 1..16)
+DEFAULT_CHANNEL = 1
+
+
+def reconnect_delay(attempt: int) -> float:
+    """Backoff before reconnect attempt number attempt (0-based): full jitter, capped."""
+    return random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** attempt)))
+
+
+class HSMConnectionMetrics:
+    """Reconnect count and feed gap (connection lost -> resubscribed) durations."""
+
+    def __init__(self):
+        self.reconnect_count = 0
+        self.disconnect_count = 0
+        self.heartbeat_timeouts = 0
+        self.acks_sent = 0
+        self.connected_since: Optional[float] = None
+        self.last_disconnect_at: Optional[float] = None
+        self.last_gap_seconds: Optional[float] = None
+        self.max_gap_seconds = 0.0
+        self.total_gap_seconds = 0.0
+        self._gap_started: Optional[float] = None
+
+    def connected(self, reconnect: bool):
+        now = time.time()
+        self.connected_since = now
+        if reconnect:
+            self.reconnect_count += 1
+        if self._gap_started is not None:
+            gap = time.monotonic() - self._gap_started
+            self._gap_started = None
+            self.last_gap_seconds = round(gap, 3)
+            self.max_gap_seconds = max(self.max_gap_seconds, self.last_gap_seconds)
+            self.total_gap_seconds = round(self.total_gap_seconds + gap, 3)
+
+    def connection_lost(self):
+        self.disconnect_count += 1
+        self.connected_since = None
+        self.last_disconnect_at = time.time()
+        if self._gap_started is None:
+            self._gap_started = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {
+            "reconnectCount": self.reconnect_count,
+            "disconnectCount": self.disconnect_count,
+            "heartbeatTimeouts": self.heartbeat_timeouts,
+            "acksSent": self.acks_sent,
+            "connectedSince": self.connected_since,
+            "lastDisconnectAt": self.last_disconnect_at,
+            "currentGapSeconds": round(time.monotonic() - self._gap_started, 3) if self._gap_started is not None else None,
+            "lastGapSeconds": self.last_gap_seconds,
+            "maxGapSeconds": self.max_gap_seconds,
+            "totalGapSeconds": self.total_gap_seconds,
+        }
+
 
 class KotakHSMClient:
     """
@@ -16,10 +97,14 @@ class KotakHSMClient:
     - Scrip Master Validation
     - Price Normalization
     - Standardized Output
+
+    The connection is supervised: when the socket closes or a heartbeat goes
+    unanswered it reconnects with jittered exponential backoff and replays
+    every subscription in _subscribed_map.
     """
     
     def __init__(self):
-        self.url = "wss://mlhsm.kotaksecurities.com"
+        self.url = get_settings().KOTAK_HSM_URL
         self.ws = None
         self.connected = False
         self.session_token = None
@@ -27,100 +112,278 @@ class KotakHSMClient:
         
         # Internal state
         self._heartbeat_task = None
-        self._listen_task = None
-        self._callbacks: List[Callable] = []
+        self._supervisor_task = None
+        self._closing = False
+        self._callbacks: List[Callable] = []          # called once per tick
+        self._batch_callbacks: List[Callable] = []    # called once per frame with all its ticks
+        self._depth_callbacks: List[Callable] = []    # called once per frame with its updated OrderBooks
         
-        # Active subscriptions: (token, segment) -> trading_symbol
-        self._subscribed_map: Dict[tuple, str] = {}
+        # Active subscriptions: (token, segment) -> channel number
+        self._subscribed_map: Dict[tuple, int] = {}
+        # Depth (dps) subscriptions: (token, segment) -> channel number
+        self._depth_map: Dict[tuple, int] = {}
+        
+        # Binary feed decoder (topic state is per connection)
+        self._decoder = HSMFrameDecoder()
+        
+        # Per-instrument tick context, built at subscribe time
+        self._contexts = TickContextCache()
+
+        self.metrics = HSMConnectionMetrics()
+
+    @property
+    def load(self) -> int:
+        """Instruments subscribed on this connection."""
+        return len(self._subscribed_map)
+
+    @property
+    def is_running(self) -> bool:
+        """True while the supervisor owns a connection (or is reconnecting one)."""
+        return self._supervisor_task is not None and not self._supervisor_task.done()
         
     async def connect(self, session_token: str, sid: str):
-        """Connect to HSM and perform handshake."""
+        """Connect to HSM, perform handshake and start the connection supervisor."""
         self.session_token = session_token
         self.sid = sid
+        self._closing = False
         
         try:
-            logger.info(f"Connecting to Kotak HSM at {self.url}")
-            self.ws = await websockets.connect(self.url)
-            
-            # 1. Send Handshake
-            handshake = {
-                "Authorization": session_token,
-                "Sid": sid,
-                "type": "cn"
-            }
-            await self.ws.send(json.dumps(handshake))
-            logger.info("HSM Handshake sent")
-            
-            self.connected = True
-            
-            # 2. Start Heartbeat (25 seconds)
-            if self._heartbeat_task:
-                self._heartbeat_task.cancel()
-            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
-            
-            # 3. Start Listener
-            if self._listen_task:
-                self._listen_task.cancel()
-            self._listen_task = asyncio.create_task(self._listen_loop())
-            
-            logger.info("Kotak HSM Client initialized and listening")
-            
+            await self._open()
         except Exception as e:
             logger.error(f"Failed to connect to Kotak HSM: {e}")
             self.connected = False
             raise
+
+        self.metrics.connected(reconnect=False)
+        if self._subscribed_map or self._depth_map:
+            await self._replay_subscriptions()
+
+        if not self.is_running:
+            self._supervisor_task = asyncio.create_task(self._supervise())
+        logger.info("Kotak HSM Client initialized and listening")
+
+    async def _open(self):
+        """Open the socket, send the handshake and start the heartbeat."""
+        logger.info(f"Connecting to Kotak HSM at {self.url}")
+        # Liveness is checked by _heartbeat_loop, not by the library's own pings
+        self.ws = await websockets.connect(self.url, ping_interval=None)
+        self._decoder.reset()
+        
+        # 1. Send Handshake
+        handshake = {
+            "Authorization": self.session_token,
+            "Sid": self.sid,
+            "type": "cn"
+        }
+        await self.ws.send(json.dumps(handshake))
+        logger.info("HSM Handshake sent")
+        
+        self.connected = True
+        
+        # 2. Start Heartbeat (25 seconds)
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop(self.ws))
+
+    async def _supervise(self):
+        """Run the listener; on connection loss reconnect with backoff and resubscribe."""
+        while not self._closing:
+            await self._listen_loop()
+            if self._closing:
+                break
+
+            self.connected = False
+            self.metrics.connection_lost()
+            await self._reconnect()
+
+    async def _reconnect(self):
+        attempt = 0
+        while not self._closing:
+            delay = reconnect_delay(attempt)
+            attempt += 1
+            logger.warning(f"🔄 HSM reconnecting in {delay:.1f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+            if self._closing:
+                return
+            try:
+                await self._open()
+                await self._replay_subscriptions()
+            except Exception as e:
+                logger.error(f"❌ HSM reconnect attempt {attempt} failed: {e}")
+                self.connected = False
+                self._abort_socket()
+                continue
+
+            self.metrics.connected(reconnect=True)
+            logger.info(f"✅ HSM reconnected after {self.metrics.last_gap_seconds}s, "
+                        f"{len(self._subscribed_map)} subscriptions replayed")
+            return
+
+    async def _replay_subscriptions(self):
+        """Resubscribe everything in _subscribed_map / _depth_map, per channel, MAX_SCRIPS scrips per frame."""
+        sent = 0
+        for kind, subscribed in (("mws", self._subscribed_map), ("dps", self._depth_map)):
+            by_channel: Dict[int, List[str]] = {}
+            for (tk, seg), channel in subscribed.items():
+                by_channel.setdefault(channel, []).append(f"{seg}|{tk}")
+            for channel, parts in by_channel.items():
+                sent += await self._send_scrips(kind, parts, channel)
+        if sent:
+            logger.info(f"HSM subscriptions replayed: {len(self._subscribed_map)} scrips, "
+                        f"{len(self._depth_map)} depth in {sent} frames")
+
+    async def _send_scrips(self, kind: str, parts: List[str], channel: int) -> int:
+        """Send mws/mwu/dps/dpu requests, MAX_SCRIPS scrips per frame; returns frames sent."""
+        frames = 0
+        for start in range(0, len(parts), MAX_SCRIPS):
+            scrips = "&".join(parts[start:start + MAX_SCRIPS]) + "&"
+            await self.ws.send(json.dumps({"type": kind, "scrips": scrips, "channelnum": channel}))
+            frames += 1
+        return frames
+
+    def _abort_socket(self):
+        """Drop the transport without a closing handshake (peer may be unresponsive)."""
+        transport = getattr(self.ws, "transport", None)
+        if transport is not None:
+            transport.abort()
             
-    async def _heartbeat_loop(self):
-        """Official Heartbeat: {"type": "ti", "scrips": ""} every 25s."""
-        while self.connected:
+    async def _heartbeat_loop(self, ws):
+        """Official Heartbeat: {"type": "ti", "scrips": ""} every 25s, plus a ping that must be answered."""
+        while self.connected and self.ws is ws:
             try:
-                await asyncio.sleep(25)
-                if self.ws:
-                    await self.ws.send(json.dumps({"type": "ti", "scrips": ""}))
-                    logger.debug("HSM Heartbeat sent")
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                await ws.send(json.dumps({"type": "ti", "scrips": ""}))
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, HEARTBEAT_TIMEOUT)
+                logger.debug("HSM Heartbeat sent")
             except asyncio.CancelledError:
                 break
+            except asyncio.TimeoutError:
+                logger.error(f"HSM Heartbeat timeout: no pong within {HEARTBEAT_TIMEOUT}s, dropping connection")
+                self.metrics.heartbeat_timeouts += 1
+                self.connected = False
+                self._abort_socket()
+                break
             except Exception as e:
                 logger.error(f"HSM Heartbeat error: {e}")
                 self.connected = False
+                self._abort_socket()
                 break
                 
     async def _listen_loop(self):
-        """Listen for binary/JSON ticks from Kotak."""
+        """Listen for binary/JSON ticks from Kotak until the connection ends."""
         try:
             async for message in self.ws:
                 await self._process_message(message)
+            logger.warning("Kotak HSM connection closed")
         except websockets.ConnectionClosed:
             logger.warning("Kotak HSM connection closed")
-            self.connected = False
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"HSM Listener error: {e}")
+        finally:
             self.connected = False
 
     async def _process_message(self, message):
-        """Parse, Validate, and Normalize Ticks."""
+        """Parse, Validate, and Normalize Ticks (binary hslib frames or JSON)."""
         try:
-            data = json.loads(message)
-            
-            # Data usually comes as a list or single update
-            if isinstance(data, list):
-                for item in data:
-                    await self._handle_tick(item)
+            if isinstance(message, (bytes, bytearray, memoryview)):
+                # Binary feed protocol (see hsm_binary.py / hslib.js)
+                ticks = self._decoder.decode(message)
+                ack = self._decoder.take_ack()
+                if ack is not None:
+                    await self._send_ack(ack)
+                elif self._decoder.last_type == CONNECTION_TYPE:
+                    self._on_connection_response()
+                depth = [t for t in ticks if t.get("feed") == DEPTH_FEED]
+                if depth:
+                    ticks = [t for t in ticks if t.get("feed") != DEPTH_FEED]
+                    await self._handle_depth(depth)
             else:
-                await self._handle_tick(data)
+                data = json.loads(message)
+                # Data usually comes as a list or single update
+                ticks = data if isinstance(data, list) else [data]
+            
+            # The whole frame is normalized and dispatched as one batch
+            await self._handle_ticks(ticks)
                 
+        except HSMDecodeError as e:
+            logger.warning(f"Dropped malformed HSM binary frame: {e}")
         except json.JSONDecodeError:
-            # Some responses might be binary if hslib.js logic is applied server-side
-            # But the documentation says JSON for HSM
-            pass
+            logger.debug(f"Ignoring non-JSON HSM text message: {message[:80]!r}")
         except Exception as e:
             logger.error(f"Error processing HSM message: {e}")
 
+    def _on_connection_response(self):
+        decoder = self._decoder
+        if decoder.connection_status != STATUS_OK:
+            logger.error(f"❌ HSM rejected the connection (status {decoder.connection_status!r})")
+        elif decoder.ack_enabled:
+            logger.info(f"✅ HSM connection accepted, acknowledging every {decoder.ack_every} data frames")
+        else:
+            logger.info("✅ HSM connection accepted")
+
+    async def _send_ack(self, message_number: int):
+        """Acknowledge DATA frames up to message_number (the server stops streaming without acks)."""
+        try:
+            await self.ws.send(encode_ack_frame(message_number))
+            self.metrics.acks_sent += 1
+        except websockets.ConnectionClosed:
+            pass  # the listener sees the close and the supervisor reconnects
+
+    async def _handle_depth(self, ticks: List[dict]):
+        """Apply depth ticks to their in-memory order books, then publish the updated books."""
+        now = int(time.time())
+        books = []
+        for tick in ticks:
+            key = (tick.get('tk'), (tick.get('e') or '').lower())
+            if key not in self._depth_map:
+                continue  # in flight when the depth subscription was dropped
+            context = self._contexts.get(*key)
+            if context is None:
+                logger.warning(f"Rejected depth: reason=TOKEN_NOT_FOUND, token={tick.get('tk')}, segment={tick.get('e')}")
+                continue
+            books.append(order_books.apply(context, tick, now))
+
+        for cb in self._depth_callbacks:
+            try:
+                result = cb(books)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Depth callback error: {e}")
+
     async def _handle_tick(self, tick: dict):
+        """Single-tick entry point (a batch of one)."""
+        await self._handle_ticks([tick])
+
+    async def _handle_ticks(self, ticks: List[dict]):
+        """
+        Normalize all ticks of a frame together, then hand subscribers the
+        whole batch at once. Per-frame work (clock, session status per
+        segment) is done once per batch instead of once per tick.
+        """
+        now = int(time.time())
+        sessions: Dict[str, dict] = {}
+        self._contexts.start_batch()
+        
+        batch = []
+        for tick in ticks:
+            normalized = self._normalize_tick(tick, now, sessions)
+            if normalized is not None:
+                batch.append(normalized)
+        
+        if batch:
+            last_values.update(batch)
+            candle_aggregator.update(batch)
+            await self._dispatch(batch)
+
+    def _normalize_tick(self, tick: dict, now: int, sessions: Dict[str, dict]) -> Optional[dict]:
         """
         MANDATORY VALIDATION (PHASE 2):
         1. Map tick via tick.tk -> token, tick.e -> segment
-        2. Lookup in Scrip Master
+        2. Lookup in Scrip Master (precomputed per-instrument context)
         3. Normalize Price
         4. Enrich with Meta
         """
@@ -128,103 +391,156 @@ class KotakHSMClient:
         segment = tick.get('e')
         
         if not token or not segment:
-            return
+            return None
 
-        # 1. STRICT Scrip Master Lookup
-        scrip = scrip_master.get_scrip_by_token(token, segment)
-        if not scrip:
+        # 1. STRICT Scrip Master Lookup (resolved once per instrument, see tick_context.py)
+        context = self._contexts.get(token, segment)
+        if context is None:
             # TICK REJECTION LOGGING (PHASE 2 MANDATORY)
             logger.warning(f"Rejected tick: reason=TOKEN_NOT_FOUND, token={token}, segment={segment}")
-            return
+            return None
 
-        # 2. PRICE NORMALIZATION (PHASE 2 MANDATORY: TICK FIRST)
-        # price = raw / (multiplier × precision)
-        # We check tick first, then fallback to scrip master
-        raw_mul = tick.get('mul')
-        raw_prec = tick.get('prec')
-        
-        mul = float(raw_mul) if raw_mul is not None else float(scrip.get('multiplier', 1))
-        prec_val = float(raw_prec) if raw_prec is not None else float(scrip.get('precision', 2))
-        
-        scale = mul * (10 ** prec_val)
-        
-        # Log if we had to fallback (for debugging)
-        if raw_mul is None or raw_prec is None:
-            logger.debug(f"Normalization fallback for {scrip['tradingSymbol']}: tick_mul={raw_mul}, scrip_mul={mul}, tick_prec={raw_prec}, scrip_prec={prec_val}")
-        
-        def normalize(val):
-            if val is None: return 0.0
-            try:
-                return float(val) / scale
-            except:
-                return 0.0
-
-        # 3. AMO & SESSION (PHASE 2 MANDATORY: BACKEND DRIVEN)
-        session_info = get_market_session_info(scrip['exchangeSegment'])
-
-        # 4. ENRICH & STANDARDIZE
-        normalized_tick = {
-            "symbol": scrip['tradingSymbol'],
-            "displayName": format_display_name(scrip),
-            "ltp": normalize(tick.get('ltp')),
-            "open": normalize(tick.get('o') or tick.get('op')),
-            "high": normalize(tick.get('h')),
-            "low": normalize(tick.get('lo') or tick.get('l')),
-            "close": normalize(tick.get('c')),
-            "volume": int(tick.get('v', 0)),
-            "timestamp": int(time.time()),
-            "instrumentType": scrip.get('instrumentType'),
-            "exchange": "NSE" if "NSE" in str(segment).upper() else "BSE",
-            "session": session_info["status"],
-            "isAmo": session_info["is_amo"]
-        }
-        
-        # 4. Broadcast to internal callbacks
-        for cb in self._callbacks:
+        # 2. AMO & SESSION (PHASE 2 MANDATORY: BACKEND DRIVEN) - once per segment per batch
+        session_info = sessions.get(context.exchange_segment)
+        if session_info is None:
+            session_info = sessions[context.exchange_segment] = get_market_session_info(context.exchange_segment)
+
+        # 3. PRICE NORMALIZATION + 4. ENRICH & STANDARDIZE
+        return context.normalize(tick, now, session_info)
+
+    async def _dispatch(self, batch: List[dict]):
+        """Hand a normalized batch to batch subscribers once, and per tick to legacy callbacks."""
+        pending = []
+        for cb in self._batch_callbacks:
             try:
-                if asyncio.iscoroutinefunction(cb):
-                    await cb(normalized_tick)
-                else:
-                    cb(normalized_tick)
+                result = cb(batch)
+                if asyncio.iscoroutine(result):
+                    pending.append(result)
             except Exception as e:
-                logger.error(f"Tick callback error: {e}")
+                logger.error(f"Tick batch callback error: {e}")
+        
+        # Batch subscribers fan out concurrently
+        if pending:
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error(f"Tick batch callback error: {result}")
+        
+        for normalized_tick in batch:
+            for cb in self._callbacks:
+                try:
+                    if asyncio.iscoroutinefunction(cb):
+                        await cb(normalized_tick)
+                    else:
+                        cb(normalized_tick)
+                except Exception as e:
+                    logger.error(f"Tick callback error: {e}")
 
-    async def subscribe(self, scrips_str: str):
+    async def subscribe(self, scrips_str: str, channel: int = DEFAULT_CHANNEL):
         """
-        Subscribe to scrips: "nse_cm|11536&..."
+        Subscribe to scrips: "nse_cm|11536&..." (sent MAX_SCRIPS per mws frame).
+        Recorded even while disconnected; the supervisor replays it on reconnect.
         """
-        if not self.connected:
-            return
-            
-        subscription = {
-            "type": "mws",
-            "scrips": scrips_str,
-            "channelnum": 1
-        }
-        
-        # Track subscriptions for internal validation
+        # Track subscriptions for internal validation and replay
         # Parse scrips_str: nse_cm|11536&
-        parts = scrips_str.strip('&').split('&')
+        parts = [part for part in scrips_str.strip('&').split('&') if '|' in part]
         for part in parts:
-            if '|' in part:
-                seg, tk = part.split('|')
-                self._subscribed_map[(str(tk), str(seg).lower())] = "ACTIVE"
+            seg, tk = part.split('|')
+            self._subscribed_map[(str(tk), str(seg).lower())] = channel
+            self._contexts.register(tk, seg)
         
-        await self.ws.send(json.dumps(subscription))
-        logger.info(f"HSM Subscribed: {scrips_str}")
+        if not self.connected:
+            logger.info(f"HSM not connected; subscription queued for replay: {scrips_str}")
+            return
+
+        try:
+            await self._send_scrips("mws", parts, channel)
+        except websockets.ConnectionClosed:
+            logger.warning(f"HSM connection lost while subscribing; queued for replay: {scrips_str}")
+            return
+        logger.info(f"HSM Subscribed ({len(parts)} scrips, channel {channel}): {scrips_str}")
+
+    async def unsubscribe(self, scrips_str: str, channel: int = DEFAULT_CHANNEL):
+        """Unsubscribe scrips ("nse_cm|11536&...") upstream and stop replaying them."""
+        parts = [part for part in scrips_str.strip('&').split('&') if '|' in part]
+        for part in parts:
+            seg, tk = part.split('|')
+            self._subscribed_map.pop((str(tk), str(seg).lower()), None)
+
+        if not self.connected:
+            return
+        try:
+            await self._send_scrips("mwu", parts, channel)
+        except websockets.ConnectionClosed:
+            return
+        logger.info(f"HSM Unsubscribed: {scrips_str}")
+
+    async def subscribe_depth(self, scrips_str: str, channel: int = DEFAULT_CHANNEL):
+        """Subscribe to 5-level market depth (dps) for scrips; replayed on reconnect like mws."""
+        parts = [part for part in scrips_str.strip('&').split('&') if '|' in part]
+        for part in parts:
+            seg, tk = part.split('|')
+            self._depth_map[(str(tk), str(seg).lower())] = channel
+            self._contexts.register(tk, seg)
+
+        if not self.connected:
+            return
+        try:
+            await self._send_scrips("dps", parts, channel)
+        except websockets.ConnectionClosed:
+            return
+        logger.info(f"HSM Depth subscribed: {scrips_str}")
+
+    async def unsubscribe_depth(self, scrips_str: str, channel: int = DEFAULT_CHANNEL):
+        """Stop the depth feed (dpu) for scrips and drop their order books."""
+        parts = [part for part in scrips_str.strip('&').split('&') if '|' in part]
+        for part in parts:
+            seg, tk = part.split('|')
+            key = (str(tk), str(seg).lower())
+            self._depth_map.pop(key, None)
+            context = self._contexts.get(*key)
+            if context is not None:
+                order_books.discard(context.symbol)
+
+        if not self.connected:
+            return
+        try:
+            await self._send_scrips("dpu", parts, channel)
+        except websockets.ConnectionClosed:
+            return
+        logger.info(f"HSM Depth unsubscribed: {scrips_str}")
+
+    def depth_keys(self) -> List[tuple]:
+        """(token, segment) of every depth (dps) subscription on this connection."""
+        return list(self._depth_map)
 
     def add_callback(self, cb: Callable):
         self._callbacks.append(cb)
 
+    def add_batch_callback(self, cb: Callable):
+        """Register cb(ticks: List[dict]); called once per frame."""
+        self._batch_callbacks.append(cb)
+
+    def add_depth_callback(self, cb: Callable):
+        """Register cb(books: List[OrderBook]); called once per frame carrying depth."""
+        self._depth_callbacks.append(cb)
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            "connected": self.connected,
+            "running": self.is_running,
+            "subscriptions": len(self._subscribed_map),
+            "depthSubscriptions": len(self._depth_map),
+            **self.metrics.to_dict(),
+        }
+
     async def disconnect(self):
+        self._closing = True
         self.connected = False
-        if self.ws:
-            await self.ws.close()
         if self._heartbeat_task:
             self._heartbeat_task.cancel()
-        if self._listen_task:
-            self._listen_task.cancel()
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+            self._supervisor_task = None
+        if self.ws:
+            await self.ws.close()
         logger.info("HSM Client disconnected")
-
-# Singleton for the app lifetime
-kotak_hsm = KotakHSMClient()
@@ -0,0 +1,52 @@
+"""
+Last-value cache of normalized ticks.
+
+Every HSM connection records each normalized tick here before it is
+broadcast, so the latest full tick of every instrument seen today is a
+dict lookup away. A client subscribing to a symbol gets the cached tick
+right away instead of waiting for the next upstream update (which for an
+illiquid name, or after the close, may never come), and /market/snapshot
+serves the same data without an upstream call.
+
+Cached ticks keep their original timestamp. Session fields are
+recomputed when a snapshot is read, so a tick cached during the session
+does not claim the market is still open after the close.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from app.utils.market_hours import get_market_session_info
+
+
+class LastValueCache:
+    """symbol -> latest normalized tick, across every HSM connection."""
+
+    def __init__(self):
+        self.ticks: Dict[str, dict] = {}
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    def update(self, batch: Iterable[dict]):
+        ticks = self.ticks
+        for tick in batch:
+            ticks[tick['symbol']] = tick
+            self.updates += 1
+
+    def get(self, symbol: str, segment: Optional[str] = None) -> Optional[dict]:
+        """Cached tick; with the exchange segment, its session fields are brought up to date."""
+        tick = self.ticks.get(symbol)
+        if tick is None or segment is None:
+            return tick
+        session = get_market_session_info(segment)
+        if tick.get('session') == session["status"] and tick.get('isAmo') == session["is_amo"]:
+            return tick
+        return {**tick, "session": session["status"], "isAmo": session["is_amo"]}
+
+    def symbols(self) -> List[str]:
+        return list(self.ticks)
+
+
+# Singleton for the app lifetime
+last_values = LastValueCache()
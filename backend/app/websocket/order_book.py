@@ -0,0 +1,121 @@
+"""
+In-memory market depth (order book) per instrument.
+
+HSM depth (dp) topics carry five bid and five ask levels: price (bp, bp1..bp4
+/ sp, sp1..sp4), quantity (bq.. / bs..) and order count (bno1..5 / sno1..5).
+Each subscribed instrument owns a fixed-size ladder of preallocated lists;
+every depth frame rewrites the levels in place, so a live book never
+allocates. Prices are scaled with the instrument's TickContext like ticks.
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.websocket.tick_context import TickContext
+
+DEPTH_LEVELS = 5
+
+
+def _level_fields(prefix: str) -> Tuple[str, ...]:
+    return tuple(prefix if level == 0 else f"{prefix}{level}" for level in range(DEPTH_LEVELS))
+
+
+BID_PRICE = _level_fields("bp")
+ASK_PRICE = _level_fields("sp")
+BID_QTY = _level_fields("bq")
+ASK_QTY = _level_fields("bs")
+BID_ORDERS = tuple(f"bno{level + 1}" for level in range(DEPTH_LEVELS))
+ASK_ORDERS = tuple(f"sno{level + 1}" for level in range(DEPTH_LEVELS))
+
+
+def _fill(target: List, tick: dict, fields: Tuple[str, ...], scale: float = 0.0):
+    """
+    Write one ladder column in place. Values may be numbers (binary frames) or
+    numeric strings (JSON frames); fields missing from the tick or not numeric
+    keep their last value.
+    """
+    for level, field in enumerate(fields):
+        value = tick.get(field)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        target[level] = value / scale if scale else int(value)
+
+
+class OrderBook:
+    """Fixed-size bid/ask ladder for one instrument."""
+
+    __slots__ = (
+        "context", "bid_price", "bid_qty", "bid_orders",
+        "ask_price", "ask_qty", "ask_orders", "updated_at", "updates",
+    )
+
+    def __init__(self, context: TickContext):
+        self.context = context
+        self.bid_price = [0.0] * DEPTH_LEVELS
+        self.bid_qty = [0] * DEPTH_LEVELS
+        self.bid_orders = [0] * DEPTH_LEVELS
+        self.ask_price = [0.0] * DEPTH_LEVELS
+        self.ask_qty = [0] * DEPTH_LEVELS
+        self.ask_orders = [0] * DEPTH_LEVELS
+        self.updated_at = 0
+        self.updates = 0
+
+    def apply(self, tick: dict, now: int):
+        """Update the ladder from a depth tick (raw prices, integers or numeric strings)."""
+        scale = self.context.scale(tick.get('mul'), tick.get('prec'))
+        _fill(self.bid_price, tick, BID_PRICE, scale)
+        _fill(self.ask_price, tick, ASK_PRICE, scale)
+        _fill(self.bid_qty, tick, BID_QTY)
+        _fill(self.ask_qty, tick, ASK_QTY)
+        _fill(self.bid_orders, tick, BID_ORDERS)
+        _fill(self.ask_orders, tick, ASK_ORDERS)
+        self.updated_at = now
+        self.updates += 1
+
+    @staticmethod
+    def _side(prices: List[float], qtys: List[int], orders: List[int]) -> List[dict]:
+        return [{"price": p, "quantity": q, "orders": o} for p, q, o in zip(prices, qtys, orders)]
+
+    def to_dict(self) -> dict:
+        """Standardized depth snapshot ({price, quantity, orders} levels, as MarketDepth renders)."""
+        return {
+            "type": "depth",
+            "symbol": self.context.symbol,
+            "displayName": self.context.display_name,
+            "buy": self._side(self.bid_price, self.bid_qty, self.bid_orders),
+            "sell": self._side(self.ask_price, self.ask_qty, self.ask_orders),
+            "totalBuyQty": sum(self.bid_qty),
+            "totalSellQty": sum(self.ask_qty),
+            "timestamp": self.updated_at,
+        }
+
+
+class OrderBookStore:
+    """symbol -> OrderBook for every instrument with a depth subscription (all HSM connections)."""
+
+    def __init__(self):
+        self.books: Dict[str, OrderBook] = {}
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def apply(self, context: TickContext, tick: dict, now: Optional[int] = None) -> OrderBook:
+        book = self.books.get(context.symbol)
+        if book is None or book.context is not context:
+            book = self.books[context.symbol] = OrderBook(context)
+        book.apply(tick, now if now is not None else int(time.time()))
+        return book
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        return self.books.get(symbol)
+
+    def discard(self, symbol: str):
+        self.books.pop(symbol, None)
+
+
+# Singleton for the app lifetime
+order_books = OrderBookStore()
@@ -1,116 +1,46 @@
 """
 FastAPI WebSocket Router for Phase 2 Market Data (HSM).
 Relays standardized ticks from Kotak HSM to frontend clients.
+
+Thin protocol adapter over the market-data hub (hub.py), which owns the
+connections, subscriptions and the per-client writers.
+
+Messages: {"action": "subscribe" | "unsubscribe" | "subscribe_depth" |
+"unsubscribe_depth", "symbols": [...]}, {"action": "subscribe_candles" |
+"unsubscribe_candles", "symbols": [...], "interval": "1s" | "1m" | "5m" |
+"15m"} for live OHLCV bars (see candles.py), and {"action": "protocol", ...}
+to negotiate the compact delta protocol (version 2, see delta_protocol.py).
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
 import asyncio
 import json
 from app.core.logger import logger
-from app.websocket.kotak_ws_hsm import kotak_hsm
-from app.utils.cache import get_trade_session
-from app.scripmaster.service import scrip_master
+from app.websocket.hsm_pool import hsm_pool
+from app.websocket.hub import hub
+from app.websocket.subscriptions import subscription_registry
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
-class ConnectionManager:
-    """Manages frontend WebSocket connections and HSM aggregation."""
-    
-    # KOTAK HSM LIMITS (PHASE 2 MANDATORY)
-    MAX_INSTRUMENTS = 200
-    MAX_CHANNELS = 16
-    
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        # symbol -> set of websockets
-        self.subscriptions: Dict[str, Set[WebSocket]] = {}
-        self._hsm_initialized = False
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Frontend client connected. Total clients: {len(self.active_connections)}")
-        
-        # Initialize Kotak HSM connection on first client
-        if not self._hsm_initialized:
-            await self._ensure_hsm_connected()
-            self._hsm_initialized = True
-            kotak_hsm.add_callback(self.broadcast_tick)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        
-        # Cleanup subscriptions for this socket
-        for symbol in list(self.subscriptions.keys()):
-            if websocket in self.subscriptions[symbol]:
-                self.subscriptions[symbol].remove(websocket)
-                if not self.subscriptions[symbol]:
-                    del self.subscriptions[symbol]
-        
-        logger.info(f"Frontend client disconnected. Total clients: {len(self.active_connections)}")
-
-    async def _ensure_hsm_connected(self):
-        """Connect to Kotak HSM using cached trade session."""
-        token, sid, _, _ = get_trade_session()
-        if token and sid:
-            try:
-                await kotak_hsm.connect(token, sid)
-                logger.info("✅ Broker connected to Kotak HSM")
-            except Exception as e:
-                logger.error(f"❌ Broker failed to connect to HSM: {e}")
-        else:
-            logger.warning("⚠️ No trade session found in cache. HSM connection pending trade login.")
-
-    async def subscribe_client(self, websocket: WebSocket, symbol: str):
-        """Register client for a symbol and subscribe in HSM if new."""
-        # 1. Validate symbol via Scrip Master (SINGLE SOURCE OF TRUTH)
-        scrip = scrip_master.get_scrip(symbol)
-        if not scrip:
-            logger.warning(f"Rejected local subscription: reason=UNKNOWN_SYMBOL, symbol={symbol}")
-            return
-
-        # 2. Add to local subscriber sets
-        if symbol not in self.subscriptions:
-            # 3. ENFORCE HSM LIMITS (PHASE 2 MANDATORY)
-            if len(self.subscriptions) >= self.MAX_INSTRUMENTS:
-                logger.warning(f"Rejected HSM subscription: reason=MAX_INSTRUMENTS_REACHED, limit={self.MAX_INSTRUMENTS}, symbol={symbol}")
-                await websocket.send_json({"type": "error", "message": "Global HSM subscription limit reached"})
-                return
-
-            self.subscriptions[symbol] = set()
-            # 4. Trigger HSM subscription for this new instrument
-            sub_str = f"{scrip['exchangeSegment']}|{scrip['instrumentToken']}&"
-            if kotak_hsm.connected:
-                await kotak_hsm.subscribe(sub_str)
-            else:
-                logger.warning(f"HSM not connected. Queuing subscription for {symbol}")
-        
-        self.subscriptions[symbol].add(websocket)
-        logger.info(f"Client subscribed to {symbol}. Active instruments: {len(self.subscriptions)}")
+@router.get("/hsm/metrics")
+async def hsm_metrics():
+    """HSM connection health: reconnect count and feed gap durations."""
+    return hsm_pool.metrics_snapshot()
 
-    async def broadcast_tick(self, tick: dict):
-        """Relay standardized tick to all interested clients."""
-        symbol = tick.get('symbol')
-        if symbol in self.subscriptions:
-            message = json.dumps(tick)
-            dead_links = []
-            for ws in self.subscriptions[symbol]:
-                try:
-                    await ws.send_text(message)
-                except Exception:
-                    dead_links.append(ws)
-            
-            # Concurrent cleanup
-            for dead in dead_links:
-                self.disconnect(dead)
+@router.get("/clients")
+async def websocket_clients():
+    """Per-client delivery counters: messages sent, conflated and dropped updates."""
+    return hub.client_stats()
 
-manager = ConnectionManager()
+@router.get("/hsm/subscriptions")
+async def hsm_subscriptions():
+    """Admin view: live per-instrument reference counts across all frontend sockets."""
+    return subscription_registry.snapshot()
 
 @router.websocket("/market-data")
 async def market_data_websocket(websocket: WebSocket):
-    await manager.connect(websocket)
+    await websocket.accept()
+    await hub.connect(websocket)
     try:
         while True:
             data = await websocket.receive_text()
@@ -123,19 +53,39 @@ async def market_data_websocket(websocket: WebSocket):
                     symbols = [symbols]
 
                 if action == "subscribe":
-                    for sym in symbols:
-                        await manager.subscribe_client(websocket, str(sym))
+                    # Concurrent, so the new instruments coalesce into batched HSM subscribes
+                    await asyncio.gather(*(hub.subscribe(websocket, sym)
+                                           for sym in dict.fromkeys(map(str, symbols))))
                 
                 elif action == "unsubscribe":
-                    # Local cleanup (HSM aggregation remains for other clients)
                     for sym in symbols:
-                        if sym in manager.subscriptions and websocket in manager.subscriptions[sym]:
-                            manager.subscriptions[sym].remove(websocket)
+                        hub.unsubscribe(websocket, str(sym))
+
+                elif action == "subscribe_depth":
+                    await asyncio.gather(*(hub.subscribe_depth(websocket, sym)
+                                           for sym in dict.fromkeys(map(str, symbols))))
+
+                elif action == "unsubscribe_depth":
+                    for sym in symbols:
+                        hub.unsubscribe_depth(websocket, str(sym))
+
+                elif action == "subscribe_candles":
+                    interval = str(msg.get("interval", "1m"))
+                    await asyncio.gather(*(hub.subscribe_candles(websocket, sym, interval)
+                                           for sym in dict.fromkeys(map(str, symbols))))
+
+                elif action == "unsubscribe_candles":
+                    interval = str(msg.get("interval", "1m"))
+                    for sym in symbols:
+                        hub.unsubscribe_candles(websocket, str(sym), interval)
+
+                elif action == "protocol":
+                    await hub.set_protocol(websocket, msg.get("version"), msg.get("format"))
                             
             except json.JSONDecodeError:
                 continue
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        hub.disconnect(websocket)
     except Exception as e:
         logger.error(f"WebSocket Error: {e}")
-        manager.disconnect(websocket)
+        hub.disconnect(websocket)
@@ -0,0 +1,292 @@
+"""
+Reference-counted HSM subscriptions.
+
+Every frontend socket subscribed to an instrument holds one reference.
+The first reference subscribes upstream; when the last one is released
+the instrument lingers for UNSUBSCRIBE_GRACE_SECONDS (a page reload or a
+quick watchlist switch re-acquires it without an upstream round trip) and
+is then unsubscribed. Instruments whose grace periods end within
+FLUSH_WINDOW_SECONDS of each other go out in one batched mwu call, so
+closing a 50-symbol watchlist frees its HSM slots in one go.
+
+Subscribes are coalesced the same way: SubscribeScheduler collects the
+new instruments requested within COALESCE_WINDOW_SECONDS (or until
+MAX_SCRIPS are waiting) into one pool.subscribe call, and every caller
+awaits its own instrument's acknowledgement.
+
+Depth (dps) references are counted separately per instrument; each one
+also holds a touchline reference, since the pool places depth on the
+instrument's subscription. The last depth reference stops the depth feed
+right away (the HSM client then drops the in-memory order book).
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+
+from app.core.logger import logger
+from app.websocket.hsm_pool import Key, format_scrips, hsm_pool
+from app.websocket.kotak_ws_hsm import MAX_SCRIPS
+
+UNSUBSCRIBE_GRACE_SECONDS = 5.0
+FLUSH_WINDOW_SECONDS = 0.5
+COALESCE_WINDOW_SECONDS = 0.05
+
+
+class SubscribeScheduler:
+    """Batches subscribe requests into pool.subscribe calls of at most MAX_SCRIPS instruments."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._pending: Dict[Key, asyncio.Future] = {}
+        self._window_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()   # window and flush tasks still running
+        self.requests = 0
+        self.batches = 0
+
+    def request(self, key: Key) -> asyncio.Future:
+        """Queue an instrument; the future resolves to True (subscribed) or False (rejected)."""
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.get_running_loop().create_future()
+            self.requests += 1
+
+        if len(self._pending) >= MAX_SCRIPS:
+            # Full batch: send it now; the window would only find an empty queue
+            self._cancel_window()
+            self._spawn(self._subscribe(self._take_batch()))
+        elif self._window_task is None:
+            self._window_task = self._spawn(self._flush_after_window())
+        return future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _cancel_window(self):
+        if self._window_task is not None:
+            self._window_task.cancel()
+            self._window_task = None
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(COALESCE_WINDOW_SECONDS)
+        self._window_task = None
+        await self._subscribe(self._take_batch())
+
+    async def close(self):
+        """Send what is still queued and wait for every in-flight batch (call on shutdown)."""
+        self._cancel_window()
+        await self._subscribe(self._take_batch())
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _take_batch(self) -> Dict[Key, asyncio.Future]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    async def _subscribe(self, batch: Dict[Key, asyncio.Future]):
+        if not batch:
+            return
+
+        self.batches += 1
+        try:
+            rejected = set(await self.pool.subscribe(format_scrips(batch)))
+        except Exception as e:
+            logger.error(f"HSM batched subscribe failed: {e}")
+            rejected = set(batch)
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(key not in rejected)
+
+
+class SubscriptionEntry:
+    """Live reference count of one instrument."""
+
+    __slots__ = ("symbol", "token", "segment", "refs", "depth_refs", "released_at", "pending", "depth_pending")
+
+    def __init__(self, symbol: str, token: str, segment: str):
+        self.symbol = symbol
+        self.token = token
+        self.segment = segment
+        self.refs = 0
+        self.depth_refs = 0
+        self.released_at: Optional[float] = None  # monotonic time refs hit zero
+        self.pending: Optional[asyncio.Future] = None  # upstream subscribe acknowledgement
+        self.depth_pending: Optional[asyncio.Future] = None  # upstream dps acknowledgement
+
+    @property
+    def key(self):
+        return (self.token, self.segment)
+
+
+class SubscriptionRegistry:
+    """symbol -> SubscriptionEntry, shared by every frontend websocket route."""
+
+    def __init__(self, pool=hsm_pool):
+        self.pool = pool
+        self.scheduler = SubscribeScheduler(pool)
+        self.entries: Dict[str, SubscriptionEntry] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._depth_tasks: Set[asyncio.Task] = set()   # dpu calls still running
+        self.upstream_unsubscribes = 0
+
+    async def acquire(self, scrip: dict) -> bool:
+        """
+        Add a reference to an instrument, subscribing upstream on the first.
+        Returns False if the HSM pool has no room for it.
+        """
+        symbol = scrip['tradingSymbol']
+        entry = self.entries.get(symbol)
+        if entry is None:
+            entry = SubscriptionEntry(symbol, str(scrip['instrumentToken']), str(scrip['exchangeSegment']).lower())
+            self.entries[symbol] = entry
+            # Coalesced with other new instruments into one batched mws
+            # (queued by the HSM client while disconnected, replayed on reconnect)
+            entry.pending = self.scheduler.request(entry.key)
+
+        if entry.pending is not None:
+            # Concurrent acquirers of a new instrument share its acknowledgement
+            accepted = await asyncio.shield(entry.pending)
+            entry.pending = None
+            if not accepted:
+                if self.entries.get(symbol) is entry and entry.refs == 0:
+                    del self.entries[symbol]
+                return False
+
+        entry.refs += 1
+        if entry.released_at is not None:
+            # Re-acquired within the grace period: the upstream subscription never went away
+            entry.released_at = None
+        return True
+
+    async def acquire_depth(self, scrip: dict) -> bool:
+        """Add a depth reference (plus a touchline one); the first starts the dps feed."""
+        if not await self.acquire(scrip):
+            return False
+        entry = self.entries[scrip['tradingSymbol']]
+        entry.depth_refs += 1
+        if entry.depth_refs == 1:
+            pending = entry.depth_pending = asyncio.get_running_loop().create_future()
+            try:
+                accepted = not await self.pool.subscribe_depth(format_scrips([entry.key]))
+            except Exception as e:
+                logger.error(f"HSM depth subscribe failed for {entry.symbol}: {e}")
+                accepted = False
+            pending.set_result(accepted)
+            if entry.depth_pending is pending:
+                entry.depth_pending = None
+        elif entry.depth_pending is not None:
+            # Concurrent depth acquirers share the first one's acknowledgement
+            accepted = await asyncio.shield(entry.depth_pending)
+        else:
+            accepted = True
+
+        if not accepted:
+            entry.depth_refs -= 1
+            self.release(entry.symbol)
+        return accepted
+
+    def release_depth(self, symbol: str):
+        """Drop a depth reference and its touchline reference."""
+        entry = self.entries.get(symbol)
+        if entry is None or entry.depth_refs == 0:
+            return
+        entry.depth_refs -= 1
+        if entry.depth_refs == 0:
+            task = asyncio.create_task(self._unsubscribe_depth(entry))
+            self._depth_tasks.add(task)
+            task.add_done_callback(self._depth_tasks.discard)
+        self.release(symbol)
+
+    async def _unsubscribe_depth(self, entry: SubscriptionEntry):
+        try:
+            await self.pool.unsubscribe_depth(format_scrips([entry.key]))
+        except Exception as e:
+            logger.error(f"HSM depth unsubscribe failed for {entry.symbol}: {e}")
+
+    def release(self, symbol: str):
+        """Drop a reference; the last one schedules the upstream unsubscribe."""
+        entry = self.entries.get(symbol)
+        if entry is None or entry.refs == 0:
+            return
+        entry.refs -= 1
+        if entry.refs == 0:
+            entry.released_at = time.monotonic()
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """Unsubscribe instruments whose grace period ended, in batches."""
+        while True:
+            releasing = [e for e in self.entries.values() if e.released_at is not None]
+            if not releasing:
+                return
+
+            earliest = min(e.released_at for e in releasing) + UNSUBSCRIBE_GRACE_SECONDS
+            await asyncio.sleep(max(0.0, earliest - time.monotonic()))
+
+            # Taken out of the registry while the unsubscribe is in flight, so a
+            # concurrent acquire starts a fresh entry (and subscription)
+            cutoff = time.monotonic() + FLUSH_WINDOW_SECONDS - UNSUBSCRIBE_GRACE_SECONDS
+            due: List[SubscriptionEntry] = []
+            for entry in list(self.entries.values()):
+                if entry.released_at is not None and entry.released_at <= cutoff:
+                    del self.entries[entry.symbol]
+                    due.append(entry)
+            if not due:
+                continue
+
+            try:
+                await self.pool.unsubscribe(format_scrips(e.key for e in due))
+                self.upstream_unsubscribes += len(due)
+                logger.info(f"HSM released {len(due)} unused instruments: {', '.join(e.symbol for e in due)}")
+            except Exception as e:
+                # Still subscribed upstream: track them again and retry after another grace period
+                logger.error(f"HSM batched unsubscribe failed, retrying in {UNSUBSCRIBE_GRACE_SECONDS}s: {e}")
+                now = time.monotonic()
+                for entry in due:
+                    # A symbol re-acquired meanwhile has a fresh entry that owns the subscription
+                    if entry.symbol not in self.entries:
+                        entry.released_at = now
+                        self.entries[entry.symbol] = entry
+
+    async def close(self):
+        """Shutdown: finish queued subscribes and depth unsubscribes, stop the unsubscribe timer."""
+        await self.scheduler.close()
+        if self._depth_tasks:
+            await asyncio.gather(*self._depth_tasks, return_exceptions=True)
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    def snapshot(self) -> dict:
+        """Admin view: live refcounts and instruments waiting out their grace period."""
+        now = time.monotonic()
+        instruments = []
+        for entry in sorted(self.entries.values(), key=lambda e: (-e.refs, e.symbol)):
+            instruments.append({
+                "symbol": entry.symbol,
+                "token": entry.token,
+                "segment": entry.segment,
+                "refs": entry.refs,
+                "depthRefs": entry.depth_refs,
+                "releasingInSeconds": (round(max(0.0, entry.released_at + UNSUBSCRIBE_GRACE_SECONDS - now), 2)
+                                       if entry.released_at is not None else None),
+            })
+        return {
+            "instruments": len(self.entries),
+            "references": sum(e.refs for e in self.entries.values()),
+            "depthReferences": sum(e.depth_refs for e in self.entries.values()),
+            "releasing": sum(1 for e in self.entries.values() if e.released_at is not None),
+            "graceSeconds": UNSUBSCRIBE_GRACE_SECONDS,
+            "upstreamUnsubscribes": self.upstream_unsubscribes,
+            "subscribeRequests": self.scheduler.requests,
+            "subscribeBatches": self.scheduler.batches,
+            "subscriptions": instruments,
+        }
+
+
+# Singleton for the app lifetime
+subscription_registry = SubscriptionRegistry()
@@ -0,0 +1,131 @@
+"""
+Per-instrument tick context.
+
+Everything about a subscribed instrument that does not change tick to tick
+(symbol, display name, instrument type, exchange label, price scale) is
+resolved once from the scrip master when the instrument is subscribed. The
+per-tick path is then a dict lookup, a few float divisions and one dict build.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from app.core.logger import logger
+from app.scripmaster.service import scrip_master
+from app.utils.symbol_formatter import format_display_name
+
+# Scrip master defaults when a tick carries no mul/prec
+DEFAULT_MULTIPLIER = 1.0
+DEFAULT_PRECISION = 2.0
+
+
+def _price(value, scale: float) -> float:
+    if value is None:
+        return 0.0
+    try:
+        return float(value) / scale
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TickContext:
+    """Static metadata and price scaling for one (token, segment)."""
+
+    __slots__ = (
+        "token", "segment", "symbol", "display_name", "instrument_type",
+        "exchange", "exchange_segment", "multiplier", "precision",
+        "_last_mul", "_last_prec", "_last_scale",
+    )
+
+    def __init__(self, token: str, segment: str, scrip):
+        self.token = token
+        self.segment = segment
+        self.symbol = scrip['tradingSymbol']
+        self.display_name = format_display_name(scrip)
+        self.instrument_type = scrip.get('instrumentType')
+        self.exchange = "NSE" if "NSE" in segment.upper() else "BSE"
+        self.exchange_segment = scrip['exchangeSegment']
+        self.multiplier = float(scrip.get('multiplier', DEFAULT_MULTIPLIER))
+        self.precision = float(scrip.get('precision', DEFAULT_PRECISION))
+
+        # Scale for the last (mul, prec) pair seen; ticks repeat the same pair
+        self._last_mul = None
+        self._last_prec = None
+        self._last_scale = self.multiplier * (10 ** self.precision)
+
+    def scale(self, raw_mul, raw_prec) -> float:
+        """price = raw / (multiplier × 10^precision); tick values first, scrip master fallback."""
+        if raw_mul == self._last_mul and raw_prec == self._last_prec:
+            return self._last_scale
+
+        mul = float(raw_mul) if raw_mul is not None else self.multiplier
+        prec = float(raw_prec) if raw_prec is not None else self.precision
+        if raw_mul is None or raw_prec is None:
+            logger.debug(f"Normalization fallback for {self.symbol}: tick_mul={raw_mul}, tick_prec={raw_prec}")
+
+        self._last_mul, self._last_prec = raw_mul, raw_prec
+        self._last_scale = mul * (10 ** prec)
+        return self._last_scale
+
+    def normalize(self, tick: dict, now: int, session: dict) -> dict:
+        """Standardized tick for frontend clients."""
+        scale = self.scale(tick.get('mul'), tick.get('prec'))
+        volume = tick.get('v')
+        return {
+            "symbol": self.symbol,
+            "displayName": self.display_name,
+            "ltp": _price(tick.get('ltp'), scale),
+            "open": _price(tick.get('o') or tick.get('op'), scale),
+            "high": _price(tick.get('h'), scale),
+            "low": _price(tick.get('lo') or tick.get('l'), scale),
+            "close": _price(tick.get('c'), scale),
+            "volume": int(volume) if volume is not None else 0,
+            "timestamp": now,
+            "instrumentType": self.instrument_type,
+            "exchange": self.exchange,
+            "session": session["status"],
+            "isAmo": session["is_amo"],
+        }
+
+
+class TickContextCache:
+    """
+    (token, segment) -> TickContext. Filled at subscribe time; a tick for an
+    instrument that was not pre-registered is resolved once on first sight.
+    Cleared whenever the scrip master generation changes.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[Tuple[str, str], TickContext] = {}
+        self._generation = scrip_master.generation_id
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def _check_generation(self):
+        generation = scrip_master.generation_id
+        if generation != self._generation:
+            self._contexts.clear()
+            self._generation = generation
+
+    def register(self, token, segment) -> Optional[TickContext]:
+        """Resolve and cache the context for an instrument (subscribe time)."""
+        self._check_generation()
+        key = (str(token), str(segment).lower())
+        context = self._contexts.get(key)
+        if context is None:
+            scrip = scrip_master.get_scrip_by_token(key[0], key[1])
+            if not scrip:
+                return None
+            context = self._contexts[key] = TickContext(key[0], key[1], scrip)
+        return context
+
+    def get(self, token, segment) -> Optional[TickContext]:
+        """Hot path: cached context, resolving it on first sight."""
+        context = self._contexts.get((token, segment))
+        if context is not None:
+            return context
+        return self.register(token, segment)
+
+    def start_batch(self):
+        """Called once per frame: drop contexts built from a replaced scrip master."""
+        self._check_generation()
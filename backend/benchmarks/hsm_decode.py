@@ -0,0 +1,117 @@
+"""
+HSM tick decode microbenchmark: binary frames vs the JSON path.
+
+Builds synthetic frames carrying the same ticks in both encodings and times
+json.loads vs HSMFrameDecoder.decode, for full snapshot records and for the
+small update records that dominate a live session. A second column adds the
+price scaling _handle_tick does on every tick (JSON prices arrive as strings,
+binary ones as integers).
+
+The pure-Python binary decoder is slower than the C json parser: about
+2-3x on snapshot records and 1.5-2x on update records. What binary frames
+buy is bandwidth (roughly 45% of the JSON bytes per update tick), not
+decode time.
+
+Usage (from backend/, with .env configured):
+
+    python -m benchmarks.hsm_decode
+    python -m benchmarks.hsm_decode --ticks 200 --frames 2000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from app.websocket.hsm_binary import (
+    TRASH_VAL,
+    HSMFrameDecoder,
+    encode_data_frame,
+    encode_snap_record,
+    encode_update_record,
+    scrip_longs,
+)
+
+
+def build_frames(ticks: int, seed: int = 7):
+    """Return (snap_frame, update_frames, snap_json, update_json) for `ticks` instruments."""
+    rng = random.Random(seed)
+    snap_records, snap_dicts = [], []
+    update_records, update_dicts = [], []
+
+    for i in range(ticks):
+        token = str(10000 + i)
+        price = rng.randint(10_000, 5_000_000)
+        fields = dict(ltp=price, op=price - 500, h=price + 900, lo=price - 1200, c=price - 300,
+                      v=rng.randint(0, 10_000_000), ltq=rng.randint(1, 500), oi=0, mul=1, prec=2)
+        snap_records.append(encode_snap_record(i + 1, f"sf|nse_cm|{token}", scrip_longs(**fields),
+                                               {52: token, 53: "nse_cm", 54: f"SYM{i}-EQ"}))
+        snap_dicts.append({"tk": token, "e": "nse_cm", "ts": f"SYM{i}-EQ",
+                           **{k: str(v) for k, v in fields.items()}})
+
+        # Typical update: price, last qty and volume changed
+        changed = dict(ltp=price + 5, ltq=rng.randint(1, 500), v=fields["v"] + 100)
+        longs = scrip_longs(**changed)
+        last = max(i for i, v in enumerate(longs) if v != TRASH_VAL)
+        update_records.append(encode_update_record(i + 1, longs[:last + 1]))
+        update_dicts.append({"tk": token, "e": "nse_cm", **{k: str(v) for k, v in changed.items()}})
+
+    return (
+        encode_data_frame(snap_records),
+        encode_data_frame(update_records),
+        json.dumps(snap_dicts),
+        json.dumps(update_dicts),
+    )
+
+
+PRICE_FIELDS = ("ltp", "op", "h", "lo", "c")
+
+
+def scale_prices(ticks, scale: float = 100.0):
+    """The per-tick price work of KotakHSMClient._handle_tick."""
+    for tick in ticks:
+        for field in PRICE_FIELDS:
+            value = tick.get(field)
+            if value is not None:
+                float(value) / scale
+
+
+def _time(fn, frames: int) -> float:
+    started = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - started) / frames
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=100, help="Ticks (instruments) per frame")
+    parser.add_argument("--frames", type=int, default=2000, help="Frames decoded per measurement")
+    args = parser.parse_args(argv)
+
+    snap_frame, update_frame, snap_json, update_json = build_frames(args.ticks)
+
+    decoder = HSMFrameDecoder()
+    decoder.decode(snap_frame)  # topics must be known before updates decode
+
+    cases = [
+        ("snapshot", "json", snap_json, json.loads),
+        ("snapshot", "binary", snap_frame, decoder.decode),
+        ("update", "json", update_json, json.loads),
+        ("update", "binary", update_frame, decoder.decode),
+    ]
+
+    print(f"HSM decode benchmark: {args.ticks} ticks/frame, {args.frames} frames")
+    print(f"{'records':<10}{'format':<8}{'bytes/tick':>12}{'decode us':>12}{'+prices us':>12}{'ticks/s':>14}")
+    for records, fmt, payload, decode in cases:
+        decode_only = _time(lambda: decode(payload), args.frames)
+        with_prices = _time(lambda: scale_prices(decode(payload)), args.frames)
+        print(f"{records:<10}{fmt:<8}{len(payload) / args.ticks:>12.1f}{decode_only * 1e6:>12.1f}"
+              f"{with_prices * 1e6:>12.1f}{args.ticks / with_prices:>14,.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
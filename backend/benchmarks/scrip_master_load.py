@@ -0,0 +1,174 @@
+"""
+Scrip master load benchmark.
+
+Replays recorded segment CSVs through every load stage and reports per-stage
+wall time and peak traced memory:
+
+    read_csv -> normalize -> merge -> optimize_dtypes -> token_index -> search_index -> snapshot_save -> snapshot_load
+
+Usage (from backend/, with .env configured):
+
+    python -m benchmarks.scrip_master_load
+    python -m benchmarks.scrip_master_load --scale 40            # ~250k rows, production size
+    python -m benchmarks.scrip_master_load --fixtures /path/to/recorded/csvs
+    python -m benchmarks.scrip_master_load --save-baseline bench.json
+    python -m benchmarks.scrip_master_load --baseline bench.json  # exit 1 on regression
+
+Fixtures are raw segment CSVs exactly as served by the masterscrip file-paths
+URLs; the file name (without .csv) is used as the segment name.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from app.scripmaster import snapshot
+from app.scripmaster.layout import optimize_dtypes
+from app.scripmaster.normalize import normalize_segment, read_segment_csv
+from app.scripmaster.search_index import ScripSearchIndex
+from app.scripmaster.token_index import TokenIndex
+
+DEFAULT_FIXTURES = Path(__file__).parent / "fixtures" / "scrip_master"
+
+
+def load_fixtures(fixtures_dir: Path, scale: int) -> dict:
+    """Return {segment_name: csv_bytes}, repeating data rows `scale` times."""
+    segments = {}
+    for path in sorted(fixtures_dir.glob("*.csv")):
+        header, _, body = path.read_bytes().partition(b"\n")
+        if body and not body.endswith(b"\n"):
+            body += b"\n"
+        segments[path.stem.upper()] = header + b"\n" + body * scale
+    if not segments:
+        raise SystemExit(f"No CSV fixtures found in {fixtures_dir}")
+    return segments
+
+
+def run_pipeline(segments: dict, snapshot_root: Path, trace: bool) -> dict:
+    """Run all stages once; returns {stage: {"seconds": float, "peak_mb": float | None}}."""
+    import io
+
+    results = {}
+    state = {}
+
+    def stage(name, fn):
+        if trace:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] / 1e6 if trace else None
+        results[name] = {"seconds": elapsed, "peak_mb": peak}
+
+    def read_all():
+        state["raw"] = {name: read_segment_csv(io.BytesIO(data)) for name, data in segments.items()}
+
+    def normalize_all():
+        frames = [normalize_segment(df, name) for name, df in state["raw"].items()]
+        state["frames"] = [f for f in frames if f is not None]
+
+    def merge():
+        state["scrip_data"] = pd.concat(state["frames"], ignore_index=True).set_index("tradingSymbol")
+
+    def optimize():
+        state["scrip_data"] = optimize_dtypes(state["scrip_data"])
+
+    def token_index():
+        state["token_index"] = TokenIndex(state["scrip_data"])
+
+    def search_index():
+        state["search_index"] = ScripSearchIndex(state["scrip_data"])
+
+    def snapshot_save():
+        snapshot.save_snapshot(state["scrip_data"], "benchmark", "1970-01-01")
+
+    def snapshot_load():
+        state["restored"] = snapshot.load_snapshot("1970-01-01", "benchmark")
+
+    original_root = snapshot.SNAPSHOT_ROOT
+    snapshot.SNAPSHOT_ROOT = snapshot_root
+    try:
+        stage("read_csv", read_all)
+        stage("normalize", normalize_all)
+        stage("merge", merge)
+        stage("optimize_dtypes", optimize)
+        stage("token_index", token_index)
+        stage("search_index", search_index)
+        stage("snapshot_save", snapshot_save)
+        stage("snapshot_load", snapshot_load)
+    finally:
+        snapshot.SNAPSHOT_ROOT = original_root
+
+    results["_rows"] = len(state["scrip_data"])
+    results["_memory_mb"] = state["scrip_data"].memory_usage(deep=True).sum() / 1e6
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="Directory of recorded segment CSVs")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat fixture rows N times")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is reported)")
+    parser.add_argument("--baseline", type=Path, help="Fail if any stage is slower than this baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor vs baseline")
+    parser.add_argument("--save-baseline", type=Path, help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("kotak_app").setLevel(logging.WARNING)
+
+    segments = load_fixtures(args.fixtures, args.scale)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = [run_pipeline(segments, Path(tmp), trace=False) for _ in range(args.repeat)]
+
+        tracemalloc.start()
+        traced = run_pipeline(segments, Path(tmp), trace=True)
+        tracemalloc.stop()
+
+    rows = traced.pop("_rows")
+    memory_mb = traced.pop("_memory_mb")
+    stages = [name for name in traced]
+    report = {
+        name: {
+            "seconds": min(run[name]["seconds"] for run in timings),
+            "peak_mb": traced[name]["peak_mb"],
+        }
+        for name in stages
+    }
+
+    print(f"Scrip master load benchmark: {len(segments)} segments, {rows} rows (scale={args.scale})")
+    print(f"{'stage':<16}{'time (ms)':>12}{'peak (MB)':>12}")
+    for name, r in report.items():
+        print(f"{name:<16}{r['seconds'] * 1000:>12.1f}{r['peak_mb']:>12.1f}")
+    total = sum(r["seconds"] for r in report.values())
+    print(f"{'total':<16}{total * 1000:>12.1f}")
+    print(f"Merged frame footprint: {memory_mb:.1f} MB")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({"rows": rows, "stages": report}, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["stages"]
+        regressions = [
+            f"{name}: {report[name]['seconds'] * 1000:.1f} ms vs baseline {baseline[name]['seconds'] * 1000:.1f} ms"
+            for name in report
+            if name in baseline and report[name]["seconds"] > baseline[name]["seconds"] * args.tolerance
+        ]
+        if regressions:
+            print("REGRESSION (>{:.1f}x baseline):".format(args.tolerance))
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Tick normalization throughput benchmark.
+
+Feeds synthetic HSM ticks for subscribed instruments through
+
+    legacy   - the old per-tick path: scrip master lookup, scale from mul/prec,
+               format_display_name, get_market_session_info, dict build
+    context  - KotakHSMClient._handle_ticks with precomputed per-instrument
+               TickContext (callbacks are not registered, so this is
+               normalization only)
+
+and reports normalized ticks per second.
+
+Usage (from backend/, with .env configured):
+
+    python -m benchmarks.tick_throughput
+    python -m benchmarks.tick_throughput --instruments 200 --frame 50 --frames 2000
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import sys
+import time
+
+import pandas as pd
+
+from app.scripmaster.generation import ScripMasterGeneration
+from app.scripmaster.layout import optimize_dtypes
+from app.scripmaster.normalize import normalize_segment, read_segment_csv
+from app.scripmaster.service import scrip_master
+from app.utils.market_hours import get_market_session_info
+from app.utils.symbol_formatter import format_display_name
+from app.websocket.kotak_ws_hsm import KotakHSMClient
+from benchmarks.scrip_master_load import DEFAULT_FIXTURES, load_fixtures
+
+
+def install_fixture_master():
+    frames = [normalize_segment(read_segment_csv(io.BytesIO(data)), name)
+              for name, data in load_fixtures(DEFAULT_FIXTURES, 1).items()]
+    merged = pd.concat([f for f in frames if f is not None], ignore_index=True).set_index("tradingSymbol")
+    scrip_master._generation = ScripMasterGeneration.build(optimize_dtypes(merged), "benchmark", "1970-01-01")
+    return scrip_master._generation
+
+
+def legacy_normalize(tick: dict):
+    """Per-tick normalization as done before TickContext (reference baseline)."""
+    token, segment = tick.get('tk'), tick.get('e')
+    scrip = scrip_master.get_scrip_by_token(token, segment)
+    if not scrip:
+        return None
+    raw_mul, raw_prec = tick.get('mul'), tick.get('prec')
+    mul = float(raw_mul) if raw_mul is not None else float(scrip.get('multiplier', 1))
+    prec_val = float(raw_prec) if raw_prec is not None else float(scrip.get('precision', 2))
+    scale = mul * (10 ** prec_val)
+
+    def normalize(val):
+        if val is None: return 0.0
+        try:
+            return float(val) / scale
+        except:
+            return 0.0
+
+    session_info = get_market_session_info(scrip['exchangeSegment'])
+    return {
+        "symbol": scrip['tradingSymbol'],
+        "displayName": format_display_name(scrip),
+        "ltp": normalize(tick.get('ltp')),
+        "open": normalize(tick.get('o') or tick.get('op')),
+        "high": normalize(tick.get('h')),
+        "low": normalize(tick.get('lo') or tick.get('l')),
+        "close": normalize(tick.get('c')),
+        "volume": int(tick.get('v', 0)),
+        "timestamp": int(time.time()),
+        "instrumentType": scrip.get('instrumentType'),
+        "exchange": "NSE" if "NSE" in str(segment).upper() else "BSE",
+        "session": session_info["status"],
+        "isAmo": session_info["is_amo"],
+    }
+
+
+def build_ticks(generation, instruments: int, count: int, seed: int = 11):
+    rng = random.Random(seed)
+    token_index = generation.token_index
+    positions = rng.sample(range(len(generation)), min(instruments, len(generation)))
+    keys = [(str(token_index.columns["instrumentToken"][p]), str(token_index.columns["exchangeSegment"][p]))
+            for p in positions]
+    ticks = []
+    for _ in range(count):
+        tk, e = rng.choice(keys)
+        price = rng.randint(10_000, 5_000_000)
+        ticks.append({"tk": tk, "e": e, "ltp": price, "op": price - 100, "h": price + 300,
+                      "lo": price - 400, "c": price - 50, "v": rng.randint(0, 10**7), "mul": 1, "prec": 2})
+    return keys, ticks
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, default=200, help="Subscribed instruments")
+    parser.add_argument("--frame", type=int, default=50, help="Ticks per HSM frame")
+    parser.add_argument("--frames", type=int, default=2000, help="Frames per measurement")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("kotak_app").setLevel(logging.WARNING)
+
+    generation = install_fixture_master()
+    keys, ticks = build_ticks(generation, args.instruments, args.frame)
+
+    client = KotakHSMClient()
+    for tk, e in keys:
+        client._contexts.register(tk, e)
+
+    total = args.frame * args.frames
+
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        for tick in ticks:
+            legacy_normalize(tick)
+    legacy = time.perf_counter() - started
+
+    async def run_context():
+        for _ in range(args.frames):
+            await client._handle_ticks(ticks)
+
+    started = time.perf_counter()
+    asyncio.run(run_context())
+    context = time.perf_counter() - started
+
+    print(f"Tick throughput: {len(keys)} instruments, {args.frame} ticks/frame, {total} ticks")
+    print(f"{'path':<10}{'us/tick':>10}{'ticks/s':>14}")
+    for name, elapsed in (("legacy", legacy), ("context", context)):
+        print(f"{name:<10}{elapsed / total * 1e6:>10.2f}{total / elapsed:>14,.0f}")
+    print(f"speedup   {legacy / context:>10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
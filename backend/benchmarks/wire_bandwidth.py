@@ -0,0 +1,117 @@
+"""
+Frontend wire protocol bandwidth benchmark.
+
+Replays a synthetic busy session (random-walk prices: every frame moves
+ltp and volume for most instruments, OHLC only on new highs/lows, the
+timestamp once per second) through one subscribed client per protocol:
+
+    v1          - full standardized tick JSON (protocol 1)
+    v2-json     - delta protocol, JSON text frames
+    v2-msgpack  - delta protocol, MessagePack binary frames (needs msgpack)
+
+and reports bytes and messages sent per client.
+
+Usage (from backend/):
+
+    python -m benchmarks.wire_bandwidth
+    python -m benchmarks.wire_bandwidth --instruments 50 --frames 2000 --frames-per-second 4
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from typing import List
+
+from app.websocket.client_writer import ClientWriter
+from app.websocket.delta_protocol import DeltaClientWriter, msgpack
+from app.websocket.hub import MarketDataHub
+
+
+class CountingSocket:
+    async def send_text(self, text: str):
+        await asyncio.sleep(0)
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.sleep(0)
+
+
+def build_session(instruments: int, frames: int, frames_per_second: int, seed: int = 7) -> List[List[dict]]:
+    rng = random.Random(seed)
+    state = []
+    for i in range(instruments):
+        price = round(rng.uniform(50, 5000), 2)
+        state.append({
+            "symbol": f"BENCH{i}-EQ", "displayName": f"BENCH{i}", "ltp": price,
+            "open": price, "high": price, "low": price, "close": round(price * 0.99, 2),
+            "volume": rng.randint(10_000, 1_000_000), "timestamp": 1_700_000_000,
+            "instrumentType": "EQ", "exchange": "NSE", "session": "NORMAL_OPEN", "isAmo": False,
+        })
+
+    session = []
+    for n in range(frames):
+        frame = []
+        for i, tick in enumerate(state):
+            if rng.random() < 0.2:
+                continue  # no trade for this instrument in this frame
+            ltp = round(max(0.05, tick["ltp"] + rng.choice((-1, 1)) * 0.05 * rng.randint(1, 4)), 2)
+            tick = dict(tick, ltp=ltp, volume=tick["volume"] + rng.randint(1, 500),
+                        high=max(tick["high"], ltp), low=min(tick["low"], ltp),
+                        timestamp=1_700_000_000 + n // frames_per_second)
+            state[i] = tick
+            frame.append(tick)
+        session.append(frame)
+    return session
+
+
+async def replay(writer_factory, session: List[List[dict]]) -> ClientWriter:
+    hub = MarketDataHub()
+    ws = CountingSocket()
+    writer = hub.writers[ws] = writer_factory(ws, hub.disconnect)
+    writer.start()
+    for symbol in {tick["symbol"] for frame in session for tick in frame}:
+        hub.ticks.add(ws, symbol)
+    for frame in session:
+        await hub.broadcast_ticks(frame)
+        await asyncio.sleep(0)
+    while writer._ticks or writer._wakeup.is_set():
+        await asyncio.sleep(0)
+    writer.close()
+    return writer
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, default=50, help="Subscribed instruments")
+    parser.add_argument("--frames", type=int, default=2000, help="HSM frames to replay")
+    parser.add_argument("--frames-per-second", type=int, default=4, help="Frames per timestamp second")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("kotak_app").setLevel(logging.WARNING)
+
+    session = build_session(args.instruments, args.frames, args.frames_per_second)
+    ticks = sum(len(frame) for frame in session)
+
+    protocols = {
+        "v1": lambda ws, on_dead: ClientWriter(ws, 1, on_dead),
+        "v2-json": lambda ws, on_dead: DeltaClientWriter(ws, 1, on_dead, "json"),
+    }
+    if msgpack is not None:
+        protocols["v2-msgpack"] = lambda ws, on_dead: DeltaClientWriter(ws, 1, on_dead, "msgpack")
+
+    print(f"Wire bandwidth: {args.instruments} instruments, {args.frames} frames, {ticks} ticks")
+    print(f"{'protocol':<12}{'bytes':>14}{'bytes/tick':>12}{'messages':>10}{'reduction':>11}")
+    baseline = None
+    for name, factory in protocols.items():
+        writer = asyncio.run(replay(factory, session))
+        baseline = baseline or writer.bytes_sent
+        print(f"{name:<12}{writer.bytes_sent:>14,}{writer.bytes_sent / ticks:>12.1f}"
+              f"{writer.messages_sent:>10,}{baseline / writer.bytes_sent:>10.1f}x")
+    if msgpack is None:
+        print("v2-msgpack  skipped (msgpack not installed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
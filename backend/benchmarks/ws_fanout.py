@@ -0,0 +1,177 @@
+"""
+Market-data websocket fan-out benchmark.
+
+Publishes synthetic HSM frames of standardized ticks through the
+market-data hub to N in-process clients (every client subscribed to
+every instrument), using
+
+    per-client  - the previous path: writers hold tick dicts and each one
+                  json.dumps its own message on every flush
+    once        - MarketDataHub.broadcast_ticks as shipped: every tick is
+                  encoded once (orjson when installed) and writers splice the
+                  encoded fragments
+
+and reports ingested ticks/s, delivered client-ticks/s and tick-to-client
+latency (publish -> send_text) percentiles, for 1, 100 and 1000 clients.
+Client sockets yield to the event loop on every send like a real transport
+write would; latency is measured on a sample of clients.
+
+Usage (from backend/):
+
+    python -m benchmarks.ws_fanout
+    python -m benchmarks.ws_fanout --clients 1 100 1000 --instruments 50 --frame 20 --frames 200
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+from app.utils.fast_json import BACKEND
+from app.websocket.client_writer import ClientWriter
+from app.websocket.hub import MarketDataHub
+
+LATENCY_SAMPLE_CLIENTS = 20
+
+
+class BenchSocket:
+    """Stand-in frontend socket: records send time and (optionally) the text."""
+
+    def __init__(self, record: bool):
+        self.record = record
+        self.received: List[tuple] = []
+        self.messages = 0
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(0)
+        self.messages += 1
+        if self.record:
+            self.received.append((time.perf_counter(), text))
+
+
+class PerClientEncodeWriter(ClientWriter):
+    """Writer as before serialize-once: pending dicts, json.dumps per client message."""
+
+    async def _flush(self):
+        if self._ticks:
+            ticks, self._ticks = self._ticks, {}
+            batch = list(ticks.values())
+            await self._send(json.dumps(batch[0] if len(batch) == 1 else batch))
+            self.ticks_sent += len(batch)
+
+
+def per_client_broadcast(hub: MarketDataHub):
+    async def broadcast_ticks(ticks: List[dict]):
+        for tick in ticks:
+            symbol = tick['symbol']
+            for ws in hub.ticks.get(symbol):
+                hub.writers[ws].offer_tick(symbol, tick)
+    return broadcast_ticks
+
+
+def build_frames(instruments: int, frame: int, frames: int) -> List[List[dict]]:
+    symbols = [f"BENCH{i}-EQ" for i in range(instruments)]
+    out, seq = [], 0
+    for _ in range(frames):
+        ticks = []
+        for j in range(frame):
+            symbol = symbols[(seq + j) % instruments]
+            price = 1000.0 + (seq % 500) * 0.05
+            ticks.append({
+                "symbol": symbol, "displayName": symbol[:-3], "seq": seq,
+                "ltp": price, "open": price - 1.0, "high": price + 3.0, "low": price - 4.0,
+                "close": price - 0.5, "volume": 1_000_000 + seq, "timestamp": 1_700_000_000,
+                "instrumentType": "EQ", "exchange": "NSE", "session": "NORMAL_OPEN", "isAmo": False,
+            })
+            seq += 1
+        out.append(ticks)
+    return out
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(mode: str, clients: int, frames: List[List[dict]]) -> dict:
+    hub = MarketDataHub()
+    writer_cls = PerClientEncodeWriter if mode == "per-client" else ClientWriter
+    broadcast = per_client_broadcast(hub) if mode == "per-client" else hub.broadcast_ticks
+
+    sockets = [BenchSocket(record=i < LATENCY_SAMPLE_CLIENTS) for i in range(clients)]
+    for i, ws in enumerate(sockets):
+        writer = hub.writers[ws] = writer_cls(ws, i + 1, hub.disconnect)
+        writer.start()
+    symbols = {tick['symbol'] for frame in frames for tick in frame}
+    for ws in sockets:
+        for symbol in symbols:
+            hub.ticks.add(ws, symbol)
+
+    published: Dict[int, float] = {}
+    started = time.perf_counter()
+    for frame in frames:
+        now = time.perf_counter()
+        for tick in frame:
+            published[tick['seq']] = now
+        await broadcast(frame)
+        await asyncio.sleep(0)  # next HSM frame arrives after a loop turn
+
+    # Drain every writer
+    while any(w._ticks or w._wakeup.is_set() for w in hub.writers.values()):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    for writer in hub.writers.values():
+        writer.close()
+    await asyncio.sleep(0)
+
+    latencies = []
+    for ws in sockets[:LATENCY_SAMPLE_CLIENTS]:
+        for received_at, text in ws.received:
+            payload = json.loads(text)
+            for tick in payload if isinstance(payload, list) else (payload,):
+                latencies.append(received_at - published[tick['seq']])
+
+    ingested = sum(len(frame) for frame in frames)
+    delivered = sum(w.ticks_sent for w in hub.writers.values())
+    return {
+        "elapsed": elapsed,
+        "ingest": ingested / elapsed,
+        "delivered": delivered / elapsed,
+        "conflated": sum(w.conflated for w in hub.writers.values()),
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 100, 1000], help="Client counts to measure")
+    parser.add_argument("--instruments", type=int, default=50, help="Instruments (every client subscribes to all)")
+    parser.add_argument("--frame", type=int, default=20, help="Ticks per HSM frame")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per measurement")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.getLogger("kotak_app").setLevel(logging.WARNING)
+
+    frames = build_frames(args.instruments, args.frame, args.frames)
+    print(f"WebSocket fan-out: {args.instruments} instruments, {args.frame} ticks/frame, "
+          f"{args.frames} frames, encoder={BACKEND}")
+    print(f"{'clients':>8}  {'path':<11}{'ingest ticks/s':>16}{'client ticks/s':>16}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'conflated':>11}")
+    for clients in args.clients:
+        results = {mode: asyncio.run(run(mode, clients, frames)) for mode in ("per-client", "once")}
+        for mode, r in results.items():
+            print(f"{clients:>8}  {mode:<11}{r['ingest']:>16,.0f}{r['delivered']:>16,.0f}"
+                  f"{r['p50'] * 1e3:>9.2f}{r['p99'] * 1e3:>9.2f}{r['conflated']:>11,}")
+        print(f"{'':>8}  speedup    {results['per-client']['elapsed'] / results['once']['elapsed']:>15.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
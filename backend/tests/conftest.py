@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# Run from anywhere: the app package lives next to this directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Settings require credentials at import time; the tests never log in
+os.environ.setdefault("MOBILE_NUMBER", "0000000000")
+os.environ.setdefault("UCC", "TEST")
+os.environ.setdefault("MPIN", "0000")
+os.environ.setdefault("KOTAK_ACCESS_TOKEN", "test")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from app.websocket import delta_protocol
+from app.websocket.delta_protocol import DeltaClientWriter, negotiate
+
+
+class FakeSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+
+def tick(symbol="RELIANCE-EQ", **fields):
+    return {"symbol": symbol, "displayName": "RELIANCE", "instrumentType": "EQ", "exchange": "NSE",
+            "ltp": 2500.0, "volume": 100, **fields}
+
+
+async def flush(writer):
+    """Let the writer task send what is queued."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def run(test, fmt="json"):
+    async def main():
+        socket = FakeSocket()
+        writer = DeltaClientWriter(socket, 1, lambda ws: None, fmt)
+        writer.start()
+        try:
+            await test(writer, socket.frames)
+        finally:
+            await writer.stop()
+    asyncio.run(main())
+
+
+def test_first_update_sends_meta_and_every_field():
+    async def test(writer, frames):
+        writer.offer_tick("RELIANCE-EQ", tick())
+        await flush(writer)
+        assert frames == [
+            {"type": "meta", "instruments": [{"id": 1, "symbol": "RELIANCE-EQ", "displayName": "RELIANCE",
+                                              "instrumentType": "EQ", "exchange": "NSE"}]},
+            {"type": "delta", "ticks": [[1, {"ltp": 2500.0, "volume": 100}]]},
+        ]
+    run(test)
+
+
+def test_later_updates_carry_changed_fields_only():
+    async def test(writer, frames):
+        writer.offer_tick("RELIANCE-EQ", tick())
+        await flush(writer)
+        frames.clear()
+
+        writer.offer_tick("RELIANCE-EQ", tick(ltp=2501.5))
+        await flush(writer)
+        assert frames == [{"type": "delta", "ticks": [[1, {"ltp": 2501.5}]]}]
+
+        frames.clear()
+        writer.offer_tick("RELIANCE-EQ", tick(ltp=2501.5))
+        await flush(writer)
+        assert frames == []   # nothing changed, nothing sent
+    run(test)
+
+
+def test_resubscribe_gets_a_new_id_and_meta():
+    async def test(writer, frames):
+        writer.offer_tick("RELIANCE-EQ", tick())
+        await flush(writer)
+        writer.forget("RELIANCE-EQ")
+        frames.clear()
+
+        writer.offer_tick("RELIANCE-EQ", tick())
+        await flush(writer)
+        assert frames[0]["instruments"][0]["id"] == 2
+        assert frames[1] == {"type": "delta", "ticks": [[2, {"ltp": 2500.0, "volume": 100}]]}
+    run(test)
+
+
+def test_msgpack_frames_are_binary():
+    msgpack = pytest.importorskip("msgpack")
+
+    async def test(writer, frames):
+        writer.offer_tick("RELIANCE-EQ", tick())
+        await flush(writer)
+        meta, delta = (msgpack.unpackb(frame) for frame in frames)
+        assert meta["type"] == "meta"
+        assert delta == {"type": "delta", "ticks": [[1, {"ltp": 2500.0, "volume": 100}]]}
+    run(test, "msgpack")
+
+
+def test_negotiate(monkeypatch):
+    assert negotiate(1, None) == (1, "json")
+    assert negotiate("2", None) == (2, "json")
+    with pytest.raises(ValueError):
+        negotiate(3, "json")
+    with pytest.raises(ValueError):
+        negotiate(2, "xml")
+
+    monkeypatch.setattr(delta_protocol, "msgpack", None)
+    with pytest.raises(ValueError, match="msgpack"):
+        negotiate(2, "msgpack")
@@ -0,0 +1,115 @@
+import pytest
+
+from app.websocket.hsm_binary import (
+    STATUS_NOT_OK,
+    STATUS_OK,
+    TRASH_VAL,
+    HSMDecodeError,
+    HSMFrameDecoder,
+    decode_ack_frame,
+    encode_ack_frame,
+    encode_connection_frame,
+    encode_data_frame,
+    encode_snap_record,
+    encode_update_record,
+    scrip_longs,
+)
+
+
+def snap(topic_id=1, name="sf|nse_cm|11536", **fields):
+    return encode_snap_record(topic_id, name, scrip_longs(**fields), {52: "11536", 53: "nse_cm"})
+
+
+def update(topic_id=1, **fields):
+    return encode_update_record(topic_id, scrip_longs(**fields))
+
+
+def test_snap_then_update_keeps_unchanged_fields():
+    decoder = HSMFrameDecoder()
+    decoder.decode(encode_connection_frame())
+
+    (tick,) = decoder.decode(encode_data_frame([snap(ltp=250000, v=1200, prec=2)]))
+    assert tick["tk"] == "11536" and tick["e"] == "nse_cm" and tick["feed"] == "sf"
+    assert (tick["ltp"], tick["v"], tick["prec"]) == (250000, 1200, 2)
+    assert "op" not in tick  # TRASH_VAL fields are never set
+
+    (tick,) = decoder.decode(encode_data_frame([update(ltp=250500)]))
+    assert tick["ltp"] == 250500
+    assert tick["v"] == 1200
+
+
+def test_index_fields_are_renamed_onto_the_scrip_shape():
+    decoder = HSMFrameDecoder()
+    longs = [TRASH_VAL] * 12
+    longs[2] = 2450000   # index value
+    longs[3] = 2440000   # previous close
+    record = encode_snap_record(7, "if|nse_cm|Nifty 50", longs, {})
+
+    (tick,) = decoder.decode(encode_data_frame([record]))
+    assert tick["feed"] == "if"
+    assert tick["ltp"] == 2450000 and tick["c"] == 2440000
+
+
+def test_update_for_unknown_topic_is_skipped():
+    decoder = HSMFrameDecoder()
+    assert decoder.decode(encode_data_frame([update(topic_id=99, ltp=1)])) == []
+
+
+def test_truncated_frames_raise():
+    decoder = HSMFrameDecoder()
+    frame = encode_data_frame([snap(ltp=1)])
+    with pytest.raises(HSMDecodeError):
+        decoder.decode(frame[:len(frame) // 2])
+    with pytest.raises(HSMDecodeError):
+        decoder.decode(b"\x00")
+
+
+def test_connection_frame_without_acks():
+    decoder = HSMFrameDecoder()
+    assert decoder.decode(encode_connection_frame(ok=True)) == []
+    assert decoder.connection_status == STATUS_OK
+    assert not decoder.ack_enabled
+
+    decoder.decode(encode_data_frame([snap(ltp=1)]))
+    assert decoder.take_ack() is None
+    assert decoder.last_message_number is None
+
+
+def test_connection_frame_not_ok():
+    decoder = HSMFrameDecoder()
+    decoder.decode(encode_connection_frame(ok=False))
+    assert decoder.connection_status == STATUS_NOT_OK
+
+
+def test_ack_every_n_data_frames():
+    decoder = HSMFrameDecoder()
+    decoder.decode(encode_connection_frame(ack_every=3))
+    assert decoder.ack_enabled and decoder.ack_every == 3
+
+    acks = []
+    for number in range(1, 8):
+        records = [snap(ltp=number)] if number == 1 else [update(ltp=number)]
+        (tick,) = decoder.decode(encode_data_frame(records, message_number=number))
+        assert tick["ltp"] == number  # the message number is not read as a record
+        acks.append(decoder.take_ack())
+
+    assert acks == [None, None, 3, None, None, 6, None]
+    assert decoder.last_message_number == 7
+    assert decoder.take_ack() is None  # cleared once taken
+
+
+def test_reset_forgets_topics_and_acks():
+    decoder = HSMFrameDecoder()
+    decoder.decode(encode_connection_frame(ack_every=1))
+    decoder.decode(encode_data_frame([snap(ltp=1)], message_number=1))
+
+    decoder.reset()
+    assert decoder.topics == {}
+    assert not decoder.ack_enabled
+    assert decoder.take_ack() is None
+    assert decoder.connection_status is None
+
+
+def test_ack_frame_round_trip():
+    assert decode_ack_frame(encode_ack_frame(123456)) == 123456
+    assert decode_ack_frame(encode_data_frame([snap(ltp=1)])) is None
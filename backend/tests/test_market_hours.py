@@ -0,0 +1,92 @@
+import json
+from datetime import date, datetime, time
+
+import pytest
+
+from app.utils.market_hours import IST, MarketSessionEngine, segment_type
+
+HOLIDAY = date(2026, 10, 20)     # a Tuesday
+SPECIAL_SUNDAY = date(2026, 11, 8)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    calendar = {
+        "holidays": [
+            {"date": HOLIDAY.isoformat(), "description": "Dussehra"},
+            {"date": "2026-10-21", "description": "Equity only", "segments": ["CM", "FO"]},
+        ],
+        "special_sessions": [
+            {"date": HOLIDAY.isoformat(), "open": "17:00", "close": "23:30", "segments": ["MCX"]},
+            {"date": SPECIAL_SUNDAY.isoformat(), "open": "18:00", "close": "19:00"},
+        ],
+    }
+    path = tmp_path / "market_calendar.json"
+    path.write_text(json.dumps(calendar))
+    return MarketSessionEngine(path)
+
+
+def at(day: date, hour: int, minute: int = 0, second: int = 0) -> datetime:
+    return IST.localize(datetime.combine(day, time(hour, minute, second)))
+
+
+@pytest.mark.parametrize("segment, expected", [
+    ("nse_cm", "CM"),
+    ("BSE_CM", "CM"),
+    ("nse_fo", "FO"),
+    ("bse_fo", "FO"),
+    ("cde_fo", "CD"),
+    ("mcx_fo", "MCX"),
+    ("MCX_FO", "MCX"),
+    ("unknown", "CM"),
+])
+def test_segment_type(segment, expected):
+    assert segment_type(segment) == expected
+
+
+def test_holiday_closes_listed_segments_only(engine):
+    assert engine.windows("CM", HOLIDAY) == []
+    assert engine.windows("MCX", HOLIDAY) == [(time(17, 0), time(23, 30))]
+
+    equity_only = date(2026, 10, 21)
+    assert engine.windows("CM", equity_only) == []
+    assert engine.windows("CD", equity_only) == [(time(9, 0), time(17, 0))]
+    assert engine.is_holiday("nse_fo", equity_only)
+    assert not engine.is_holiday("mcx_fo", equity_only)
+
+
+def test_special_session_on_a_weekend(engine):
+    assert engine.windows("CM", SPECIAL_SUNDAY) == [(time(18, 0), time(19, 0))]
+    engine.refresh(at(SPECIAL_SUNDAY, 18, 30))
+    assert engine.summary()["segments"]["CM"] == "OPEN"
+
+
+def test_transitions_during_a_regular_day(engine):
+    day = date(2026, 10, 19)  # Monday
+    engine.refresh(at(day, 10))
+    assert engine.summary()["segments"] == {"CM": "OPEN", "FO": "OPEN", "CD": "OPEN", "MCX": "OPEN"}
+    # The close is inclusive, so the state flips one second after it
+    assert engine._next_transition == at(day, 15, 30, 1)
+
+    engine.refresh(at(day, 15, 30, 1))
+    assert engine.summary()["segments"]["CM"] == "CLOSED"
+    assert engine.summary()["segments"]["CD"] == "OPEN"
+    assert engine._next_transition == at(day, 17, 0, 1)
+
+
+def test_next_transition_skips_the_weekend(engine):
+    engine.refresh(at(date(2026, 10, 16), 23, 45))  # Friday, after the MCX close
+    assert set(engine.summary()["segments"].values()) == {"CLOSED"}
+    assert engine._next_transition == at(date(2026, 10, 19), 9, 0)
+
+
+def test_next_transition_on_a_holiday_is_the_special_session(engine):
+    engine.refresh(at(HOLIDAY, 10))
+    assert engine.summary()["segments"]["CM"] == "CLOSED"
+    assert engine.summary()["segments"]["MCX"] == "CLOSED"
+    assert engine._next_transition == at(HOLIDAY, 17, 0)
+
+
+def test_missing_calendar_uses_regular_timings(tmp_path):
+    engine = MarketSessionEngine(tmp_path / "missing.json")
+    assert engine.windows("CM", HOLIDAY) == [(time(9, 15), time(15, 30))]
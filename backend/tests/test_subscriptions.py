@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from app.websocket import subscriptions
+from app.websocket.hsm_pool import parse_scrips
+from app.websocket.subscriptions import SubscriptionRegistry
+
+GRACE = 0.05
+
+
+class FakePool:
+    """Records upstream calls; rejects or fails on request."""
+
+    def __init__(self):
+        self.subscribes = []
+        self.unsubscribes = []
+        self.depth_subscribes = []
+        self.rejected = set()
+        self.fail_unsubscribes = 0
+        self.unsubscribe_gate = None   # asyncio.Event holding unsubscribes in flight
+
+    async def subscribe(self, scrips_str):
+        keys = parse_scrips(scrips_str)
+        self.subscribes.append(keys)
+        return [key for key in keys if key[0] in self.rejected]
+
+    async def unsubscribe(self, scrips_str):
+        if self.unsubscribe_gate is not None:
+            await self.unsubscribe_gate.wait()
+        if self.fail_unsubscribes:
+            self.fail_unsubscribes -= 1
+            raise ConnectionError("socket closed")
+        self.unsubscribes.append(parse_scrips(scrips_str))
+
+    async def subscribe_depth(self, scrips_str):
+        self.depth_subscribes.append(parse_scrips(scrips_str))
+        await asyncio.sleep(0.01)
+        return [key for key in parse_scrips(scrips_str) if key[0] in self.rejected]
+
+    async def unsubscribe_depth(self, scrips_str):
+        pass
+
+
+def scrip(token):
+    return {"tradingSymbol": f"SYM{token}", "instrumentToken": token, "exchangeSegment": "nse_cm"}
+
+
+@pytest.fixture(autouse=True)
+def short_timers(monkeypatch):
+    monkeypatch.setattr(subscriptions, "UNSUBSCRIBE_GRACE_SECONDS", GRACE)
+    monkeypatch.setattr(subscriptions, "FLUSH_WINDOW_SECONDS", GRACE / 2)
+    monkeypatch.setattr(subscriptions, "COALESCE_WINDOW_SECONDS", 0.01)
+
+
+def run(test):
+    async def main():
+        pool = FakePool()
+        registry = SubscriptionRegistry(pool)
+        try:
+            await test(pool, registry)
+        finally:
+            await registry.close()
+    asyncio.run(main())
+
+
+def test_concurrent_acquires_are_batched():
+    async def test(pool, registry):
+        results = await asyncio.gather(*(registry.acquire(scrip(t)) for t in ("1", "2", "2")))
+        assert results == [True, True, True]
+        assert pool.subscribes == [[("1", "nse_cm"), ("2", "nse_cm")]]
+        assert registry.entries["SYM2"].refs == 2
+    run(test)
+
+
+def test_rejected_instrument_is_not_registered():
+    async def test(pool, registry):
+        pool.rejected.add("1")
+        assert not await registry.acquire(scrip("1"))
+        assert "SYM1" not in registry.entries
+    run(test)
+
+
+def test_reacquire_within_grace_keeps_the_subscription():
+    async def test(pool, registry):
+        await registry.acquire(scrip("1"))
+        registry.release("SYM1")
+        await asyncio.sleep(GRACE / 2)
+        assert await registry.acquire(scrip("1"))
+        await asyncio.sleep(GRACE * 2)
+
+        assert pool.unsubscribes == []
+        assert len(pool.subscribes) == 1
+        assert registry.entries["SYM1"].released_at is None
+    run(test)
+
+
+def test_released_instruments_are_unsubscribed_in_one_batch():
+    async def test(pool, registry):
+        await asyncio.gather(registry.acquire(scrip("1")), registry.acquire(scrip("2")))
+        registry.release("SYM1")
+        registry.release("SYM2")
+        await asyncio.sleep(GRACE * 3)
+
+        assert pool.unsubscribes == [[("1", "nse_cm"), ("2", "nse_cm")]]
+        assert registry.entries == {}
+        assert registry.upstream_unsubscribes == 2
+    run(test)
+
+
+def test_failed_unsubscribe_is_retried():
+    async def test(pool, registry):
+        pool.fail_unsubscribes = 1
+        await registry.acquire(scrip("1"))
+        registry.release("SYM1")
+        await asyncio.sleep(GRACE * 1.5)
+
+        # Still subscribed upstream: tracked again for another grace period
+        assert pool.unsubscribes == []
+        assert registry.entries["SYM1"].released_at is not None
+
+        await asyncio.sleep(GRACE * 2)
+        assert pool.unsubscribes == [[("1", "nse_cm")]]
+        assert registry.entries == {}
+    run(test)
+
+
+def test_failed_unsubscribe_does_not_replace_a_fresh_entry():
+    async def test(pool, registry):
+        pool.fail_unsubscribes = 1
+        pool.unsubscribe_gate = asyncio.Event()
+        await registry.acquire(scrip("1"))
+        registry.release("SYM1")
+        await asyncio.sleep(GRACE * 1.5)
+
+        # Re-acquired while the unsubscribe is in flight: a new entry and subscription
+        assert "SYM1" not in registry.entries
+        assert await registry.acquire(scrip("1"))
+        fresh = registry.entries["SYM1"]
+
+        pool.unsubscribe_gate.set()
+        await asyncio.sleep(0.01)
+        assert registry.entries["SYM1"] is fresh
+        assert fresh.refs == 1 and fresh.released_at is None
+        assert len(pool.subscribes) == 2
+    run(test)
+
+
+def test_concurrent_depth_acquirers_share_the_acknowledgement():
+    async def test(pool, registry):
+        await registry.acquire(scrip("1"))
+        pool.rejected.add("1")   # depth rejected; the touchline stays subscribed
+
+        results = await asyncio.gather(registry.acquire_depth(scrip("1")), registry.acquire_depth(scrip("1")))
+        assert results == [False, False]
+        assert len(pool.depth_subscribes) == 1
+        entry = registry.entries["SYM1"]
+        assert entry.depth_refs == 0
+        assert entry.refs == 1
+    run(test)
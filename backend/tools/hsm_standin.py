@@ -0,0 +1,402 @@
+"""
+Local stand-in for the Kotak HSM market data websocket.
+
+Speaks enough of the protocol to exercise KotakHSMClient without a broker
+session: accepts the "cn" handshake (answering with a binary CONNECTION frame that
+turns on acknowledgements every ack_every DATA frames), records "mws" / "mwu" and depth
+"dps" / "dpu" subscription changes, answers with a binary SNAP record per
+scrip and then streams binary UPDATE frames (see app/websocket/hsm_binary.py),
+counting the client's ACK frames. Connections can be dropped (network
+blip) or stalled (socket stays open, nothing is read, pings go unanswered)
+to drive the client's reconnect and heartbeat-timeout paths.
+
+Run a server and point the backend at it:
+
+    python -m tools.hsm_standin --port 8765 --drop-every 30
+    KOTAK_HSM_URL=ws://127.0.0.1:8765 uvicorn app.main:app
+
+Or run the reconnect and pool checks against it (from backend/, with .env configured):
+
+    python -m tools.hsm_standin --check
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from typing import Dict, List, Optional, Set
+
+import websockets
+
+from app.websocket.hsm_binary import (
+    decode_ack_frame,
+    depth_longs,
+    encode_connection_frame,
+    encode_data_frame,
+    encode_snap_record,
+    encode_update_record,
+    scrip_longs,
+)
+
+
+class StandInConnection:
+    """Server-side state of one client connection."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.authorized = False
+        self.topics: Dict[str, int] = {}       # "sf|nse_cm|11536" -> topic id
+        self.prices: Dict[int, int] = {}       # topic id -> last raw ltp
+        self.depth_topics: Dict[str, int] = {}  # "dp|nse_cm|11536" -> topic id
+        self.next_topic_id = 1
+        self.subscribe_frames = 0
+        self.ack_every = 0
+        self.message_number = 0
+        self.last_acked: Optional[int] = None
+
+    async def send_data(self, records: List[bytes]):
+        """DATA frame, numbered once acknowledgements are on."""
+        number = None
+        if self.ack_every:
+            number = self.message_number = self.message_number + 1
+        await self.ws.send(encode_data_frame(records, number))
+
+
+class HSMStandInServer:
+    """In-process HSM stand-in; see module docstring."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tick_interval: float = 0.2, seed: int = 3,
+                 ack_every: int = 5):
+        self.host = host
+        self.port = port
+        self.tick_interval = tick_interval
+        self.ack_every = ack_every
+        self.acks = 0
+        self.connections: Set[StandInConnection] = set()
+        self.total_connections = 0
+        self.subscribe_frames = 0
+        self.heartbeats = 0
+        self._rng = random.Random(seed)
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- failure injection ---
+
+    def drop_all(self):
+        """Abort every connection without a close frame (network blip)."""
+        for conn in list(self.connections):
+            conn.ws.transport.abort()
+
+    def stall_all(self):
+        """Stop reading every connection: pings go unanswered, the socket stays open."""
+        for conn in list(self.connections):
+            conn.ws.transport.pause_reading()
+
+    # --- protocol ---
+
+    async def _handle(self, ws):
+        conn = StandInConnection(ws)
+        self.connections.add(conn)
+        self.total_connections += 1
+        ticker = asyncio.create_task(self._tick_loop(conn))
+        try:
+            async for message in ws:
+                await self._on_message(conn, message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            ticker.cancel()
+            self.connections.discard(conn)
+
+    async def _on_message(self, conn: StandInConnection, message):
+        if isinstance(message, bytes):
+            acked = decode_ack_frame(message)
+            if acked is not None:
+                conn.last_acked = acked
+                self.acks += 1
+            return
+        try:
+            request = json.loads(message)
+        except (TypeError, ValueError):
+            return
+
+        kind = request.get("type")
+        if kind == "cn":
+            conn.authorized = bool(request.get("Authorization")) and bool(request.get("Sid"))
+            conn.ack_every = self.ack_every if conn.authorized else 0
+            await conn.ws.send(encode_connection_frame(conn.authorized, conn.ack_every))
+        elif kind == "ti":
+            self.heartbeats += 1
+        elif kind == "mws" and conn.authorized:
+            conn.subscribe_frames += 1
+            self.subscribe_frames += 1
+            await self._subscribe(conn, request.get("scrips", ""))
+        elif kind == "mwu" and conn.authorized:
+            self._unsubscribe(conn, request.get("scrips", ""))
+        elif kind == "dps" and conn.authorized:
+            await self._subscribe_depth(conn, request.get("scrips", ""))
+        elif kind == "dpu" and conn.authorized:
+            for part in request.get("scrips", "").strip("&").split("&"):
+                if "|" in part:
+                    conn.depth_topics.pop(f"dp|{part}", None)
+
+    async def _subscribe(self, conn: StandInConnection, scrips: str):
+        records = []
+        for part in scrips.strip("&").split("&"):
+            if "|" not in part:
+                continue
+            segment, token = part.split("|", 1)
+            name = f"sf|{segment}|{token}"
+            if name in conn.topics:
+                continue
+            topic_id = conn.topics[name] = conn.next_topic_id
+            conn.next_topic_id += 1
+            price = conn.prices[topic_id] = self._rng.randint(10_000, 500_000)
+            longs = scrip_longs(ltp=price, op=price, h=price, lo=price, c=price, v=0, mul=1, prec=2)
+            records.append(encode_snap_record(topic_id, name, longs, {52: token, 53: segment}))
+        if records:
+            await conn.send_data(records)
+
+    async def _subscribe_depth(self, conn: StandInConnection, scrips: str):
+        records = []
+        for part in scrips.strip("&").split("&"):
+            if "|" not in part:
+                continue
+            segment, token = part.split("|", 1)
+            name = f"dp|{segment}|{token}"
+            if name in conn.depth_topics:
+                continue
+            topic_id = conn.depth_topics[name] = conn.next_topic_id
+            conn.next_topic_id += 1
+            records.append(encode_snap_record(topic_id, name, self._depth_longs(self._rng.randint(10_000, 500_000)),
+                                              {52: token, 53: segment}))
+        if records:
+            await conn.send_data(records)
+
+    def _depth_longs(self, mid: int) -> List[int]:
+        """Five levels each side around a mid price (raw, prec 2)."""
+        fields = {"mul": 1, "prec": 2}
+        for level in range(5):
+            suffix = "" if level == 0 else str(level)
+            fields[f"bp{suffix}"] = mid - 5 * (level + 1)
+            fields[f"sp{suffix}"] = mid + 5 * (level + 1)
+            fields[f"bq{suffix}"] = self._rng.randint(1, 5000)
+            fields[f"bs{suffix}"] = self._rng.randint(1, 5000)
+            fields[f"bno{level + 1}"] = self._rng.randint(1, 50)
+            fields[f"sno{level + 1}"] = self._rng.randint(1, 50)
+        return depth_longs(**fields)
+
+    def _unsubscribe(self, conn: StandInConnection, scrips: str):
+        for part in scrips.strip("&").split("&"):
+            if "|" in part:
+                segment, token = part.split("|", 1)
+                topic_id = conn.topics.pop(f"sf|{segment}|{token}", None)
+                conn.prices.pop(topic_id, None)
+
+    async def _tick_loop(self, conn: StandInConnection):
+        volume = 0
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if not conn.prices and not conn.depth_topics:
+                continue
+            volume += 100
+            records: List[bytes] = []
+            for topic_id, price in list(conn.prices.items()):
+                price = conn.prices[topic_id] = max(1, price + self._rng.randint(-50, 50))
+                records.append(encode_update_record(topic_id, scrip_longs(ltp=price, v=volume)[:6]))
+            for topic_id in list(conn.depth_topics.values()):
+                records.append(encode_update_record(topic_id, self._depth_longs(self._rng.randint(10_000, 500_000))))
+            try:
+                await conn.send_data(records)
+            except websockets.ConnectionClosed:
+                return
+
+
+async def run_check() -> int:
+    """Drive KotakHSMClient through a drop and a heartbeat timeout; verify replay."""
+    from app.config import get_settings
+    from app.websocket import kotak_ws_hsm
+    from app.websocket.kotak_ws_hsm import KotakHSMClient
+
+    # Shorten timings so the check runs in seconds
+    kotak_ws_hsm.HEARTBEAT_INTERVAL = 0.5
+    kotak_ws_hsm.HEARTBEAT_TIMEOUT = 0.5
+    kotak_ws_hsm.RECONNECT_BASE_DELAY = 0.05
+    kotak_ws_hsm.RECONNECT_MAX_DELAY = 0.2
+    kotak_ws_hsm.MAX_SCRIPS = 2
+
+    server = HSMStandInServer()
+    await server.start()
+    # Every client (and pool shard) created from here on connects to the stand-in
+    get_settings().KOTAK_HSM_URL = server.url
+
+    client = KotakHSMClient()
+    frames: List[int] = []
+    client._handle_ticks = _count_into(frames)
+
+    failures = []
+
+    def check(ok: bool, what: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {what}")
+        if not ok:
+            failures.append(what)
+
+    async def wait_for(predicate, timeout: float = 5.0) -> bool:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            if predicate():
+                return True
+            await asyncio.sleep(0.02)
+        return False
+
+    def subscribed_topics() -> int:
+        return sum(len(conn.topics) for conn in server.connections)
+
+    await client.connect("token", "sid")
+    for token in ("11536", "1594", "2885"):
+        await client.subscribe(f"nse_cm|{token}&")
+    check(await wait_for(lambda: subscribed_topics() == 3), "initial subscriptions reach the server")
+    check(await wait_for(lambda: len(frames) > 0), "ticks flow")
+
+    server.drop_all()
+    check(await wait_for(lambda: client.metrics.reconnect_count == 1 and subscribed_topics() == 3),
+          "reconnect after drop replays all 3 subscriptions")
+    replay_frames = sum(conn.subscribe_frames for conn in server.connections)
+    check(replay_frames == 2, f"replay batched into 2 subscribe frames (got {replay_frames})")
+
+    # Subscribed while disconnected -> queued and replayed
+    server.drop_all()
+    await client.subscribe("nse_cm|3045&")
+    check(await wait_for(lambda: client.metrics.reconnect_count == 2 and subscribed_topics() == 4),
+          "subscription made while disconnected is replayed")
+
+    server.stall_all()
+    check(await wait_for(lambda: client.metrics.heartbeat_timeouts == 1), "stalled server trips heartbeat timeout")
+    check(await wait_for(lambda: client.metrics.reconnect_count == 3 and subscribed_topics() == 4),
+          "reconnect after heartbeat timeout")
+
+    before = len(frames)
+    check(await wait_for(lambda: len(frames) > before), "ticks flow after reconnect")
+
+    conn = max(server.connections, key=lambda c: c.message_number)  # the stalled socket stays open
+    check(await wait_for(lambda: conn.last_acked is not None and conn.last_acked % server.ack_every == 0),
+          f"client acknowledges every {server.ack_every} data frames")
+
+    print(json.dumps(client.metrics_snapshot(), indent=2))
+    await client.disconnect()
+
+    await run_pool_check(server, check, wait_for)
+    await server.stop()
+    return 1 if failures else 0
+
+
+async def run_pool_check(server: HSMStandInServer, check, wait_for):
+    """Shard 10 instruments over 3 connections of 3, shrink back, then retry a shard whose connect fails."""
+    from app.config import get_settings
+    from app.websocket import hsm_pool
+    from app.websocket.hsm_pool import HSMPool
+    from app.websocket.kotak_ws_hsm import KotakHSMClient
+
+    hsm_pool.INSTRUMENTS_PER_CONNECTION = 3
+    KotakHSMClient._handle_ticks = _dispatch_raw
+    pool = HSMPool(max_connections=3)
+    ticked = set()
+
+    async def collect(ticks):
+        ticked.update(tick["tk"] for tick in ticks)
+
+    def upstream():
+        return sorted(name.rsplit("|", 1)[1] for conn in server.connections for name in conn.topics)
+
+    pool.add_batch_callback(collect)
+    await pool.connect("token", "sid")
+
+    tokens = [str(20000 + i) for i in range(10)]
+    rejected = await pool.subscribe("".join(f"nse_cm|{tk}&" for tk in tokens))
+    check(len(pool.shards) == 3 and len(rejected) == 1,
+          f"10 instruments over 3x3 slots -> 3 shards, 1 rejected (got {len(pool.shards)}, {len(rejected)})")
+    check(await wait_for(lambda: upstream() == sorted(tokens[:9])), "all placed instruments subscribed upstream")
+    check(all(sum(1 for load in shard.channel_load.values() if load) == 1 for shard in pool.shards.values()),
+          "one subscribe batch lands on one channel per shard")
+    check(await wait_for(lambda: ticked >= set(tokens[:9])), "merged tick stream carries every shard")
+
+    await pool.unsubscribe("".join(f"nse_cm|{tk}&" for tk in tokens[:5]))
+    check(len(pool.shards) == 2 and len(pool.assignments) == 4, f"rebalanced to 2 shards (got {len(pool.shards)})")
+    check(sorted(pool.shards) == [1, 2], f"the emptied shard 0 is closed, not the last one (kept {sorted(pool.shards)})")
+    check(await wait_for(lambda: upstream() == sorted(tokens[5:9])), "unsubscribed and moved instruments settle upstream")
+
+    # A new shard whose first connect fails is retried with backoff
+    get_settings().KOTAK_HSM_URL = "ws://127.0.0.1:9"
+    await pool.unsubscribe(f"nse_cm|{tokens[5]}&")
+    await pool.subscribe("".join(f"nse_cm|{tk}&" for tk in tokens[:5]))
+    failing = [shard for shard in pool.shards.values() if shard.retrying]
+    reported = {entry["id"]: entry["running"] for entry in pool.metrics_snapshot()["shards"]}
+    check(len(failing) == 2 and not any(reported[shard.shard_id] for shard in failing),
+          f"shards that failed to connect are retrying and reported not running (got {len(failing)})")
+    get_settings().KOTAK_HSM_URL = server.url
+    for shard in failing:
+        shard.client.url = server.url
+    check(await wait_for(lambda: all(shard.client.is_running and not shard.retrying for shard in failing)),
+          "retries connect the shards")
+    check(await wait_for(lambda: upstream() == sorted(tokens[:5] + tokens[6:9])),
+          "instruments placed on the retried shards reach the server")
+
+    await pool.disconnect()
+
+
+async def _dispatch_raw(self, ticks):
+    """Skip scrip master normalization: stand-in tokens are not real instruments."""
+    await self._dispatch([tick for tick in ticks if tick.get("tk")])
+
+
+def _count_into(frames: List[int]):
+    async def handle_ticks(ticks):
+        frames.append(len(ticks))
+    return handle_ticks
+
+
+async def serve(host: str, port: int, tick_interval: float, drop_every: Optional[float], ack_every: int):
+    server = HSMStandInServer(host, port, tick_interval, ack_every=ack_every)
+    await server.start()
+    print(f"HSM stand-in listening on {server.url}")
+    while True:
+        await asyncio.sleep(drop_every or 3600)
+        if drop_every:
+            print(f"Dropping {len(server.connections)} connection(s)")
+            server.drop_all()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick-interval", type=float, default=0.2, help="Seconds between update frames")
+    parser.add_argument("--drop-every", type=float, default=None, help="Abort all connections every N seconds")
+    parser.add_argument("--ack-every", type=int, default=5, help="DATA frames per client ACK (0 disables acks)")
+    parser.add_argument("--check", action="store_true", help="Run the reconnect check and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return asyncio.run(run_check())
+    try:
+        asyncio.run(serve(args.host, args.port, args.tick_interval, args.drop_every, args.ack_every))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,6 +34,24 @@ async function fetchYahooFinanceData(symbol: string): Promise<CandlestickData[]>
     }
 }
 
+// Today's 1-minute bars built by the backend from live ticks (served from memory)
+async function fetchIntradayCandles(symbol: string): Promise<CandlestickData[]> {
+    try {
+        const response = await fetch(`http://localhost:8000/historical/${symbol}/intraday?interval=1m`);
+
+        if (!response.ok) {
+            console.warn(`Backend intraday API returned ${response.status}`);
+            return [];
+        }
+
+        const data = await response.json();
+        return data.candles || [];
+    } catch (error) {
+        console.error('Failed to fetch intraday candles from backend:', error);
+        return [];
+    }
+}
+
 export const ChartContainer: React.FC<ChartProps> = ({ symbol, height = 400 }) => {
     const chartContainerRef = useRef<HTMLDivElement>(null);
     const seriesRef = useRef<ISeriesApi<'Candlestick'>>(null);
@@ -75,11 +93,24 @@ export const ChartContainer: React.FC<ChartProps> = ({ symbol, height = 400 }) =
         });
 
         seriesRef.current = candlestickSeries;
+        let unsubscribe: (() => void) | null = null;
+        let disposed = false;
 
         // STEP 1: Fetch and render historical data FIRST
         (async () => {
             setLoading(true);
-            const historicalCandles = await fetchYahooFinanceData(symbol);
+            const [dailyCandles, intradayCandles] = await Promise.all([
+                fetchYahooFinanceData(symbol),
+                fetchIntradayCandles(symbol),
+            ]);
+            if (disposed) return;
+
+            // Today's live-built minute bars continue the daily history
+            const lastDaily = dailyCandles.length > 0 ? (dailyCandles[dailyCandles.length - 1].time as number) : 0;
+            const historicalCandles = [
+                ...dailyCandles,
+                ...intradayCandles.filter(candle => (candle.time as number) > lastDaily),
+            ];
 
             if (historicalCandles.length > 0) {
                 candlestickSeries.setData(historicalCandles);
@@ -92,45 +123,23 @@ export const ChartContainer: React.FC<ChartProps> = ({ symbol, height = 400 }) =
 
             setLoading(false);
 
-            // STEP 2: AFTER chart is rendered, attach WebSocket for live updates
-            const unsubscribe = wsService.subscribeQuotes(symbol, (tick) => {
-                if (!seriesRef.current || !tick.ltp) return;
-
-                const time = tick.timestamp;
-                const ltp = tick.ltp;
+            // STEP 2: AFTER chart is rendered, stream live 1-minute bars from the backend aggregator
+            unsubscribe = wsService.subscribeCandles(symbol, '1m', (candle) => {
+                if (!seriesRef.current) return;
 
-                // Append WebSocket ticks to existing chart data
                 const currentCandle = lastCandleRef.current;
-                const minuteTimestamp = Math.floor(time / 60) * 60;
-
-                if (currentCandle && currentCandle.time === minuteTimestamp) {
-                    // Update current candle
-                    const updatedCandle = {
-                        ...currentCandle,
-                        high: Math.max(currentCandle.high, ltp),
-                        low: Math.min(currentCandle.low, ltp),
-                        close: ltp,
-                    };
-                    seriesRef.current.update(updatedCandle);
-                    lastCandleRef.current = updatedCandle;
-                } else {
-                    // New candle
-                    const newCandle = {
-                        time: minuteTimestamp as any,
-                        open: ltp,
-                        high: ltp,
-                        low: ltp,
-                        close: ltp,
-                    };
-                    seriesRef.current.update(newCandle);
-                    lastCandleRef.current = newCandle;
-                }
+                if (currentCandle && (candle.time as number) < (currentCandle.time as number)) return;
+
+                const bar = {
+                    time: candle.time as any,
+                    open: candle.open,
+                    high: candle.high,
+                    low: candle.low,
+                    close: candle.close,
+                };
+                seriesRef.current.update(bar);
+                lastCandleRef.current = bar;
             });
-
-            // Cleanup WebSocket on unmount
-            return () => {
-                unsubscribe();
-            };
         })();
 
         const handleResize = () => {
@@ -142,6 +151,8 @@ export const ChartContainer: React.FC<ChartProps> = ({ symbol, height = 400 }) =
         window.addEventListener('resize', handleResize);
 
         return () => {
+            disposed = true;
+            unsubscribe?.();
             window.removeEventListener('resize', handleResize);
             chart.remove();
         };
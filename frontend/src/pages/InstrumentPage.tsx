@@ -53,7 +53,18 @@ const InstrumentPage: React.FC = () => {
             }) : prev);
         });
 
-        return () => unsubscribe();
+        // Live order book replaces the depth from the initial quote
+        const unsubscribeDepth = wsService.subscribeDepth(symbol, (depth) => {
+            setQuote((prev: any) => prev ? ({
+                ...prev,
+                depth: { buy: depth.buy, sell: depth.sell }
+            }) : prev);
+        });
+
+        return () => {
+            unsubscribe();
+            unsubscribeDepth();
+        };
     }, [symbol]);
 
     const parsed = symbol ? parseSymbol(symbol, scrip) : null;
@@ -19,15 +19,54 @@ interface QuoteData {
 
 type QuoteCallback = (quote: QuoteData) => void;
 
+interface DepthLevel {
+    price: number;
+    quantity: number;
+    orders: number;
+}
+
+// 5-level order book pushed by the backend ({"type": "depth", ...})
+export interface DepthData {
+    type: 'depth';
+    symbol: string;
+    buy: DepthLevel[];
+    sell: DepthLevel[];
+    totalBuyQty: number;
+    totalSellQty: number;
+    timestamp: number;
+}
+
+type DepthCallback = (depth: DepthData) => void;
+
+// Live OHLCV bar from the backend candle aggregator ({"type": "candle", ...})
+export interface CandleData {
+    type: 'candle';
+    symbol: string;
+    interval: string;
+    time: number;
+    open: number;
+    high: number;
+    low: number;
+    close: number;
+    volume: number;
+}
+
+type CandleCallback = (candle: CandleData) => void;
+
 class WebSocketService {
     private ws: WebSocket | null = null;
     private subscriptions: Map<string, Set<QuoteCallback>> = new Map();
+    private depthSubscriptions: Map<string, Set<DepthCallback>> = new Map();
+    // "SYMBOL|interval" -> callbacks
+    private candleSubscriptions: Map<string, Set<CandleCallback>> = new Map();
     private reconnectAttempts = 0;
     private maxReconnectAttempts = 5;
     private reconnectDelay = 3000; // ms
     private reconnectTimeout: number | null = null;
     private connected = false;
     private tickCount: Map<string, number> = new Map(); // Track ticks per symbol
+    // Delta protocol: per-connection instrument id -> last full tick
+    private instruments: Map<number, any> = new Map();
 
     constructor() {
         // Auto-connect on initialization
@@ -48,6 +87,10 @@ class WebSocketService {
                     this.connected = true;
                     this.reconnectAttempts = 0;
 
+                    // Opt in to the compact delta protocol (ids are per connection)
+                    this.instruments.clear();
+                    this.ws!.send(JSON.stringify({ action: 'protocol', version: 2, format: 'json' }));
+
                     // Resubscribe to all symbols
                     this.resubscribeAll();
 
@@ -56,56 +99,58 @@ class WebSocketService {
 
                 this.ws.onmessage = (event) => {
                     try {
-                        const data = JSON.parse(event.data);
+                        const payload = JSON.parse(event.data);
 
                         // Handle status messages
-                        if (data.status) {
-                            console.log(`WebSocket status: ${data.status}`, data.symbols);
+                        if (payload.status) {
+                            console.log(`WebSocket status: ${payload.status}`, payload.symbols);
                             return;
                         }
 
-                        // Handle tick data with COMPREHENSIVE LOGGING
-                        if (data.symbol) {
-                            const tickNum = (this.tickCount.get(data.symbol) || 0) + 1;
-                            this.tickCount.set(data.symbol, tickNum);
-
-                            console.group(`🔴 WebSocket LIVE Tick #${tickNum} - ${data.symbol}`);
-                            console.log('RAW TICK PAYLOAD:', JSON.stringify(data, null, 2));
-                            console.log('---');
-
-                            // REQUIRED fields
-                            console.log('Symbol:', data.symbol);
-                            console.log('LTP:', data.ltp);
-                            console.log('Timestamp:', data.timestamp, new Date(data.timestamp * 1000).toLocaleTimeString());
-
-                            // OPTIONAL fields - verify which are present
-                            console.group('📊 Additional Fields Present:');
-                            if (data.open !== undefined) console.log('✅ Open:', data.open);
-                            else console.log('❌ Open: NOT PROVIDED');
-
-                            if (data.high !== undefined) console.log('✅ High:', data.high);
-                            else console.log('❌ High: NOT PROVIDED');
-
-                            if (data.low !== undefined) console.log('✅ Low:', data.low);
-                            else console.log('❌ Low: NOT PROVIDED');
+                        // Market depth updates (order book snapshots)
+                        if (payload.type === 'depth') {
+                            this.handleDepthUpdate(payload);
+                            return;
+                        }
 
-                            if (data.close !== undefined) console.log('✅ Close:', data.close);
-                            else console.log('❌ Close: NOT PROVIDED');
+                        // Live OHLCV bars
+                        if (payload.type === 'candle') {
+                            this.handleCandleUpdate(payload);
+                            return;
+                        }
 
-                            if (data.volume !== undefined) console.log('✅ Volume:', data.volume);
-                            else console.log('❌ Volume: NOT PROVIDED');
+                        // Delta protocol (v2): instrument metadata once, then changed fields by id
+                        if (payload.type === 'protocol') {
+                            console.log(`WebSocket protocol v${payload.version} (${payload.format})`);
+                            return;
+                        }
 
-                            if (data.change !== undefined) console.log('✅ Change:', data.change);
-                            else console.log('❌ Change: NOT PROVIDED');
+                        if (payload.type === 'meta') {
+                            for (const instrument of payload.instruments) {
+                                const { id, ...meta } = instrument;
+                                this.instruments.set(id, meta);
+                            }
+                            return;
+                        }
 
-                            if (data.per_change !== undefined) console.log('✅ % Change:', data.per_change);
-                            else console.log('❌ % Change: NOT PROVIDED');
-                            console.groupEnd();
+                        if (payload.type === 'delta') {
+                            for (const [id, fields] of payload.ticks) {
+                                const state = this.instruments.get(id);
+                                if (state) {
+                                    Object.assign(state, fields);
+                                    this.handleTick({ ...state });
+                                }
+                            }
+                            return;
+                        }
 
-                            console.log('✅ LIVE UPDATE CONFIRMED');
-                            console.groupEnd();
+                        // Ticks of one feed frame arrive together as an array
+                        const ticks = Array.isArray(payload) ? payload : [payload];
 
-                            this.handleQuoteUpdate(data);
+                        for (const data of ticks) {
+                            if (data.symbol) {
+                                this.handleTick(data);
+                            }
                         }
                     } catch (error) {
                         console.error('Error parsing WebSocket message:', error);
@@ -131,10 +176,27 @@ class WebSocketService {
     }
 
     private resubscribeAll() {
-        if (!this.connected || !this.ws || this.subscriptions.size === 0) {
+        if (!this.connected || !this.ws) {
             return;
         }
 
+        const depthSymbols = Array.from(this.depthSubscriptions.keys());
+        if (depthSymbols.length > 0) {
+            this.ws.send(JSON.stringify({
+                action: 'subscribe_depth',
+                symbols: depthSymbols
+            }));
+        }
+
+        for (const key of this.candleSubscriptions.keys()) {
+            const [symbol, interval] = key.split('|');
+            this.ws.send(JSON.stringify({
+                action: 'subscribe_candles',
+                symbols: [symbol],
+                interval
+            }));
+        }
+
         const symbols = Array.from(this.subscriptions.keys());
 
         if (symbols.length > 0) {
@@ -204,6 +266,149 @@ class WebSocketService {
         };
     }
 
+    subscribeDepth(symbol: string, callback: DepthCallback): () => void {
+        if (!this.depthSubscriptions.has(symbol)) {
+            this.depthSubscriptions.set(symbol, new Set());
+
+            if (this.connected && this.ws) {
+                this.ws.send(JSON.stringify({
+                    action: 'subscribe_depth',
+                    symbols: [symbol]
+                }));
+                console.log(`📡 Subscribed to market depth for ${symbol}`);
+            }
+        }
+
+        this.depthSubscriptions.get(symbol)!.add(callback);
+
+        return () => {
+            const callbacks = this.depthSubscriptions.get(symbol);
+            if (callbacks) {
+                callbacks.delete(callback);
+
+                if (callbacks.size === 0) {
+                    this.depthSubscriptions.delete(symbol);
+
+                    if (this.connected && this.ws) {
+                        this.ws.send(JSON.stringify({
+                            action: 'unsubscribe_depth',
+                            symbols: [symbol]
+                        }));
+                    }
+                }
+            }
+        };
+    }
+
+    // Handle tick data with COMPREHENSIVE LOGGING
+    private handleTick(data: any) {
+        const tickNum = (this.tickCount.get(data.symbol) || 0) + 1;
+        this.tickCount.set(data.symbol, tickNum);
+
+        console.group(`🔴 WebSocket LIVE Tick #${tickNum} - ${data.symbol}`);
+        console.log('RAW TICK PAYLOAD:', JSON.stringify(data, null, 2));
+        console.log('---');
+
+        // REQUIRED fields
+        console.log('Symbol:', data.symbol);
+        console.log('LTP:', data.ltp);
+        console.log('Timestamp:', data.timestamp, new Date(data.timestamp * 1000).toLocaleTimeString());
+
+        // OPTIONAL fields - verify which are present
+        console.group('📊 Additional Fields Present:');
+        if (data.open !== undefined) console.log('✅ Open:', data.open);
+        else console.log('❌ Open: NOT PROVIDED');
+
+        if (data.high !== undefined) console.log('✅ High:', data.high);
+        else console.log('❌ High: NOT PROVIDED');
+
+        if (data.low !== undefined) console.log('✅ Low:', data.low);
+        else console.log('❌ Low: NOT PROVIDED');
+
+        if (data.close !== undefined) console.log('✅ Close:', data.close);
+        else console.log('❌ Close: NOT PROVIDED');
+
+        if (data.volume !== undefined) console.log('✅ Volume:', data.volume);
+        else console.log('❌ Volume: NOT PROVIDED');
+
+        if (data.change !== undefined) console.log('✅ Change:', data.change);
+        else console.log('❌ Change: NOT PROVIDED');
+
+        if (data.per_change !== undefined) console.log('✅ % Change:', data.per_change);
+        else console.log('❌ % Change: NOT PROVIDED');
+        console.groupEnd();
+
+        console.log('✅ LIVE UPDATE CONFIRMED');
+        console.groupEnd();
+
+        this.handleQuoteUpdate(data);
+    }
+
+    subscribeCandles(symbol: string, interval: string, callback: CandleCallback): () => void {
+        const key = `${symbol}|${interval}`;
+        if (!this.candleSubscriptions.has(key)) {
+            this.candleSubscriptions.set(key, new Set());
+
+            if (this.connected && this.ws) {
+                this.ws.send(JSON.stringify({
+                    action: 'subscribe_candles',
+                    symbols: [symbol],
+                    interval
+                }));
+                console.log(`📡 Subscribed to ${interval} candles for ${symbol}`);
+            }
+        }
+
+        this.candleSubscriptions.get(key)!.add(callback);
+
+        return () => {
+            const callbacks = this.candleSubscriptions.get(key);
+            if (callbacks) {
+                callbacks.delete(callback);
+
+                if (callbacks.size === 0) {
+                    this.candleSubscriptions.delete(key);
+
+                    if (this.connected && this.ws) {
+                        this.ws.send(JSON.stringify({
+                            action: 'unsubscribe_candles',
+                            symbols: [symbol],
+                            interval
+                        }));
+                    }
+                }
+            }
+        };
+    }
+
+    private handleCandleUpdate(data: CandleData) {
+        const callbacks = this.candleSubscriptions.get(`${data.symbol}|${data.interval}`);
+
+        if (callbacks) {
+            callbacks.forEach(callback => {
+                try {
+                    callback(data);
+                } catch (error) {
+                    console.error(`Error in candle callback for ${data.symbol}:`, error);
+                }
+            });
+        }
+    }
+
+    private handleDepthUpdate(data: DepthData) {
+        const callbacks = this.depthSubscriptions.get(data.symbol);
+
+        if (callbacks) {
+            callbacks.forEach(callback => {
+                try {
+                    callback(data);
+                } catch (error) {
+                    console.error(`Error in depth callback for ${data.symbol}:`, error);
+                }
+            });
+        }
+    }
+
     private handleQuoteUpdate(data: QuoteData) {
         const callbacks = this.subscriptions.get(data.symbol);
 